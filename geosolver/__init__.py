@@ -16,14 +16,20 @@ __all__ = [
     "method",
     "multimethod",
     "notify",
+    "partition",
+    "plancache",
     "randomproblem",
     "selconstr",
+    "snapshot",
+    "solutionspace",
     "tolerance",
     "vector"
 ]
 
 from .geometric import GeometricProblem
 from .geometric import GeometricSolver
+from .plancache import PlanCache
+from .solutionspace import SolutionSpace
 from .geometric import GeometricDecomposition
 from .geometric import DistanceConstraint
 from .geometric import AngleConstraint
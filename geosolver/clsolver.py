@@ -4,16 +4,19 @@ This module provides basic functionality for
 ClusterSolver2D and ClusterSolver3D.
 """
 
-from .graph import Graph
+import copy
+import heapq
+from .graph import Graph, MultiGraph, FanGraph, FanGraphView
 from .method import Method, MethodGraph
 from .diagnostic import diag_print
-from .notify import Notifier
+from .notify import Notifier, Listener
 from .multimethod import MultiVariable, MultiMethod
 from .cluster import *
 from .configuration import Configuration
-from .gmatch import gmatch
+from .gmatch import gmatch, MatchPlan
 from .method import OrMethod,SetMethod
 from .incremental import IncrementalSet,MutableSet,Union,Filter
+from .solutionspace import SolutionSpace
 
 # --------------------------------------------------
 # ---------- ClusterSolver main class --------------
@@ -48,7 +51,7 @@ class ClusterSolver(Notifier):
         self._handcoded_methods = [m for m in self._methodclasses if hasattr(m,"handcoded_match")]
         self._incremental_methods = [m for m in self._methodclasses if hasattr(m,"incremental_matcher")]
         # init instance vars
-        self._graph = Graph()
+        self._graph = MultiGraph()
         #self._graph.add_vertex("_root")
         # self._graph.add_vertex("_toplevel")
         self._graph.add_vertex("_variables")
@@ -66,42 +69,174 @@ class ClusterSolver(Notifier):
         self._rootcluster = None
         # an incrementally updated toplevel set
         self._toplevel = MutableSet()
-        # incrementally updated set of applicable methods
-        self._incremental_matchers = [method.incremental_matcher(self) for method in self._incremental_methods]
-        #print "incremental matchers:",self._incremental_matchers
-        self._applicable_methods = Union(*self._incremental_matchers)
+        # map from variables to the set of toplevel clusters on that variable
+        self._toplevel_index = {}
+        # reference graph of all toplevel clusters, for pattern matching (None if no pattern methods)
+        if len(self._pattern_methods) > 0:
+            self._refgraph = reference2graph([])
+        else:
+            self._refgraph = None
+        # incrementally updated set of applicable methods (created when first needed)
+        self._incremental_matchers = None
+        self._applicable_methods = None
+        # non-redundant methods in _applicable_methods (created with the matchers)
+        self._worklist = None
+        # map from clusters to maps from constraints (Distance, Angle) to their source clusters
+        self._provenance = {}
+        # map from variables to bit numbers, and from clusters to bitmasks (see mask)
+        self._varbits = {}
+        self._masks = {}
+        # record of added clusters and applied methods (None if not replayable)
+        self._trace = []
+        # while replaying a trace, a map from recorded objects to replayed objects
+        self._replay = None
+        self._replay_trace = None
+        # if False, changes in the method graph are not propagated until end_bulk
+        self._prop = True
 
     # ------- methods for setting up constraint problems ------------
     
     def add(self, cluster):
         """Add a cluster"""
-        diag_print("add_cluster "+str(cluster), "clsolver")
+        diag_print("add_cluster %s", "clsolver", cluster)
         self._add_cluster(cluster)
+        if self._replay != None:
+            self._replay_add(cluster)
+        elif self._trace != None:
+            self._trace.append(("add", cluster, rootname(cluster)))
         self._process_new()
 
+    def begin_bulk(self):
+        """Start adding clusters in bulk. 
+        
+           Until end_bulk is called, configurations set on clusters are not 
+           propagated through the methods found, so get may return outdated values. 
+        """
+        self._prop = False
+
+    def end_bulk(self):
+        """Propagate all configurations set since begin_bulk, executing 
+           each affected method once, in topological order.
+        """
+        if self._prop:
+            return
+        self._prop = True
+        self._mg.propagate()
+
     def remove(self, cluster):
         """Remove a cluster. 
            All dependend objects are also removed.
         """
+        if self._replay != None:
+            # cannot replay anymore, search for methods instead
+            diag_print("remove while replaying, replay aborted", "clsolver")
+            self._replay = None
+        self._trace = None
         self._remove(cluster)
         self._process_new()
 
+    def get_trace(self):
+        """Returns a record of the clusters added to this solver and the methods
+           applied to them, or None if clusters have been removed. 
+           A solver for a structurally identical problem can replay 
+           the trace, instead of searching for methods. See begin_replay.
+        """
+        return self._trace
+
+    def begin_replay(self, trace):
+        """Start replaying a trace, returned by get_trace of another solver. 
+        
+           Clusters added while replaying are matched with the recorded clusters, 
+           by type and variables. No methods are searched for. After all clusters 
+           have been added, call end_replay to apply the recorded methods.
+        """
+        self._replay = {}
+        self._replay_trace = trace
+        self._replay_clusters = {}
+        for event in trace:
+            if event[0] == "add":
+                (action, cluster, root) = event
+                key = _cluster_key(cluster)
+                if key not in self._replay_clusters:
+                    self._replay_clusters[key] = []
+                self._replay_clusters[key].append((cluster, root))
+
+    def end_replay(self):
+        """Apply the methods in the trace given to begin_replay. 
+           Returns True iff the whole trace was replayed. Otherwise, 
+           the remaining methods are found by searching, as usual.
+        """
+        if self._replay == None:
+            return False
+        replayed = True
+        for event in self._replay_trace:
+            if event[0] != "method":
+                continue
+            (action, merge, infinc, created, roots) = event
+            if not self._replay_method(merge, infinc, created, roots):
+                diag_print("could not replay %s", "clsolver", merge)
+                replayed = False
+                break
+        self._replay = None
+        if replayed:
+            # nothing left to search for; the incremental matchers are
+            # created when the next cluster is added or removed
+            self._trace = self._replay_trace
+            self._new = []
+        else:
+            self._trace = None
+            self._process_new()
+        self._replay_trace = None
+        return replayed
+
+    def __getstate__(self):
+        """when pickling... save the top-level set as a list, do not save incremental matchers or reference graph
+           (see also snapshot module, which takes care of root variable names)"""
+        dict = Notifier.__getstate__(self)
+        dict['_toplevel'] = list(self._toplevel)
+        dict['_incremental_matchers'] = None
+        dict['_applicable_methods'] = None
+        dict['_worklist'] = None
+        dict['_masks'] = {}
+        del dict['_refgraph']
+        return dict
+
+    def __setstate__(self, dict):
+        """when unpickling... re-create top-level set and reference graph; matchers are re-created when needed"""
+        Notifier.__setstate__(self, dict)
+        self._toplevel = MutableSet(dict['_toplevel'])
+        if len(self._pattern_methods) > 0:
+            self._refgraph = reference2graph(self._toplevel)
+        else:
+            self._refgraph = None
+
     def set(self, cluster, configurations):
         """Associate a list of configurations with a cluster"""
-        self._mg.set(cluster, configurations)
+        self._mg.set(cluster, configurations, self._prop)
         
     def get(self, cluster):
         """Return a set of configurations associated with a cluster"""
         return self._mg.get(cluster)
- 
+
+    def solution_space(self, cluster, map=None):
+        """Returns a SolutionSpace of the configurations of a cluster, i.e. the 
+           configurations returned by get, in factored form. See SolutionSpace."""
+        return SolutionSpace(self._mg, cluster, map)
+
+    def compile(self):
+        """Returns a Plan for fast re-evaluation of the current decomposition.
+           The parameters of the plan are the clusters, root variables and
+           flags that are set, not derived. See MethodGraph.compile."""
+        return self._mg.compile()
+
     def set_root(self, cluster):
         """Set root cluster, used for positionig and orienting the solutions"""
-        diag_print("set root "+str(self._rootcluster), "clsolver")
+        diag_print("set root %s", "clsolver", self._rootcluster)
         if self._rootcluster != None:
             oldrootvar = rootname(self._rootcluster)
-            self._mg.set(oldrootvar, False)
+            self._mg.set(oldrootvar, False, self._prop)
         newrootvar = rootname(cluster)
-        self._mg.set(newrootvar, True)
+        self._mg.set(newrootvar, True, self._prop)
         self._rootcluster = cluster
 
     def get_root(self):
@@ -110,7 +245,7 @@ class ClusterSolver(Notifier):
    
     def set_prototype_selection(self, enabled):
         """Enable or disable prototype-based solution selection"""
-        self._mg.set(self._prototype_selection_var, enabled)
+        self._mg.set(self._prototype_selection_var, enabled, self._prop)
 
     def add_selection_constraint(self, con):
         """Add a SelectionConstraint to filter solutions"""
@@ -119,7 +254,7 @@ class ClusterSolver(Notifier):
             if selector != None:
                 selector.add_constraint(con)
                 self._selection_method[con] = selector
-                self._mg.execute(selector)                
+                self._execute(selector)
             #self._selection_method[con] = None     # this line wrong?
             self._selection_method[con] = selector     # this line better?
 
@@ -129,22 +264,24 @@ class ClusterSolver(Notifier):
             selector = self._selection_method[con]
             if selector != None:
                 selector.rem_constraint(con)
-                self._mg.execute(selector)                
+                self._execute(selector)
             del self._selection_method[con] 
 
     # ------- methods for inspecting the state of the solver ------------
     
     def variables(self):
         """get list of variables"""
-        return self._graph.outgoing_vertices("_variables")
+        return self._graph.outgoing_vertices("_variables", "contains")
 
     def clusters(self):
-        """get list of clusters"""
-        return self._graph.outgoing_vertices("_clusters")
+        """get clusters, without copying. 
+           Do not add or remove clusters while iterating."""
+        return self._graph.outgoing("_clusters", "contains")
 
     def methods(self):
-        """get list of methods"""
-        return self._graph.outgoing_vertices("_methods")
+        """get methods, without copying. 
+           Do not add or remove clusters while iterating."""
+        return self._graph.outgoing("_methods", "contains")
 
     def top_level(self):
         """return IncrementalSet of top-level clusters"""
@@ -156,15 +293,36 @@ class ClusterSolver(Notifier):
         #return self._graph.has_edge("_toplevel",object)
         return object in self._toplevel
 
+    def find_top_level(self, var):
+        """Returns the set of top-level clusters on the given variable (do not modify).
+           The incremental sets of connected clusters (e.g. ConnectedPairs in clsolver3D) 
+           use this, so only top-level clusters are connected."""
+        return self._toplevel_index.get(var, _empty)
+
+    def mask(self, cluster):
+        """Returns an integer bitmask of the variables of a cluster, with one bit for 
+           each variable. Variables are numbered by this solver, so masks of different
+           solvers cannot be combined. Use popcount(mask1 & mask2) to count shared variables.
+        """
+        mask = self._masks.get(cluster)
+        if mask == None:
+            mask = 0
+            for var in cluster.vars:
+                bit = self._varbits.get(var)
+                if bit == None:
+                    bit = len(self._varbits)
+                    self._varbits[var] = bit
+                mask |= 1 << bit
+            self._masks[cluster] = mask
+        return mask
+
     def find_dependend(self, object):
         """Return a list of objects that depend on given object directly."""
-        l = self._graph.outgoing_vertices(object)
-        return [x for x in l if self._graph.get(object,x) == "dependency"]
+        return self._graph.outgoing_vertices(object, "dependency")
         
     def find_depends(self, object):
         """Return a list of objects that the given object depends on directly"""
-        l = self._graph.ingoing_vertices(object)
-        return [x for x in l if self._graph.get(x,object) == "dependency"]
+        return self._graph.ingoing_vertices(object, "dependency")
 
     def contains(self, obj):
         return self._graph.has_vertex(obj)
@@ -187,23 +345,37 @@ class ClusterSolver(Notifier):
 
     def _objects_that_need(self, needed):
         """Return objects needed by given object"""
-        l = self._graph.outgoing_vertices(needed)
-        return [x for x in l if self._graph.get(needed,x) == "needed_by"]
+        return self._graph.outgoing_vertices(needed, "needed_by")
 
     def _objects_needed_by(self, needer):
         """Return objects needed by given object"""
-        l = self._graph.ingoing_vertices(needer)
-        return [x for x in l if self._graph.get(x,needer) == "needed_by"]
+        return self._graph.ingoing_vertices(needer, "needed_by")
    
     def _add_top_level(self, cluster):
         # self._graph.add_edge("_toplevel",cluster)
         self._new.append(cluster)
+        for var in cluster.vars:
+            if var not in self._toplevel_index:
+                self._toplevel_index[var] = set()
+            self._toplevel_index[var].add(cluster)
         self._toplevel.add(cluster)
+        if self._refgraph != None:
+            _add_reference(self._refgraph, cluster)
 
     def _rem_top_level(self, object):
         # self._graph.rem_edge("_toplevel",object)
         if object in self._new:
             self._new.remove(object)
+        if object in self._toplevel:
+            if self._refgraph != None:
+                _rem_reference(self._refgraph, object)
+            for var in object.vars:
+                clusters = self._toplevel_index[var]
+                clusters.discard(object)
+                if len(clusters) == 0:
+                    del self._toplevel_index[var]
+                    if self._refgraph != None:
+                        self._refgraph.rem_vertex(var)
         self._toplevel.remove(object)
 
     def _find_descendend(self,v):
@@ -214,7 +386,7 @@ class ClusterSolver(Notifier):
             x = front.pop()
             if x not in result:
                 result[x] = 1
-                front += self.find_dependend(x)
+                front.extend(self._graph.outgoing(x, "dependency"))
         del result[v]
         return list(result)
 
@@ -223,11 +395,11 @@ class ClusterSolver(Notifier):
    
     def _add_variable(self, var):
         if not self._graph.has_vertex(var):
-            diag_print("_add_variable "+str(var), "clsolver")
+            diag_print("_add_variable %s", "clsolver", var)
             self._add_to_group("_variables", var)
 
     def _add_cluster(self, newcluster):
-        diag_print("_add_cluster "+str(newcluster),"clsolver")
+        diag_print("_add_cluster %s", "clsolver", newcluster)
         # check if not already exists
         if self._graph.has_vertex(newcluster): 
             raise Exception("cluster %s already in clsolver"%(str(newcluster)))
@@ -244,7 +416,7 @@ class ClusterSolver(Notifier):
         root = rootname(newcluster)
         if not self._mg.contains(root):
             self._mg.add_variable(root, False)
-            self._mg.set(root, False)
+            self._mg.set(root, False, self._prop)
             # add root-variable to dependency graph
             self._add_dependency(newcluster, root)
         # if there is no root cluster, this one will be it
@@ -254,15 +426,22 @@ class ClusterSolver(Notifier):
         self.send_notify(("add", newcluster))
 
     def _add_method(self, method):
-        diag_print("new "+str(method),"clsolver")
+        diag_print("new %s", "clsolver", method)
         self._add_to_group("_methods", method)
         for obj in method.inputs():
             self._add_dependency(obj, method)
         for obj in method.outputs():
             self._add_dependency(method, obj)
             self._add_dependency(obj, method)
-        self._mg.add_method(method)
+        self._mg.add_method(method, self._prop)
         self.send_notify(("add", method))
+
+    def _execute(self, method):
+        """execute a method in the method graph now, or when bulk loading ends"""
+        if self._prop:
+            self._mg.execute(method)
+        else:
+            self._mg.schedule(method)
     
     # ----- solution selection
 
@@ -274,7 +453,7 @@ class ClusterSolver(Notifier):
             vars.update(con.variables())
         selclusters = []
         for var in vars:
-            clusters = self._graph.outgoing_vertices(var)
+            clusters = self._graph.outgoing(var, "dependency")
             clusters = [c for c in clusters if isinstance(c, Rigid)]
             clusters = [c for c in clusters if len(c.vars) == 1]
             if len(clusters) < 1:
@@ -306,7 +485,7 @@ class ClusterSolver(Notifier):
         candidates = None
         for var in con.variables():
             # find clusters
-            clusters = set(self.find_dependend(var))
+            clusters = set(self._graph.outgoing(var, "dependency"))
             if candidates == None:
                 candidates = clusters
             else:
@@ -314,7 +493,7 @@ class ClusterSolver(Notifier):
         # get selection methods of clusters
         methods = []
         for cluster in candidates:
-            methods += [c for c in self.find_depends(cluster) if isinstance(c,SelectionMethod)]
+            methods += [c for c in self._graph.ingoing(cluster, "dependency") if isinstance(c,SelectionMethod)]
         # get selection method with smallest cluster
         if len(methods)>0:
             method = min(methods, key=lambda m: len(m.inputs()[0].vars))
@@ -350,42 +529,46 @@ class ClusterSolver(Notifier):
     # --------------
  
     def _process_new(self):
+        if self._replay != None:
+            # methods will be applied by end_replay
+            return
+        if self._applicable_methods == None:
+            self._incremental_matchers = [method.incremental_matcher(self) for method in self._incremental_methods]
+            self._applicable_methods = Union(*self._incremental_matchers)
+            self._worklist = MethodWorklist(self, self._applicable_methods, self._toplevel)
         # try incremental matchers and old style matching alternatingly
-        non_redundant_methods = [m for m in self._applicable_methods if not self._is_redundant_method(m)]
-        while len(non_redundant_methods) > 0 or len(self._new) > 0:
+        method = self._worklist.next()
+        while method != None or len(self._new) > 0:
             # check incremental matches
-            if len(non_redundant_methods) > 0:  
-                method = next(iter(non_redundant_methods))
+            if method != None:  
                 #print "applicable methods:", map(str, self._applicable_methods)
-                diag_print("incremental search found:"+str(method),"clsolver._process_new")
+                diag_print("incremental search found:%s", "clsolver._process_new", method)
                 self._add_method_complete(method)
             else:
                 newobject = self._new.pop()
-                diag_print("search from "+str(newobject), "clsolver")
+                diag_print("search from %s", "clsolver", newobject)
                 succes = self._search(newobject)
                 if succes and self.is_top_level(newobject): 
                     # maybe more rules applicable.... push back on stack
                     self._new.append(newobject)
                 #endif
             # endif
-            non_redundant_methods = [m for m in self._applicable_methods if not self._is_redundant_method(m)]
+            method = self._worklist.next()
         # endwhile
     #end def
     
     def _search(self, newcluster):
-        diag_print("search from:"+str(newcluster),"clsolver3D")
+        diag_print("search from:%s", "clsolver3D", newcluster)
         # find all toplevel clusters connected to newcluster 
         # via one or more variables
         connected = set()
         for var in newcluster.vars:
-            dependend = self.find_dependend(var)
-            dependend = [x for x in dependend if self.is_top_level(x)]
-            connected.update(dependend)
-        diag_print("search: connected clusters="+str(connected),"clsolver3D")
+            connected.update(self.find_top_level(var))
+        diag_print("search: connected clusters=%s", "clsolver3D", connected)
         
         # first try handcoded matching
         for methodclass in self._handcoded_methods:
-            diag_print("trying handcoded match for "+str(methodclass), "clsolver3D")
+            diag_print("trying handcoded match for %s", "clsolver3D", methodclass)
             matches = methodclass.handcoded_match(self, newcluster, connected)
             if self._try_matches(methodclass, matches):
                 return True
@@ -400,10 +583,12 @@ class ClusterSolver(Notifier):
         """finds a possible rewrite rule applications on given set of clusters, applies it 
            and returns True iff successfull
         """
-        refgraph = reference2graph(nlet)
+        if len(self._pattern_methods) == 0:
+            return False
+        refgraph = FanGraphView(self._refgraph, _Neighbourhood(self._refgraph, nlet))
         for methodclass in self._pattern_methods:
-            diag_print("trying generic pattern matching for "+str(methodclass), "clsolver3D")
-            matches = gmatch(methodclass.patterngraph, refgraph)
+            diag_print("trying generic pattern matching for %s", "clsolver3D", methodclass)
+            matches = gmatch(_pattern_plan(methodclass), refgraph)
             if self._try_matches(methodclass,matches):
                 return True
             # end for match
@@ -413,7 +598,7 @@ class ClusterSolver(Notifier):
     def _try_matches(self, methodclass, matches):
         # print "method="+str(methodclass),"number of matches = "+str(len(matches))
         for s in matches:
-            diag_print("try match: "+str(s),"clsolver3D")
+            diag_print("try match: %s", "clsolver3D", s)
             method = methodclass(*[s])
             succes = self._add_method_complete(method)
             if succes:
@@ -431,15 +616,13 @@ class ClusterSolver(Notifier):
         infinc = True
         connected = set()
         for var in output.vars:
-            dependend = self.find_dependend(var)
-            dependend = [x for x in dependend if self.is_top_level(x)]
-            connected.update(dependend)
+            connected.update(self.find_top_level(var))
         # NOTE 07-11-2007 (while writing the paper): this  implementation of information increasing may not be correct. We may need to check that the total sum of the information in the overlapping clusters is equal to the information in the output.
         for cluster in connected:
             if num_constraints(cluster.intersection(output)) >= num_constraints(output):
                 infinc = False
                 break
-        diag_print("information increasing:"+str(infinc),"clsolver")
+        diag_print("information increasing:%s", "clsolver", infinc)
         return infinc
 
        
@@ -455,7 +638,7 @@ class ClusterSolver(Notifier):
         if hasattr(merge,"noremove") and merge.noremove == True:
             nremove = 0
         reduc = (nremove > 1)
-        diag_print("reduce # clusters:"+str(reduc),"clsolver")
+        diag_print("reduce # clusters:%s", "clsolver", reduc)
         return reduc
 
     def _is_redundant_method(self, merge):
@@ -470,12 +653,25 @@ class ClusterSolver(Notifier):
             return False
 
     def _add_method_complete(self, merge):
-        diag_print("add_method_complete "+str(merge), "clsolver")
+        diag_print("add_method_complete %s", "clsolver", merge)
         
         # do not add if method is redundant
         if self._is_redundant_method(merge):
             return False
 
+        # determine infinc before adding (used later)
+        infinc = self._is_information_increasing(merge)
+        created = self._apply_method(merge, infinc)
+        if self._trace != None:
+            roots = [rootname(cluster) for cluster in created]
+            self._trace.append(("method", merge, infinc, created, roots))
+        
+        # success
+        return True
+
+    def _apply_method(self, merge, infinc):
+        """Add a method, its output cluster and, if infinc, solution selectors. 
+           Returns the list of created clusters."""
         output = merge.outputs()[0]
         
         # check consistency and local/global overconstrained
@@ -485,7 +681,7 @@ class ClusterSolver(Notifier):
             for i2 in range(i1+1, len(merge.input_clusters())):
                 c1 = merge.input_clusters()[i1] 
                 c2 = merge.input_clusters()[i2] 
-                if num_constraints(c1.intersection(c2)) != 0:
+                if num_over_constraints(c1, c2) != 0:
                     local_oc = True
                 consistent = consistent and self._is_consistent_pair(c1, c2)
         merge.consistent = consistent
@@ -497,9 +693,6 @@ class ClusterSolver(Notifier):
             overconstrained = overconstrained or cluster.overconstrained
         output.overconstrained = overconstrained
         
-        # determine infinc before adding (used later)
-        infinc = self._is_information_increasing(merge)
-        
         # add to graph
         self._add_cluster(output)
         self._add_method(merge)
@@ -514,11 +707,11 @@ class ClusterSolver(Notifier):
                     break
             # remove input clusters when all its constraints are in output cluster 
             if num_constraints(cluster.intersection(output)) >= num_constraints(cluster): 
-                diag_print("remove from top-level: "+str(cluster),"clsolver")
+                diag_print("remove from top-level: %s", "clsolver", cluster)
                 self._rem_top_level(cluster) 
                 merge.restore_toplevel.append(cluster)
             else:
-                diag_print("keep top-level: "+str(cluster),"clsolver")
+                diag_print("keep top-level: %s", "clsolver", cluster)
         
         # add method to determine root-variable
         if hasattr(merge,"noremove") and merge.noremove == True:
@@ -528,9 +721,41 @@ class ClusterSolver(Notifier):
         # add solution selection methods, only if information increasing
         if infinc:
             output2 = self._add_prototype_selector(merge)
-            output3 = self._add_solution_selector(output2)
-        
-        # success
+            selector = self._add_solution_selector(output2)
+            output3 = selector.outputs()[0]
+            return [output, output2, output3]
+        else:
+            return [output]
+
+    # -- replaying 
+
+    def _replay_add(self, cluster):
+        """Match an added cluster with a recorded cluster"""
+        key = _cluster_key(cluster)
+        if key in self._replay_clusters and len(self._replay_clusters[key]) > 0:
+            (recorded, root) = self._replay_clusters[key].pop(0)
+            self._replay[recorded] = cluster
+            self._replay[root] = rootname(cluster)
+        else:
+            diag_print("no recorded cluster for %s, replay aborted", "clsolver", cluster)
+            self._replay = None
+            self._trace = None
+
+    def _replay_method(self, merge, infinc, created, roots):
+        """Apply a recorded method to the replayed clusters. Returns True iff successful."""
+        for var in merge.inputs():
+            if var not in self._replay and isinstance(var, Cluster):
+                return False
+        output = merge.outputs()[0]
+        self._replay[output] = output.copy()
+        self._replay[roots[0]] = rootname(self._replay[output])
+        method = merge.remap(self._replay)
+        newcreated = self._apply_method(method, infinc)
+        if len(newcreated) != len(created):
+            return False
+        for i in range(len(created)):
+            self._replay[created[i]] = newcreated[i]
+            self._replay[roots[i]] = rootname(newcreated[i])
         return True
 
     def _add_root_method(self,inclusters,outcluster):
@@ -566,13 +791,15 @@ class ClusterSolver(Notifier):
                 for cluster in item.restore_toplevel:
                     torestore.add(cluster)
             # delete it from graph
-            diag_print("deleting "+str(item),"clsolver.remove")
+            diag_print("deleting %s", "clsolver.remove", item)
             self._graph.rem_vertex(item)
-            # remove from _new list
-            if item in self._new:
-                self._new.remove(item)
-            # remove from incremental top_level
-            self._toplevel.remove(item)
+            # forget sources of constraints in item, and its mask
+            if item in self._provenance:
+                del self._provenance[item]
+            if item in self._masks:
+                del self._masks[item]
+            # remove from _new list and incremental top_level
+            self._rem_top_level(item)
             # remove from methodgraph
             if isinstance(item, Method):
                 # note: method may have been removed because variable removed
@@ -589,7 +816,7 @@ class ClusterSolver(Notifier):
             # remove variables with no dependent clusters
             if isinstance(item, Cluster):
                 for var in item.vars:
-                    if len(self.find_dependend(var)) == 0:
+                    if self._graph.has_vertex(var) and len(self._graph.outgoing(var, "dependency")) == 0:
                         self._graph.rem_vertex(var)
             # notify listeners
             self.send_notify(("remove", item))
@@ -634,17 +861,19 @@ class ClusterSolver(Notifier):
     # ---- consistency
 
     def _is_consistent_pair(self, object1, object2):
-        diag_print("in is_consistent_pair "+str(object1)+" "+str(object2),"clsolver")
-        oc = over_constraints(object1, object2) 
-        diag_print("over_constraints: "+str(list(map(str,oc))),"clsolver")
+        diag_print("in is_consistent_pair %s %s", "clsolver", object1, object2)
+        oc = iter_over_constraints(object1, object2) 
+        diag_print(lambda: "over_constraints: "+str(list(map(str,over_constraints(object1, object2)))), "clsolver")
         consistent = True
         for con in oc:
             consistent = consistent and self._consistent_overconstraint_in_pair(con, object1, object2)
-        diag_print("global consistent? "+str(consistent),"clsolver")
+            if not consistent:
+                break
+        diag_print("global consistent? %s", "clsolver", consistent)
         return consistent
     
     def _consistent_overconstraint_in_pair(self, overconstraint, object1, object2):
-        diag_print("consistent "+str(overconstraint)+" in "+str(object1)+" and "+str(object2)+" ?", "clsolver")
+        diag_print("consistent %s in %s and %s ?", "clsolver", overconstraint, object1, object2)
     
         # get sources for constraint in given clusters
         s1 = self._source_constraint_in_cluster(overconstraint, object1)
@@ -669,10 +898,25 @@ class ClusterSolver(Notifier):
             #if solve(c2to1) contains overconstraint then consistent
             #raise StandardError, "not yet implemented"
 
-        diag_print("consistent? "+str(consistent), "clsolver")
+        diag_print("consistent? %s", "clsolver", consistent)
         return consistent
 
     def _source_constraint_in_cluster(self, constraint, cluster):
+        """Returns the cluster from which the given constraint in the given cluster
+           originates, or None if the source is inconsistent. The sources of clusters 
+           do not change, so the result is remembered until the cluster is removed."""
+        sources = self._provenance.get(cluster)
+        key = _constraint_key(constraint)
+        if sources == None:
+            sources = {}
+            self._provenance[cluster] = sources
+        elif key in sources:
+            return sources[key]
+        source = self._find_source_constraint_in_cluster(constraint, cluster)
+        sources[key] = source
+        return source
+
+    def _find_source_constraint_in_cluster(self, constraint, cluster):
         if not self._contains_constraint(cluster, constraint):
             raise Exception("constraint not in cluster")
         elif self._is_atomic(cluster):
@@ -703,7 +947,7 @@ class ClusterSolver(Notifier):
             return False
 
     def _determining_method(self, object):
-        depends = self.find_depends(object)
+        depends = self._graph.ingoing(object, "dependency")
         methods = [x for x in depends if isinstance(x, Method)]
         if len(methods) == 0:
             return None
@@ -761,6 +1005,98 @@ class ClusterSolver(Notifier):
   
 # class ClusterSolver
 
+
+class MethodWorklist(Listener):
+    """Keeps track of the non-redundant methods in a set of applicable methods.
+
+       A method is redundant if it is not information increasing and not cluster 
+       reducing (see ClusterSolver._is_redundant_method). Whether a method is cluster
+       reducing does not change, and whether it is information increasing only depends
+       on the top-level clusters on the variables of its output. So, a method is only
+       re-evaluated when it becomes applicable, or when a top-level cluster on one of 
+       its output variables is added or removed. Non-redundant methods are returned 
+       in the order in which they became applicable.
+    """
+
+    def __init__(self, solver, methods, toplevel):
+        """Create a worklist for the given IncrementalSets of applicable methods 
+           and top-level clusters of the given ClusterSolver."""
+        Listener.__init__(self)
+        self._solver = solver
+        self._methods = methods
+        self._toplevel = toplevel
+        # map from applicable methods to sequence numbers 
+        self._candidates = {}
+        self._count = 0
+        # map from variables to applicable methods with that variable in output
+        self._byvar = {}
+        # methods to be (re-)evaluated
+        self._dirty = set()
+        # non-redundant methods, and a heap of (sequence number, method), may contain stale entries
+        self._nonredundant = set()
+        self._heap = []
+        # listen for changes, and add initial methods
+        methods.add_listener(self)
+        toplevel.add_listener(self)
+        for method in methods:
+            self._add_method(method)
+
+    def receive_notify(self, source, message):
+        (action, object) = message
+        if source == self._methods:
+            if action == "add":
+                self._add_method(object)
+            elif action == "remove":
+                self._rem_method(object)
+        elif source == self._toplevel:
+            # top-level cluster added or removed
+            for var in object.vars:
+                if var in self._byvar:
+                    self._dirty.update(self._byvar[var])
+
+    def _add_method(self, method):
+        if method in self._candidates:
+            return
+        self._count += 1
+        self._candidates[method] = self._count
+        for var in method.outputs()[0].vars:
+            if var not in self._byvar:
+                self._byvar[var] = set()
+            self._byvar[var].add(method)
+        self._dirty.add(method)
+
+    def _rem_method(self, method):
+        if method not in self._candidates:
+            return
+        del self._candidates[method]
+        for var in method.outputs()[0].vars:
+            methods = self._byvar[var]
+            methods.discard(method)
+            if len(methods) == 0:
+                del self._byvar[var]
+        self._dirty.discard(method)
+        self._nonredundant.discard(method)
+
+    def next(self):
+        """Returns the first non-redundant applicable method, or None"""
+        # re-evaluate changed methods
+        for method in self._dirty:
+            if self._solver._is_redundant_method(method):
+                self._nonredundant.discard(method)
+            elif method not in self._nonredundant:
+                self._nonredundant.add(method)
+                heapq.heappush(self._heap, (self._candidates[method], method))
+        self._dirty.clear()
+        # skip stale entries
+        while len(self._heap) > 0:
+            (count, method) = self._heap[0]
+            if method in self._nonredundant and self._candidates.get(method) == count:
+                return method
+            heapq.heappop(self._heap)
+        return None
+
+# class MethodWorklist
+
 #  -----------------------------------------------------------
 #  ----------Method classes used by ClusterSolver -------------
 #  -----------------------------------------------------------
@@ -808,6 +1144,20 @@ class ClusterMethod(MultiMethod):
     def input_clusters(self):
         return [var for var in self.inputs() if isinstance(var, Cluster)]
 
+    def remap(self, mapping):
+        """Returns a copy of this method, with its variables (clusters and 
+           root variables) replaced according to the given mapping (a dictionary).
+           Used to replay a recorded method on other clusters."""
+        new = copy.copy(self)
+        for (name, value) in list(self.__dict__.items()):
+            if isinstance(value, list):
+                new.__dict__[name] = [mapping.get(x, x) for x in value]
+            elif isinstance(value, MultiVariable) or isinstance(value, str):
+                new.__dict__[name] = mapping.get(value, value)
+        new.overconstrained = None
+        new.consistent = None
+        return new
+
     def __eq__(self, other):
         if self.__class__ == other.__class__:
             return self._inputs == other._inputs
@@ -836,9 +1186,9 @@ class PrototypeMethod(MultiMethod):
         for i in range(1,len(self._inputs)-1):
             selclusters.append(self._inputs[i])
         enabledvar = self._inputs[-1]
-        diag_print("input cluster"+str(incluster), "PrototypeMethod.multi_execute")
-        diag_print("selection clusters"+str(selclusters), "PrototypeMethod.multi_execute")
-        diag_print("enabledvar"+str(enabledvar), "PrototypeMethod.multi_execute")
+        diag_print("input cluster%s", "PrototypeMethod.multi_execute", incluster)
+        diag_print("selection clusters%s", "PrototypeMethod.multi_execute", selclusters)
+        diag_print("enabledvar%s", "PrototypeMethod.multi_execute", enabledvar)
         # get confs/values
         enabledval = inmap[enabledvar] 
         inconf = inmap[incluster]
@@ -852,18 +1202,18 @@ class PrototypeMethod(MultiMethod):
             selconf = {}
         else:
             selconf = Configuration(selmap)
-        diag_print("input configuration = "+str(inconf), "PrototypeMethod.multi_execute")
-        diag_print("selection configurations = "+str(selconf), "PrototypeMethod.multi_execute")
-        diag_print("enabled value = "+str(enabledval), "PrototypeMethod.multi_execute")
+        diag_print("input configuration = %s", "PrototypeMethod.multi_execute", inconf)
+        diag_print("selection configurations = %s", "PrototypeMethod.multi_execute", selconf)
+        diag_print("enabled value = %s", "PrototypeMethod.multi_execute", enabledval)
         # do test
         if enabledval == True:
             sat = True
             for con in self._constraints:
                 satcon = con.satisfied(inconf.map) == con.satisfied(selconf.map)
-                diag_print("constraint = "+str(con), "PrototypeMethod.multi_execute")
-                diag_print("constraint satisfied? "+str(satcon), "PrototypeMethod.multi_execute")
+                diag_print("constraint = %s", "PrototypeMethod.multi_execute", con)
+                diag_print("constraint satisfied? %s", "PrototypeMethod.multi_execute", satcon)
                 sat = sat and satcon
-            diag_print("prototype satisfied? "+str(sat), "PrototypeMethod.multi_execute")
+            diag_print("prototype satisfied? %s", "PrototypeMethod.multi_execute", sat)
             if sat:
                 return [inconf]
             else:
@@ -898,14 +1248,14 @@ class SelectionMethod(MultiMethod):
         diag_print("SelectionMethod.multi_execute called","SelectionMethod.multi_execute")
         incluster = self._inputs[0] 
         inconf = inmap[incluster]
-        diag_print("input configuration = "+str(inconf), "SelectionMethod.multi_execute")
+        diag_print("input configuration = %s", "SelectionMethod.multi_execute", inconf)
         sat = True
         for con in self._constraints:
-            diag_print("constraint = "+str(con), "SelectionMethod.multi_execute")
+            diag_print("constraint = %s", "SelectionMethod.multi_execute", con)
             satcon = con.satisfied(inconf.map)
-            diag_print("satisfied = "+str(satcon), "SelectionMethod.multi_execute")
+            diag_print("satisfied = %s", "SelectionMethod.multi_execute", satcon)
             sat = sat and satcon
-        diag_print("all satisfied = "+str(sat), "SelectionMethod.multi_execute")
+        diag_print("all satisfied = %s", "SelectionMethod.multi_execute", sat)
         if sat:
             return [inconf]
         else:
@@ -947,31 +1297,95 @@ def pattern2graph(pattern):
     return pgraph
 
 def reference2graph(nlet):
-    """Convert a set of (supposedly connected) clusters to a reference graph, used before graph-based matching."""
-    rgraph = Graph()
+    """Convert a set of (supposedly connected) clusters to a reference graph, used before graph-based matching.
+       The reference graph is a FanGraph, which can be updated with _add_reference and _rem_reference."""
+    rgraph = FanGraph()
     rgraph.add_vertex("point")
     rgraph.add_vertex("distance")
     rgraph.add_vertex("rigid")
     rgraph.add_vertex("balloon")
     rgraph.add_vertex("hedgehog")
     for cluster in nlet:
-        for var in cluster.vars:
-            rgraph.add_edge(cluster, var)
-        if isinstance(cluster, Rigid):
-            rgraph.add_edge("rigid", cluster)
-            if len(cluster.vars) == 1:
-                rgraph.add_edge("point", cluster)
-            elif len(cluster.vars) == 2:
-                rgraph.add_edge("distance", cluster)
-        if isinstance(cluster, Balloon):
-            rgraph.add_edge("balloon", cluster)
-        if isinstance(cluster, Hedgehog):
-            rgraph.add_edge("hedgehog", cluster)
-            rgraph.add_edge("cvar"+"#"+str(id(cluster)), cluster.cvar)
-            rgraph.add_edge(cluster, "cvar"+"#"+str(id(cluster)))
+        _add_reference(rgraph, cluster)
     #diag_print("reference graph:"+str(rgraph),"match");
     return rgraph
 
+def _add_reference(rgraph, cluster):
+    """Add a cluster to a reference graph (see reference2graph)"""
+    for var in cluster.vars:
+        rgraph.add_edge(cluster, var)
+    if isinstance(cluster, Rigid):
+        rgraph.add_edge("rigid", cluster)
+        if len(cluster.vars) == 1:
+            rgraph.add_edge("point", cluster)
+        elif len(cluster.vars) == 2:
+            rgraph.add_edge("distance", cluster)
+    if isinstance(cluster, Balloon):
+        rgraph.add_edge("balloon", cluster)
+    if isinstance(cluster, Hedgehog):
+        rgraph.add_edge("hedgehog", cluster)
+        rgraph.add_edge("cvar"+"#"+str(id(cluster)), cluster.cvar)
+        rgraph.add_edge(cluster, "cvar"+"#"+str(id(cluster)))
+
+def _rem_reference(rgraph, cluster):
+    """Remove a cluster from a reference graph. Its variables are not removed."""
+    if isinstance(cluster, Hedgehog):
+        rgraph.rem_vertex("cvar"+"#"+str(id(cluster)))
+    rgraph.rem_vertex(cluster)
+
+class _Neighbourhood:
+    """The vertices of the reference graph of a set of clusters (the nlet), 
+       i.e. the clusters, the type vertices and vertices with an edge from a 
+       cluster in the nlet (variables and hedgehog centre vertices).
+       Use with FanGraphView to match on part of a reference graph.
+    """
+    _types = frozenset(["point","distance","rigid","balloon","hedgehog"])
+
+    def __init__(self, rgraph, nlet):
+        self._rgraph = rgraph
+        self._nlet = nlet
+
+    def __contains__(self, v):
+        if v in self._nlet or v in self._types:
+            return True
+        if not self._rgraph.has_vertex(v):
+            return False
+        for cluster in self._rgraph.ingoing(v):
+            if cluster in self._nlet:
+                return True
+        return False
+
+def _pattern_plan(methodclass):
+    """The patterngraph of a method class, compiled to a MatchPlan. 
+       The plan is compiled once and stored with the class.
+    """
+    plan = methodclass.__dict__.get("_patternplan")
+    if plan is None:
+        plan = MatchPlan(methodclass.patterngraph, ["point","distance","rigid","balloon","hedgehog"])
+        methodclass._patternplan = plan
+    return plan
+
+def _constraint_key(constraint):
+    """A key for remembering things about a constraint (Distance or Angle). 
+       Unlike the constraint itself, the key distinguishes the apex of an angle, 
+       because Angle.__eq__ does not."""
+    if isinstance(constraint, Angle):
+        return (Angle, constraint.vars[1], frozenset(constraint.vars))
+    else:
+        return (type(constraint), None, frozenset(constraint.vars))
+
+# returned by find_top_level for variables without top-level clusters
+_empty = frozenset()
+
+def _cluster_key(cluster):
+    """returns a key for matching clusters of the same type on the same variables"""
+    if isinstance(cluster, Hedgehog):
+        return (cluster.__class__, cluster.cvar, frozenset(cluster.xvars))
+    elif isinstance(cluster, Glueable):
+        return (cluster.__class__, tuple(cluster.order))
+    else:
+        return (cluster.__class__, cluster.vars)
+
 def rootname(cluster):
     """returns the name of the root variable associated with the name of a cluster variable"""
     return "root#"+str(id(cluster))
@@ -131,7 +131,7 @@ class MergeRR(ClusterMethod):
         toplevel = solver.top_level()
         rigids = Rigids(solver)
         connectedpairs = ConnectedPairs1(solver, rigids)
-        twoconnectedpairs = incremental.Filter(lambda r1_r2: len(r1_r2[0].vars.intersection(r1_r2[1].vars))==2, connectedpairs);
+        twoconnectedpairs = incremental.Filter(lambda r1_r2: popcount(solver.mask(r1_r2[0]) & solver.mask(r1_r2[1]))==2, connectedpairs);
         matcher = incremental.Map(lambda r1_r21: MergeRR({"$r1":r1_r21[0], "$r2":r1_r21[1]}), twoconnectedpairs)
         return matcher
     
@@ -525,10 +525,10 @@ class CheckAR(ClusterMethod):
         matches = [];
         if isinstance(newcluster, Rigid) and len(newcluster.vars)>=3:
             rigids = [newcluster]
-            hogs = [hog for hog in connected if isinstance(hog, Hedgehog) and hog.vars.intersection(newcluster.vars) == hog.vars]
+            hogs = [hog for hog in connected if isinstance(hog, Hedgehog) and (problem.mask(hog) & problem.mask(newcluster)) == problem.mask(hog)]
         elif isinstance(newcluster, Hedgehog):
             hogs = [newcluster]
-            rigids = [rigid for rigid in connected if isinstance(rigid, Rigid) and newcluster.vars.intersection(rigid.vars) == newcluster.vars]
+            rigids = [rigid for rigid in connected if isinstance(rigid, Rigid) and (problem.mask(newcluster) & problem.mask(rigid)) == problem.mask(newcluster)]
         else:
             return []
         for h in hogs: 
@@ -567,7 +567,7 @@ class CheckAR(ClusterMethod):
 # ---------------------------------------------------------
 
 def solve_ddd(v1,v2,v3,d12,d23,d31):
-    diag_print("solve_ddd: %s %s %s %f %f %f"%(v1,v2,v3,d12,d23,d31),"clmethods")
+    diag_print("solve_ddd: %s %s %s %f %f %f", "clmethods", v1, v2, v3, d12, d23, d31)
     p1 = vector.vector([0.0,0.0])
     p2 = vector.vector([d12,0.0])
     p3s = cc_int(p1,d31,p2,d23)
@@ -575,7 +575,7 @@ def solve_ddd(v1,v2,v3,d12,d23,d31):
     for p3 in p3s:
         solution = Configuration({v1:p1, v2:p2, v3:p3})
         solutions.append(solution)
-    diag_print("solve_ddd solutions"+str(solutions),"clmethods")
+    diag_print("solve_ddd solutions%s", "clmethods", solutions)
     return solutions
 
 def solve_dad(v1,v2,v3,d12,a123,d23):
@@ -584,7 +584,7 @@ def solve_dad(v1,v2,v3,d12,a123,d23):
         d<xy>: numeric distance values
         a<xyz>: numeric angle in radians
     """
-    diag_print("solve_dad: %s %s %s %f %f %f"%(v1,v2,v3,d12,a123,d23),"clmethods")
+    diag_print("solve_dad: %s %s %s %f %f %f", "clmethods", v1, v2, v3, d12, a123, d23)
     p2 = vector.vector([0.0, 0.0])
     p1 = vector.vector([d12, 0.0])
     p3s = [ vector.vector([d23*math.cos(a123), d23*math.sin(a123)]) ]
@@ -601,7 +601,7 @@ def solve_add(a,b,c, a_cab, d_ab, d_bc):
         a<xyz>: numeric angle in radians
     """
 
-    diag_print("solve_dad: %s %s %s %f %f %f"%(a,b,c,a_cab,d_ab,d_bc),"clmethods")
+    diag_print("solve_dad: %s %s %s %f %f %f", "clmethods", a, b, c, a_cab, d_ab, d_bc)
     p_a = vector.vector([0.0,0.0])
     p_b = vector.vector([d_ab,0.0])
     dir = vector.vector([math.cos(-a_cab),math.sin(-a_cab)])
@@ -618,7 +618,7 @@ def solve_ada(a, b, c, a_cab, d_ab, a_abc):
         d<xy>: numeric distance values
         a<xyz>: numeric angle in radians
     """
-    diag_print("solve_ada: %s %s %s %f %f %f"%(a,b,c,a_cab,d_ab,a_abc),"clmethods")
+    diag_print("solve_ada: %s %s %s %f %f %f", "clmethods", a, b, c, a_cab, d_ab, a_abc)
     p_a = vector.vector([0.0,0.0])
     p_b = vector.vector([d_ab, 0.0])
     dir_ac = vector.vector([math.cos(-a_cab),math.sin(-a_cab)])
@@ -750,7 +750,7 @@ class ConnectedPairs1(incremental.IncrementalSet):
     """Incremental set of all pairs of connected clusters in 1 incremental set"""
     
     def __init__(self, solver, incrset):
-        """Creates an incremental set of all pairs of connected clusters in incrset, according to solver"""
+        """Creates an incremental set of all pairs of connected clusters in incrset, according to solver."""
         self._solver = solver
         self._incrset = incrset
         incremental.IncrementalSet.__init__(self, [incrset])
@@ -759,7 +759,7 @@ class ConnectedPairs1(incremental.IncrementalSet):
     def _receive_add(self,source, obj):
         connected = set()
         for var in obj.vars:
-            dependend = self._solver.find_dependend(var)
+            dependend = self._solver.find_top_level(var)
             dependend = [x for x in dependend if x in self._incrset]
             connected.update(dependend)
         if obj in connected:
@@ -785,7 +785,7 @@ class ConnectedPairs2(incremental.IncrementalSet):
     """Iincremental set of all pairs of connected clusters in 2 incremental sets."""
  
     def __init__(self, solver, incrset1, incrset2):
-        """Creates an incremental set of all pairs (c1, c2) from incrset1 and incrset2 respectively, that are connected according to solver"""
+        """Creates an incremental set of all pairs (c1, c2) from incrset1 and incrset2 respectively, that are connected according to solver."""
         self._solver = solver
         self._incrset1 = incrset1
         self._incrset2 = incrset2
@@ -795,7 +795,7 @@ class ConnectedPairs2(incremental.IncrementalSet):
     def _receive_add(self,source, obj):
         connected = set()
         for var in obj.vars:
-            dependend = self._solver.find_dependend(var)
+            dependend = self._solver.find_top_level(var)
             if source == self._incrset1:
                 dependend = [x for x in dependend if x in self._incrset2]
             elif source == self._incrset2:
@@ -826,7 +826,7 @@ class ConnectedPairs2(incremental.IncrementalSet):
 class DistanceTriplets(incremental.IncrementalSet):
     
     def __init__(self, solver, incrset):
-        """Creates an incremental set of all tripltes of 1-connected clusters in incrset, according to solver"""
+        """Creates an incremental set of all tripltes of 1-connected clusters in incrset, according to solver."""
         self._solver = solver
         self._incrset = incrset
         incremental.IncrementalSet.__init__(self, [incrset])
@@ -835,9 +835,9 @@ class DistanceTriplets(incremental.IncrementalSet):
     def _receive_add(self,source, obj):
         connected = set()
         for var in obj.vars:
-            dependend = self._solver.find_dependend(var)
+            dependend = self._solver.find_top_level(var)
             dependend = [x for x in dependend if x in self._incrset]
-            dependend = [x for x in dependend if len(x.vars.intersection(obj.vars))==1]
+            dependend = [x for x in dependend if popcount(self._solver.mask(x) & self._solver.mask(obj))==1]
             connected.update(dependend)
         if obj in connected:
             connected.remove(obj)
@@ -846,14 +846,14 @@ class DistanceTriplets(incremental.IncrementalSet):
             l = list(connected)
             for i in range(len(l)):
                 obj2 = l[i]
-                shared12 = obj1.vars.intersection(obj2.vars)
+                shared12 = self._solver.mask(obj1) & self._solver.mask(obj2)
                 for j in range(i):
                     obj3 = l[j]
-                    if len(obj2.vars.intersection(obj3.vars))==1:
-                        shared23 = obj2.vars.intersection(obj3.vars)
-                        shared13 = obj1.vars.intersection(obj3.vars)
-                        shared = shared12.union(shared23).union(shared13)
-                        if len(shared)==3: 
+                    shared23 = self._solver.mask(obj2) & self._solver.mask(obj3)
+                    if popcount(shared23)==1:
+                        shared13 = self._solver.mask(obj1) & self._solver.mask(obj3)
+                        shared = shared12 | shared23 | shared13
+                        if popcount(shared)==3: 
                             self._add(frozenset((obj1,obj2,obj3)))
 
     def _receive_remove(self,source, obj):
@@ -877,7 +877,7 @@ class DistanceTriplets(incremental.IncrementalSet):
 class ConnectedTriplets(incremental.IncrementalSet):
     
     def __init__(self, solver, incrset):
-        """Creates an incremental set of all triplets of connected clusters in incrset, according to solver"""
+        """Creates an incremental set of all triplets of connected clusters in incrset, according to solver."""
         self._solver = solver
         self._incrset = incrset
         incremental.IncrementalSet.__init__(self, [incrset])
@@ -886,9 +886,9 @@ class ConnectedTriplets(incremental.IncrementalSet):
     def _receive_add(self,source, obj):
         connected = set()
         for var in obj.vars:
-            dependend = self._solver.find_dependend(var)
+            dependend = self._solver.find_top_level(var)
             dependend = [x for x in dependend if x in self._incrset]
-            dependend = [x for x in dependend if len(x.vars.intersection(obj.vars))>=1]
+            dependend = [x for x in dependend if popcount(self._solver.mask(x) & self._solver.mask(obj))>=1]
             connected.update(dependend)
         if obj in connected:
             connected.remove(obj)
@@ -897,14 +897,14 @@ class ConnectedTriplets(incremental.IncrementalSet):
             l = list(connected)
             for i in range(len(l)):
                 obj2 = l[i]
-                shared12 = obj1.vars.intersection(obj2.vars)
+                shared12 = self._solver.mask(obj1) & self._solver.mask(obj2)
                 for j in range(i):
                     obj3 = l[j]
-                    if len(obj2.vars.intersection(obj3.vars))>=1:
-                        shared23 = obj2.vars.intersection(obj3.vars)
-                        shared13 = obj1.vars.intersection(obj3.vars)
-                        shared = shared12.union(shared23).union(shared13)
-                        if len(shared)>=3: 
+                    shared23 = self._solver.mask(obj2) & self._solver.mask(obj3)
+                    if popcount(shared23)>=1:
+                        shared13 = self._solver.mask(obj1) & self._solver.mask(obj3)
+                        shared = shared12 | shared23 | shared13
+                        if popcount(shared)>=3: 
                             self._add(frozenset((obj1,obj2,obj3)))
 
     def _receive_remove(self,source, obj):
@@ -50,14 +50,12 @@ class MergeGlueable(ClusterMethod):
         if isinstance(newcluster, Rigid) and len(newcluster.vars)>=3:
             matches = []
             rigid1 = newcluster
-            glues = [o for o in connected if isinstance(o, Glueable) and len(o.vars.intersection(rigid1.vars))>=3]
+            glues = [o for o in connected if isinstance(o, Glueable) and popcount(problem.mask(o) & problem.mask(rigid1))>=3]
             for o in glues:
                 connected2 = set()
                 for var in o.vars:
-                    dependend = problem.find_dependend(var)
-                    dependend = [x for x in dependend if problem.is_top_level(x)]
-                    connected2.update(dependend)
-                rigids2 = [r2 for r2 in connected2 if isinstance(r2, Rigid) and r2 != rigid1 and len(r2.vars.intersection(o.vars)) >=3]
+                    connected2.update(problem.find_top_level(var))
+                rigids2 = [r2 for r2 in connected2 if isinstance(r2, Rigid) and r2 != rigid1 and popcount(problem.mask(r2) & problem.mask(o)) >=3]
                 for rigid2 in rigids2:
                     m = Map({
                         "$r1": rigid1, 
@@ -69,7 +67,7 @@ class MergeGlueable(ClusterMethod):
         elif isinstance(newcluster, Glueable):
             matches = []
             glue = newcluster
-            rigids = [r for r in connected if isinstance(r, Rigid) and len(r.vars.intersection(glue.vars)) >=3]
+            rigids = [r for r in connected if isinstance(r, Rigid) and popcount(problem.mask(r) & problem.mask(glue)) >=3]
             for i in range(len(rigids)):
                 for j in range(i+1, len(rigids)):
                     m = Map({
@@ -171,10 +169,10 @@ class CheckAR(ClusterMethod):
         matches = [];
         if isinstance(newcluster, Rigid) and len(newcluster.vars)>=3:
             rigids = [newcluster]
-            hogs = [hog for hog in connected if isinstance(hog, Hedgehog) and hog.vars.intersection(newcluster.vars) == hog.vars]
+            hogs = [hog for hog in connected if isinstance(hog, Hedgehog) and (problem.mask(hog) & problem.mask(newcluster)) == problem.mask(hog)]
         elif isinstance(newcluster, Hedgehog):
             hogs = [newcluster]
-            rigids = [rigid for rigid in connected if isinstance(rigid, Rigid) and newcluster.vars.intersection(rigid.vars) == newcluster.vars]
+            rigids = [rigid for rigid in connected if isinstance(rigid, Rigid) and (problem.mask(newcluster) & problem.mask(rigid)) == problem.mask(newcluster)]
         else:
             return []
         for h in hogs: 
@@ -260,12 +258,6 @@ class MergePR(ClusterMethod):
     #    return matches;
     #handcoded_match = staticmethod(_handcoded_match)
 
-    #def _pattern():
-    #    pattern = [["point","$p",["$a"]], ["rigid", "$r", ["$a"]]]
-    #    return pattern2graph(pattern)
-    #pattern = staticmethod(_pattern)
-    #patterngraph = _pattern()
-
     def __str__(self):
         s =  "MergePR("+str(self._inputs[0])+"+"+str(self._inputs[1])+"->"+str(self._outputs[0])+")"
         s += "[" + self.status_str()+"]"
@@ -309,7 +301,7 @@ class MergeDR(ClusterMethod):
         rigids = Rigids(solver)
         distances = Distances(solver)
         connectedpairs = ConnectedPairs(solver, distances, rigids)
-        twoconnectedpairs = incremental.Filter(lambda d_r: len(d_r[0].vars.intersection(d_r[1].vars))==2, connectedpairs);
+        twoconnectedpairs = incremental.Filter(lambda d_r: popcount(solver.mask(d_r[0]) & solver.mask(d_r[1]))==2, connectedpairs);
         matcher = incremental.Map(lambda d_r1: MergeDR({"$d":d_r1[0], "$r":d_r1[1]}), twoconnectedpairs)
         #
         #global debugger
@@ -319,13 +311,6 @@ class MergeDR(ClusterMethod):
     
     incremental_matcher = staticmethod(_incremental_matcher)
 
-
-    #def _pattern():
-    #    pattern = [["distance","$d",["$a","$b"]], ["rigid", "$r",["$a", "$b"]]]
-    #    return pattern2graph(pattern)
-    #pattern = staticmethod(_pattern)
-    #patterngraph = _pattern()
-
     def __str__(self):
         s =  "MergeDR("+str(self._inputs[0])+"+"+str(self._inputs[1])+"->"+str(self._outputs[0])+")"
         s += "[" + self.status_str()+"]"
@@ -362,11 +347,23 @@ class MergeRR(ClusterMethod):
         self._outputs = [out]
         ClusterMethod.__init__(self)
 
-    def _pattern():
-        pattern = [["rigid","$r1",["$a","$b","$c"]], ["rigid", "$r2", ["$a", "$b", "$c"]]]
-        return pattern2graph(pattern)
-    pattern = staticmethod(_pattern)
-    patterngraph = _pattern()
+    def _incremental_matcher(solver):
+
+        def isthreeconnected(pair):
+            (r1, r2) = pair
+            return popcount(solver.mask(r1) & solver.mask(r2)) >= 3
+
+        def pair2rr(pair):
+            (r1, r2) = pair
+            return MergeRR({"$r1":r1, "$r2":r2})
+        # end def
+        rigids = Rigids(solver)
+        connectedpairs = Connected(solver, rigids)
+        threeconnectedpairs = incremental.Filter(isthreeconnected, connectedpairs)
+        matcher = incremental.Map(pair2rr, threeconnectedpairs)
+        return matcher
+
+    incremental_matcher = staticmethod(_incremental_matcher)
 
     def __str__(self):
         s =  "MergeRR("+str(self._inputs[0])+"+"+str(self._inputs[1])+"->"+str(self._outputs[0])+")"
@@ -391,6 +388,13 @@ class MergeRR(ClusterMethod):
             res = conf1.merge(conf2)
         return [res]
 
+def triplet2ddd(triplet):
+    (d_ab,d_ac,d_bc) = triplet
+    a = list(d_ab.vars.intersection(d_ac.vars))[0]
+    b = list(d_ab.vars.intersection(d_bc.vars))[0]
+    c = list(d_ac.vars.intersection(d_bc.vars))[0]
+    return DeriveDDD({"$d_ab":d_ab, "$d_ac":d_ac, "$d_bc":d_bc, "$a": a, "$b":b, "$c":c})
+
 class DeriveDDD(ClusterMethod):
     """Represents a merging of three distances"""
     def __init__(self, map):
@@ -410,14 +414,12 @@ class DeriveDDD(ClusterMethod):
         # do not remove input clusters (because root not considered here)
         self.noremove = True
 
-    def _pattern():
-        pattern = [["rigid","$d_ab",["$a", "$b"]], 
-            ["rigid", "$d_ac",["$a", "$c"]], 
-            ["rigid", "$d_bc",["$b","$c"]]]
-        return pattern2graph(pattern)
-    pattern = staticmethod(_pattern)
-    patterngraph = _pattern()
-
+    def _incremental_matcher(solver):
+        triplets = DistanceTriplets(solver, Rigids(solver))
+        matcher = incremental.Map(triplet2ddd, triplets)
+        return matcher
+    
+    incremental_matcher = staticmethod(_incremental_matcher)
 
     def __str__(self):
         s =  "DeriveDDD("+str(self._inputs[0])+"+"+str(self._inputs[1])+"+"+str(self._inputs[2])+"->"+str(self._outputs[0])+")"
@@ -467,13 +469,33 @@ class DeriveTTD(ClusterMethod):
         s += "[" + self.status_str()+"]"
         return s
 
-    def _pattern():
-        pattern  = [["rigid","$t_abc",["$a", "$b", "$c"]]]
-        pattern += [["rigid","$t_abd",["$a", "$b", "$d"]]]
-        pattern += [["rigid","$d_cd",["$c", "$d"]]]
-        return pattern2graph(pattern)
-    pattern = staticmethod(_pattern)
-    patterngraph = _pattern()
+    def _incremental_matcher(solver):
+
+        def isttd(triplet):
+            ttd = triplet2ttd(triplet)
+            return isinstance(ttd, DeriveTTD)
+
+        def triplet2ttd(triplet):
+            # try each cluster in the triplet as the distance d_cd
+            for d_cd in triplet:
+                (t_abc, t_abd) = [c for c in triplet if c != d_cd]
+                shared = t_abc.vars.intersection(t_abd.vars)
+                if len(shared) != 2: continue
+                cs = d_cd.vars.intersection(t_abc.vars).difference(shared)
+                ds = d_cd.vars.intersection(t_abd.vars).difference(shared)
+                if len(cs) == 0 or len(ds) == 0: continue
+                (a, b) = shared
+                c = next(iter(cs))
+                d = next(iter(ds))
+                return DeriveTTD({"$t_abc":t_abc, "$t_abd":t_abd, "$d_cd":d_cd, "$a":a, "$b":b, "$c":c, "$d":d})
+            return None
+        # end def
+        triplets = ConnectedTriplets(solver, Rigids(solver))
+        matchtriplets = incremental.Filter(isttd, triplets)
+        matcher = incremental.Map(triplet2ttd, matchtriplets)
+        return matcher
+    
+    incremental_matcher = staticmethod(_incremental_matcher)
 
     def multi_execute(self, inmap):
         diag_print("DeriveTTD.multi_execute called","clmethods")
@@ -517,13 +539,37 @@ class DeriveDAD(ClusterMethod):
         # do not remove input clusters (because root not considered here)
         self.noremove = True
 
-    def _pattern():
-        pattern = [["rigid","$d_ab",["$a", "$b"]], 
-            ["hedgehog", "$a_abc",["$b", "$a", "$c"]], 
-            ["rigid", "$d_bc",["$b","$c"]]]
-        return pattern2graph(pattern)
-    pattern = staticmethod(_pattern)
-    patterngraph = _pattern()
+    def _incremental_matcher(solver):
+        
+        def isdad(triplet):
+            dad = triplet2dad(triplet)
+            return isinstance(dad, DeriveDAD)
+    
+        def triplet2dad(triplet):
+            hogs = [c for c in triplet if isinstance(c, Hedgehog)]
+            rigids= [c for c in triplet if isinstance(c, Rigid)]
+            if not(len(hogs)==1 and len(rigids)==2): return None
+            hog = hogs[0]
+            r1 = rigids[0]
+            r2 = rigids[1]
+            b = hog.cvar
+            if not(b in r1.vars): return None
+            if not(b in r2.vars): return None
+            p1s = r1.vars.intersection(hog.xvars) 
+            p2s = r2.vars.intersection(hog.xvars)
+            if not(len(p1s) == 1): return None
+            if not(len(p2s) == 1): return None
+            a = list(p1s)[0]
+            c = list(p2s)[0]
+            if a==c: return None
+            return DeriveDAD( {"$d_ab":r1, "$a_abc":hog, "$d_bc":r2, "$a":a, "$b":b, "$c":c })
+        # end def
+        triplets = ConnectedTriplets(solver, solver.top_level())
+        matchtriplets = incremental.Filter(isdad, triplets)
+        matcher = incremental.Map(triplet2dad, matchtriplets)
+        return matcher
+    
+    incremental_matcher = staticmethod(_incremental_matcher)
 
     def __str__(self):
         s =  "DeriveDAD("+str(self._inputs[0])+"+"+str(self._inputs[1])+"+"+str(self._inputs[2])+"->"+str(self._outputs[0])+")"
@@ -563,14 +609,43 @@ class DeriveADD(ClusterMethod):
         # do not remove input clusters (because root not considered here)
         self.noremove = True
 
-
-    def _pattern():
-        pattern = [["hedgehog","$a_cab",["$a", "$c", "$b"]], 
-            ["rigid", "$d_ab",["$a", "$b"]], 
-            ["rigid", "$d_bc",["$b","$c"]]]
-        return pattern2graph(pattern)
-    pattern = staticmethod(_pattern)
-    patterngraph = _pattern()
+    def _incremental_matcher(solver):
+        
+        def isadd(triplet):
+            add = triplet2add(triplet)
+            return isinstance(add, DeriveADD)
+    
+        def triplet2add(triplet):
+            hogs = [c for c in triplet if isinstance(c, Hedgehog)]
+            rigids= [c for c in triplet if isinstance(c, Rigid)]
+            if not(len(hogs)==1 and len(rigids)==2): return None
+            hog = hogs[0]
+            r1 = rigids[0]
+            r2 = rigids[1]
+            a = hog.cvar
+            if a in r1.vars and not(a in r2.vars): 
+                d_ab = r1
+                d_bc = r2
+            elif a in r2.vars and not(a in r1.vars):
+                d_ab = r2
+                d_bc = r1
+            else:
+                return None
+            pbs = d_ab.vars.intersection(hog.xvars)
+            if not(len(pbs) == 1): return None
+            b = list(pbs)[0]
+            if not(b in d_bc.vars): return None
+            pcs = d_bc.vars.intersection(hog.xvars).difference([b])
+            if not(len(pcs) == 1): return None
+            c = list(pcs)[0]
+            return DeriveADD( {"$a_cab":hog, "$d_ab":d_ab, "$d_bc":d_bc, "$a":a, "$b":b, "$c":c })
+        # end def
+        triplets = ConnectedTriplets(solver, solver.top_level())
+        matchtriplets = incremental.Filter(isadd, triplets)
+        matcher = incremental.Map(triplet2add, matchtriplets)
+        return matcher
+    
+    incremental_matcher = staticmethod(_incremental_matcher)
 
     def __str__(self):
         s =  "DeriveADD("+str(self._inputs[0])+"+"+str(self._inputs[1])+"+"+str(self._inputs[2])+"->"+str(self._outputs[0])+")"
@@ -609,14 +684,34 @@ class DeriveAA(ClusterMethod):
         # do not remove input clusters (because root not considered here)
         self.noremove = True
 
+    def _incremental_matcher(solver): 
 
-
-    def _pattern():
-        pattern = [["hedgehog","$a_cab",["$a", "$c", "$b"]], 
-            ["hedgehog", "$a_abc",["$b", "$a","$c"]]]
-        return pattern2graph(pattern)
-    pattern = staticmethod(_pattern)
-    patterngraph = _pattern()
+        def isaa(pair):
+            aa = pair2aa(pair)
+            return isinstance(aa, DeriveAA)
+    
+        def pair2aa(pair):
+            (a_cab, a_abc) = pair
+            a = a_cab.cvar
+            b = a_abc.cvar
+            if a == b: 
+                return None
+            if a not in a_abc.xvars:
+                return None
+            if b not in a_cab.xvars:
+                return None
+            cs = a_cab.xvars.intersection(a_abc.xvars).difference([a,b])
+            if len(cs) != 1:
+                return None
+            c = list(cs)[0]
+            return DeriveAA( {"$a_cab":a_cab, "$a_abc":a_abc, "$a":a, "$b":b, "$c":c })
+        # end def
+        pairs = Connected(solver, Hogs(solver))
+        matchpairs = incremental.Filter(isaa, pairs)
+        matcher = incremental.Map(pair2aa, matchpairs)
+        return matcher
+    
+    incremental_matcher = staticmethod(_incremental_matcher)
 
     def __str__(self):
         s =  "DeriveAA("+str(self._inputs[0])+"+"+str(self._inputs[1])+"->"+str(self._outputs[0])+")"
@@ -649,11 +744,22 @@ class MergeSR(ClusterMethod):
         self._outputs = [out]
         ClusterMethod.__init__(self)
 
-    def _pattern():
-        pattern = [["rigid","$r",["$a","$b"]], ["balloon", "$s", ["$a", "$b"]]]
-        return pattern2graph(pattern)
-    pattern = staticmethod(_pattern)
-    patterngraph = _pattern()
+    def _incremental_matcher(solver):
+        
+        def istwoconnected(r_s):
+            (r, s) = r_s
+            return popcount(solver.mask(r) & solver.mask(s)) >= 2
+
+        def pair2sr(r_s):
+            (r, s) = r_s
+            return MergeSR({"$r":r, "$s":s})
+        # end def
+        connectedpairs = ConnectedPairs(solver, Rigids(solver), Balloons(solver))
+        twoconnectedpairs = incremental.Filter(istwoconnected, connectedpairs)
+        matcher = incremental.Map(pair2sr, twoconnectedpairs)
+        return matcher
+    
+    incremental_matcher = staticmethod(_incremental_matcher)
 
     def __str__(self):
         s =  "MergeSR("+str(self._inputs[0])+"+"+str(self._inputs[1])+"->"+str(self._outputs[0])+")"
@@ -678,7 +784,7 @@ def solve_ddd_3D(v1,v2,v3,d12,d23,d31):
         d<xy>: numeric distance values
         a<xyz>: numeric angle in radians
     """
-    diag_print("solve_ddd: %s %s %s %f %f %f"%(v1,v2,v3,d12,d23,d31),"clmethods")
+    diag_print("solve_ddd: %s %s %s %f %f %f", "clmethods", v1, v2, v3, d12, d23, d31)
     # solve in 2D
     p1 = vector.vector([0.0,0.0])
     p2 = vector.vector([d12,0.0])
@@ -694,7 +800,7 @@ def solve_ddd_3D(v1,v2,v3,d12,d23,d31):
     # return only one solution (if any)
     if len(solutions) > 0:
         solutions = [solutions[0]]
-    diag_print("solve_ddd solutions"+str(solutions),"clmethods")
+    diag_print("solve_ddd solutions%s", "clmethods", solutions)
     return solutions
 
 def solve_dad_3D(v1,v2,v3,d12,a123,d23):
@@ -703,7 +809,7 @@ def solve_dad_3D(v1,v2,v3,d12,a123,d23):
         d<xy>: numeric distance values
         a<xyz>: numeric angle in radians
     """
-    diag_print("solve_dad: %s %s %s %f %f %f"%(v1,v2,v3,d12,a123,d23),"clmethods")
+    diag_print("solve_dad: %s %s %s %f %f %f", "clmethods", v1, v2, v3, d12, a123, d23)
     p2 = vector.vector([0.0, 0.0])
     p1 = vector.vector([d12, 0.0])
     p3s = [ vector.vector([d23*math.cos(a123), d23*math.sin(a123)]) ]
@@ -724,7 +830,7 @@ def solve_add_3D(a,b,c, a_cab, d_ab, d_bc):
         a<xyz>: numeric angle in radians
     """
 
-    diag_print("solve_dad: %s %s %s %f %f %f"%(a,b,c,a_cab,d_ab,d_bc),"clmethods")
+    diag_print("solve_dad: %s %s %s %f %f %f", "clmethods", a, b, c, a_cab, d_ab, d_bc)
     p_a = vector.vector([0.0,0.0])
     p_b = vector.vector([d_ab,0.0])
     dir = vector.vector([math.cos(-a_cab),math.sin(-a_cab)])
@@ -744,7 +850,7 @@ def solve_ada_3D(a, b, c, a_cab, d_ab, a_abc):
         d<xy>: numeric distance values
         a<xyz>: numeric angle in radians
     """
-    diag_print("solve_ada: %s %s %s %f %f %f"%(a,b,c,a_cab,d_ab,a_abc),"clmethods")
+    diag_print("solve_ada: %s %s %s %f %f %f", "clmethods", a, b, c, a_cab, d_ab, a_abc)
     p_a = vector.vector([0.0,0.0])
     p_b = vector.vector([d_ab, 0.0])
     dir_ac = vector.vector([math.cos(-a_cab),math.sin(-a_cab)])
@@ -780,13 +886,13 @@ def solve_3p3d(v1,v2,v3,v4,p1,p2,p3,d14,d24,d34):
         d<xy>: numeric distance value
         a<xyz>: numeric angle in radians
     """
-    diag_print("solve_3p3d: %s %s %s %s "%(v1,v2,v3,v4),"clmethods")
-    diag_print("p1="+str(p1),"clsolver3D")
-    diag_print("p2="+str(p2),"clsolver3D")
-    diag_print("p3="+str(p3),"clsolver3D")
-    diag_print("d14="+str(d14),"clsolver3D")
-    diag_print("d24="+str(d24),"clsolver3D")
-    diag_print("d34="+str(d34),"clsolver3D")
+    diag_print("solve_3p3d: %s %s %s %s ", "clmethods", v1, v2, v3, v4)
+    diag_print("p1=%s", "clsolver3D", p1)
+    diag_print("p2=%s", "clsolver3D", p2)
+    diag_print("p3=%s", "clsolver3D", p3)
+    diag_print("d14=%s", "clsolver3D", d14)
+    diag_print("d24=%s", "clsolver3D", d24)
+    diag_print("d34=%s", "clsolver3D", d34)
     p4s = sss_int(p1,d14,p2,d24,p3,d34)
     solutions = []
     for p4 in p4s:
@@ -799,7 +905,7 @@ def solve_3p3d(v1,v2,v3,v4,p1,p2,p3,d14,d24,d34):
 class Connected(incremental.IncrementalSet):
     
     def __init__(self, solver, incrset):
-        """Creates an incremental set of all pairs of connected clusters in incrset, according to solver"""
+        """Creates an incremental set of all pairs of connected clusters in incrset, according to solver."""
         self._solver = solver
         self._incrset = incrset
         incremental.IncrementalSet.__init__(self, [incrset])
@@ -808,7 +914,7 @@ class Connected(incremental.IncrementalSet):
     def _receive_add(self,source, obj):
         connected = set()
         for var in obj.vars:
-            dependend = self._solver.find_dependend(var)
+            dependend = self._solver.find_top_level(var)
             dependend = [x for x in dependend if x in self._incrset]
             connected.update(dependend)
         connected.remove(obj)
@@ -832,7 +938,7 @@ class Connected(incremental.IncrementalSet):
 class ConnectedPairs(incremental.IncrementalSet):
     
     def __init__(self, solver, incrset1, incrset2):
-        """Creates an incremental set of all pairs (c1, c2) from incrset1 and incrset2 respectively, that are connected according to solver"""
+        """Creates an incremental set of all pairs (c1, c2) from incrset1 and incrset2 respectively, that are connected according to solver."""
         self._solver = solver
         self._incrset1 = incrset1
         self._incrset2 = incrset2
@@ -842,7 +948,7 @@ class ConnectedPairs(incremental.IncrementalSet):
     def _receive_add(self,source, obj):
         connected = set()
         for var in obj.vars:
-            dependend = self._solver.find_dependend(var)
+            dependend = self._solver.find_top_level(var)
             if source == self._incrset1:
                 dependend = [x for x in dependend if x in self._incrset2]
             elif source == self._incrset2:
@@ -891,6 +997,42 @@ class Rigids(incremental.Filter):
 
 
 
+class Hogs(incremental.Filter):
+    
+    def __init__(self, solver): 
+        self._solver = solver
+        incremental.Filter.__init__(self, lambda c: isinstance(c, Hedgehog), self._solver.top_level())
+
+    def __hash__(self):
+        return hash((self.__class__, self._solver))
+
+    def __eq__(self, other):
+        if isinstance(other, self.__class__):
+            return self._solver == other._solver
+        else:
+            return False
+
+    def __repr__(self):
+        return "Hogs("+repr(self._solver)+")"
+
+class Balloons(incremental.Filter):
+    
+    def __init__(self, solver): 
+        self._solver = solver
+        incremental.Filter.__init__(self, lambda c: isinstance(c, Balloon), self._solver.top_level())
+
+    def __hash__(self):
+        return hash((self.__class__, self._solver))
+
+    def __eq__(self, other):
+        if isinstance(other, self.__class__):
+            return self._solver == other._solver
+        else:
+            return False
+
+    def __repr__(self):
+        return "Balloons("+repr(self._solver)+")"
+
 class Points(incremental.Filter):
     
     def __init__(self, solver): 
@@ -929,5 +1071,103 @@ class Distances(incremental.Filter):
     def __repr__(self):
         return "Distances("+repr(self._solver)+")"
 
+class DistanceTriplets(incremental.IncrementalSet):
+    
+    def __init__(self, solver, incrset):
+        """Creates an incremental set of all tripltes of 1-connected clusters in incrset, according to solver."""
+        self._solver = solver
+        self._incrset = incrset
+        incremental.IncrementalSet.__init__(self, [incrset])
+        return 
+
+    def _receive_add(self,source, obj):
+        connected = set()
+        for var in obj.vars:
+            dependend = self._solver.find_top_level(var)
+            dependend = [x for x in dependend if x in self._incrset]
+            dependend = [x for x in dependend if popcount(self._solver.mask(x) & self._solver.mask(obj))==1]
+            connected.update(dependend)
+        if obj in connected:
+            connected.remove(obj)
+        obj1 = obj
+        if len(connected) >= 2:
+            l = list(connected)
+            for i in range(len(l)):
+                obj2 = l[i]
+                shared12 = self._solver.mask(obj1) & self._solver.mask(obj2)
+                for j in range(i):
+                    obj3 = l[j]
+                    shared23 = self._solver.mask(obj2) & self._solver.mask(obj3)
+                    if popcount(shared23)==1:
+                        shared13 = self._solver.mask(obj1) & self._solver.mask(obj3)
+                        shared = shared12 | shared23 | shared13
+                        if popcount(shared)==3: 
+                            self._add(frozenset((obj1,obj2,obj3)))
+
+    def _receive_remove(self,source, obj):
+        for frozen in list(self):
+            if obj in frozen:
+                self._remove(frozen)
+
+    def __eq__(self, other):
+        if isinstance(other, self.__class__):
+            return self._solver == other._solver and self._incrset == other._incrset
+        else:
+            return False
+
+    def __hash__(self):
+        return hash((self.__class__, self._solver, self._incrset))
 
+    def __repr__(self):
+        return "DistanceTriplets("+repr(self._solver)+","+repr(self._incrset)+")"
 
+
+class ConnectedTriplets(incremental.IncrementalSet):
+    
+    def __init__(self, solver, incrset):
+        """Creates an incremental set of all triplets of connected clusters in incrset, according to solver."""
+        self._solver = solver
+        self._incrset = incrset
+        incremental.IncrementalSet.__init__(self, [incrset])
+        return 
+
+    def _receive_add(self,source, obj):
+        connected = set()
+        for var in obj.vars:
+            dependend = self._solver.find_top_level(var)
+            dependend = [x for x in dependend if x in self._incrset]
+            dependend = [x for x in dependend if popcount(self._solver.mask(x) & self._solver.mask(obj))>=1]
+            connected.update(dependend)
+        if obj in connected:
+            connected.remove(obj)
+        obj1 = obj
+        if len(connected) >= 2:
+            l = list(connected)
+            for i in range(len(l)):
+                obj2 = l[i]
+                shared12 = self._solver.mask(obj1) & self._solver.mask(obj2)
+                for j in range(i):
+                    obj3 = l[j]
+                    shared23 = self._solver.mask(obj2) & self._solver.mask(obj3)
+                    if popcount(shared23)>=1:
+                        shared13 = self._solver.mask(obj1) & self._solver.mask(obj3)
+                        shared = shared12 | shared23 | shared13
+                        if popcount(shared)>=3: 
+                            self._add(frozenset((obj1,obj2,obj3)))
+
+    def _receive_remove(self,source, obj):
+        for frozen in list(self):
+            if obj in frozen:
+                self._remove(frozen)
+
+    def __eq__(self, other):
+        if isinstance(other, self.__class__):
+            return self._solver == other._solver and self._incrset == other._incrset
+        else:
+            return False
+
+    def __hash__(self):
+        return hash((self.__class__, self._solver, self._incrset))
+
+    def __repr__(self):
+        return "ConnectedTriplets("+repr(self._solver)+","+repr(self._incrset)+")"
@@ -3,6 +3,15 @@ types are Rigids, Hedgehogs and Balloons. """
 
 from .multimethod import MultiVariable
 
+# ----- variable bitmasks (see ClusterSolver.mask) -----
+
+def popcount(mask):
+    """returns the number of bits set in mask, i.e. the number of variables"""
+    return bin(mask).count("1")
+
+if hasattr(int, "bit_count"):
+    popcount = int.bit_count
+
 class Distance:
     """A Distance represents an unknown distance between two points"""
 
@@ -271,6 +280,89 @@ def over_constraints(c1, c2):
     """returns the over-constraints (duplicate distances and angles) for
        a pair of clusters."""
     return over_distances(c1,c2).union(over_angles(c1,c2))    
+
+def iter_over_constraints(c1, c2):
+    """iterates over the over-constraints (duplicate distances and angles) for 
+       a pair of clusters, without creating them all at once. 
+       Generates the same Distances and Angles as over_constraints."""
+    if isinstance(c1, Rigid) and isinstance(c2, Rigid):
+        shared = list(set(c1.vars).intersection(c2.vars))
+        for i in range(len(shared)):
+            for j in range(i):
+                yield Distance(shared[i], shared[j])
+    (kind, cvar, shared) = _shared_angle_vars(c1, c2)
+    if kind == "triples":
+        for i in range(len(shared)):
+            for j in range(i+1, len(shared)):
+                for k in range(j+1, len(shared)):
+                    v1 = shared[i]
+                    v2 = shared[j]
+                    v3 = shared[k]
+                    yield Angle(v1,v2,v3)
+                    yield Angle(v2,v3,v1)
+                    yield Angle(v3,v1,v2)
+    elif kind == "pairs":
+        for i in range(len(shared)):
+            for j in range(i+1, len(shared)):
+                yield Angle(shared[i], cvar, shared[j])
+    elif kind == "hedgehogs":
+        for i in range(len(shared)):
+            for j in range(i):
+                yield Angle(shared[i], cvar, shared[j])
+
+def num_over_distances(c1, c2):
+    """returns the number of duplicate distances in a pair of clusters"""
+    if isinstance(c1, Rigid) and isinstance(c2, Rigid):
+        k = len(c1.vars.intersection(c2.vars))
+        return k*(k-1)//2
+    else:
+        return 0
+
+def num_over_angles(c1, c2):
+    """returns the number of duplicate angles in a pair of clusters"""
+    (kind, cvar, shared) = _shared_angle_vars(c1, c2)
+    k = len(shared)
+    if kind == "triples":
+        return 3*(k*(k-1)*(k-2)//6)
+    elif kind == "pairs" or kind == "hedgehogs":
+        return k*(k-1)//2
+    else:
+        return 0
+
+def num_over_constraints(c1, c2):
+    """returns the number of over-constraints (duplicate distances and angles) 
+       in a pair of clusters, i.e. len(over_constraints(c1, c2))"""
+    return num_over_distances(c1, c2) + num_over_angles(c1, c2)
+
+def _shared_angle_vars(c1, c2):
+    """classifies the duplicate angles in a pair of clusters. Returns a tuple 
+       (kind, cvar, shared), where kind is "triples" if all angles in all triples of 
+       shared variables are duplicate, "pairs" or "hedgehogs" if the angles between all 
+       pairs of shared variables at center variable cvar are duplicate, or None if there 
+       are no duplicate angles. Same cases and same order of shared variables as 
+       over_angles."""
+    if isinstance(c1,Rigid) or isinstance(c1,Balloon):
+        if isinstance(c2,Rigid) or isinstance(c2,Balloon):
+            return ("triples", None, list(set(c1.vars).intersection(c2.vars)))
+        elif isinstance(c2,Hedgehog):
+            return _shared_angle_vars_ch(c1, c2)
+    elif isinstance(c1,Hedgehog):
+        if isinstance(c2,Rigid) or isinstance(c2,Balloon):
+            return _shared_angle_vars_ch(c2, c1)
+        elif isinstance(c2,Hedgehog):
+            if c1.cvar == c2.cvar:
+                return ("hedgehogs", c1.cvar, list(set(c1.xvars).intersection(c2.xvars)))
+            else:
+                return (None, None, [])
+    if isinstance(c1,Glueable) or isinstance(c2,Glueable):
+        return (None, None, [])
+    raise Exception("unexpected case")
+
+def _shared_angle_vars_ch(cluster, hog):
+    if hog.cvar in cluster.vars:
+        return ("pairs", hog.cvar, list(set(cluster.vars).intersection(hog.xvars)))
+    else:
+        return (None, None, [])
     
 def over_angles(c1, c2):
     """determine set of angles in c1 and c2"""
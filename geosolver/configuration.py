@@ -32,6 +32,8 @@ class Configuration:
         elif self.dimension < 2 or self.dimension > 3:
             raise Exception("no support for "+str(self.dimension)+"-dimensional configurations")
         self.makehash()
+        self._invariant = None
+        self._bucket = None
 
     def copy(self):
         """returns a shallow copy"""
@@ -49,31 +51,41 @@ class Configuration:
 
     def transform(self, t):
         """returns a new configuration, which is this one transformed by matrix t"""
+        # unpack the homogeneous matrix once, instead of a matrix product per point
+        rows = [list(row) for row in t]
+        affine = rows[-1][:-1] == [0.0] * self.dimension and rows[-1][-1] == 1.0
         newmap = {}
-        for v in self.map:
-            p = self.map[v]
-            ph = Vec(p)
-            ph.append(1.0)
-            ph = t.mmul(ph)
-            p = vector.vector(ph[0:-1]) / ph[-1]
-            newmap[v] = p
+        if self.dimension == 2:
+            ((a, b, c), (d, e, f), (g, h, i)) = rows
+            for v in self.map:
+                (x, y) = self.map[v]
+                if affine:
+                    w = 1.0
+                else:
+                    w = g*x + h*y + i
+                newmap[v] = vector.vector([(a*x + b*y + c)/w, (d*x + e*y + f)/w])
+        else:
+            ((a, b, c, d), (e, f, g, h), (i, j, k, l), (m, n, o, p)) = rows
+            for v in self.map:
+                (x, y, z) = self.map[v]
+                if affine:
+                    w = 1.0
+                else:
+                    w = m*x + n*y + o*z + p
+                newmap[v] = vector.vector([(a*x + b*y + c*z + d)/w, 
+                                           (e*x + f*y + g*z + h)/w, 
+                                           (i*x + j*y + k*z + l)/w])
         return Configuration(newmap)
 
     def add(self, other):
         """return a new configuration which is this configuration extended with all points in c not in this configuration"""
-        newmap = {}
-        for v in self.map:
-            newmap[v] = self.map[v]
-        for v in other.map:
-            if v not in newmap:
-                newmap[v] = other.map[v]
+        newmap = dict(other.map)
+        newmap.update(self.map)
         return Configuration(newmap)
 
     def select(self, vars):
         """return a new configuration that is a subconfiguration of this configuration, containing only the selected variables"""
-        newmap = {}
-        for v in vars:
-            newmap[v] = self.map[v]
+        newmap = dict([(v, self.map[v]) for v in vars])
         return Configuration(newmap)
     
     def merge(self, other):
@@ -276,9 +288,9 @@ class Configuration:
             p2o = other.map[v2]
             scale = vector.norm(p2s-p1s) / vector.norm(p2o-p1o)
             scale_trans = pivot_scale_3D(p1o,scale)
-            diag_print("scale_trans = "+str(scale_trans),"Configuration.merge_scale_transform_3D")
+            diag_print("scale_trans = %s", "Configuration.merge_scale_transform_3D", scale_trans)
             merge_trans = self._merge_transform_3D(other)
-            diag_print("merge_trans = "+str(merge_trans),"Configuration.merge_scale_transform_3D")
+            diag_print("merge_trans = %s", "Configuration.merge_scale_transform_3D", merge_trans)
             #merge_scale_trans = scale_trans.mmul(merge_trans)
             merge_scale_trans = merge_trans.mmul(scale_trans)
             merge_scale_trans.underconstrained = merge_trans.underconstrained
@@ -296,6 +308,14 @@ class Configuration:
             for var in self.map:
                 if var not in other.map:
                     return False
+            # cheap test first: distances to centroid must match 
+            # (if all points match within tolerance, the centroids do too, 
+            # so these distances may differ by twice the tolerance)
+            inv1 = self.invariant()
+            inv2 = other.invariant()
+            for var in self.map:
+                if not tol_eq(inv1[var], inv2[var], 2*default_tol):
+                    return False
             # determine a rotation-translation transformation 
             # to transform other onto self
             t = self.merge_transform(other)
@@ -307,6 +327,41 @@ class Configuration:
                     return False
             return True 
     
+    def invariant(self):
+        """returns a map from variables to their distance to the centroid of the
+           configuration, which is invariant under rotation and translation. 
+           Computed when first needed.
+        """
+        if self._invariant == None:
+            n = len(self.map)
+            centroid = [0.0] * self.dimension
+            for p in self.map.values():
+                for i in range(self.dimension):
+                    centroid[i] += p[i]
+            centroid = [c / n for c in centroid]
+            self._invariant = {}
+            for var in self.map:
+                p = self.map[var]
+                d2 = 0.0
+                for i in range(self.dimension):
+                    d2 += (p[i] - centroid[i])**2
+                self._invariant[var] = math.sqrt(d2)
+        return self._invariant
+
+    def bucket(self):
+        """returns an integer based on the invariant, such that the buckets of 
+           equal configurations differ by at most one. The hash cannot include it, 
+           because configurations on either side of a bucket boundary may be equal
+           (see distinct in module multimethod).
+        """
+        if self._bucket == None:
+            # equal configurations pass the invariant test in __eq__, 
+            # so their sums differ by at most the width of a bucket
+            invariant = self.invariant()
+            width = 2*default_tol*len(invariant)
+            self._bucket = int(math.floor(sum(invariant.values()) / width))
+        return self._bucket
+
     def makehash(self):
         """the hash is based only on variable names (not values)"""
         val = 0
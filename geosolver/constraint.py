@@ -23,7 +23,7 @@ Changes:
 24 Nov 2004 - added semi-abstract implementation for Constraint.variables()
 """
 
-from .graph import Graph
+from .graph import Graph, IndexedGraph
 from .notify import Notifier
 
 def _strseq(seq):
@@ -82,7 +82,7 @@ class ConstraintGraph(Notifier):
         """A set of variables"""
         self._constraints = {}
         """A set of constraints"""
-        self._graph = Graph()
+        self._graph = IndexedGraph()
         """A graph for fast navigation. The graph contains an
            edge from a var to a constraint if the constraint is imposed
            on that variable""" 
@@ -162,6 +162,14 @@ class ConstraintGraph(Notifier):
         #for
         return l;
 
+    def connected_subsets(self):
+        """get a list of sets of variables, connected by constraints. 
+           Each variable is in exactly one set."""
+        subsets = []
+        for subset in self._graph.connected_subsets():
+            subsets.append(frozenset([x for x in subset if x in self._variables]))
+        return subsets
+
     def __str__(self):
         s = "ConstraintGraph(variables=["
         s += _strseq(list(self._variables.keys()))
@@ -5,6 +5,17 @@
    Only when the code argument in diag_print matches the regular expression diag_codes, 
    then the message is printed. Messages are printed to diag_stream, which defaults to 
    sys.stdout. 
+
+   Messages are formatted lazily, i.e. only when they are printed. Any extra 
+   arguments of diag_print are substituted in the message with the % operator, 
+   and if the message is callable, it is called to produce the message string. 
+   So, on hot paths, write diag_print("search from %s", "clsolver", cluster) 
+   instead of diag_print("search from "+str(cluster), "clsolver").
+
+   Messages also have a level (default 1). For each code, a maximum level can 
+   be set with diag_level. Messages with a higher level are not printed.  
+   Whether a code is enabled is cached, so for disabled codes diag_print 
+   costs only a dictionary lookup.
 """
 
 import sys
@@ -13,23 +24,61 @@ import re
 # diag_selector = re.compile(".*")
 diag_selector = re.compile("nothing")
 diag_stream = sys.stdout
+# maximum level of printed messages, for all codes and for specific codes 
+diag_default_level = 1
+diag_levels = {}
+# cache, maps codes to maximum level of printed messages (0 if not selected)
+_diag_enabled = {}
 
 def diag_select(pattern):
     """Set regexp pattern to filter which messages are printed.""" 
     global diag_selector 
     diag_selector = re.compile(pattern)
+    _diag_enabled.clear()
 
 def diag_direct(stream):
     """set stream to which messages are printed"""
     global diag_stream
     diag_stream = stream
 
-def diag_print(str, code=''):
-    global diag_selector
-    global diag_stream
-    if diag_selector.match(code):
-        diag_stream.write(str)
-        diag_stream.write("\n")
+def diag_level(level, code=None):
+    """Set the maximum level of printed messages, for given code or, 
+       if no code given, for all codes without a specific level."""
+    global diag_default_level
+    if code == None:
+        diag_default_level = level
+    else:
+        diag_levels[code] = level
+    _diag_enabled.clear()
+
+def diag_enabled(code='', level=1):
+    """Returns True iff messages with given code and level are printed.
+       Use to guard expensive computations that are only needed for diagnostics."""
+    try:
+        return level <= _diag_enabled[code]
+    except KeyError:
+        if diag_selector.match(code):
+            _diag_enabled[code] = diag_levels.get(code, diag_default_level)
+        else:
+            _diag_enabled[code] = 0
+        return level <= _diag_enabled[code]
+
+def diag_print(str, code='', *args, level=1):
+    """Print a message, if enabled for the given code and level. 
+       The message is formatted with the given arguments, or, if 
+       it is callable, the message is the result of calling it."""
+    try:
+        if level > _diag_enabled[code]:
+            return
+    except KeyError:
+        if not diag_enabled(code, level):
+            return
+    if args:
+        str = str % args
+    elif callable(str):
+        str = str()
+    diag_stream.write(str)
+    diag_stream.write("\n")
 
 
 def _gen_messages():
@@ -55,5 +104,11 @@ def _test():
     diag_select(".*")
     _gen_messages()
 
+    print("Lazy messages, group1 at level 0:")
+    diag_level(0, "group1")
+    diag_print("Message %d of %s", "group1", 6, "group1")
+    diag_print(lambda: "Message "+str(7), "group2")
+    diag_level(1, "group1")
+
 
 if __name__ == "__main__": _test()
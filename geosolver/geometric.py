@@ -3,6 +3,7 @@ problems incrementally."""
 
 from . import vector
 import math
+import contextlib
 from .clsolver import PrototypeMethod, SelectionMethod
 from .clsolver3D import ClusterSolver3D 
 from .clsolver2D import ClusterSolver2D 
@@ -10,6 +11,7 @@ from .cluster import *
 from .selconstr import SelectionConstraint
 from .configuration import Configuration 
 from .diagnostic import diag_print
+from .plancache import problem_signature
 from .constraint import Constraint, ConstraintGraph
 from .notify import Notifier, Listener
 from .tolerance import tol_eq
@@ -52,13 +54,29 @@ class GeometricProblem (Notifier, Listener):
         self.prototype = {}             # mapping from variables to prototypes
         self.cg = ConstraintGraph()     # constraint graph
         self.use_prototype = use_prototype;     # whether to use prototype for solution selection
+        self._transaction = None        # queued notifications during a transaction, or None 
+        self._transaction_depth = 0     # number of nested transactions
+
+    def __getstate__(self):
+        """when pickling... do not save listeners and notifiers"""
+        dict = self.__dict__.copy()
+        del dict['listeners']
+        del dict['notifiers']
+        return dict
+
+    def __setstate__(self, dict):
+        """when unpickling... create new listeners and notifiers, listen to constraints again"""
+        Notifier.__setstate__(self, dict)
+        Listener.__setstate__(self, dict)
+        for con in self.cg.constraints():
+            if isinstance(con, ParametricConstraint):
+                con.add_listener(self)
 
     # ----------- prototype --------
 
     def set_prototype_selection(self, enabled):
         """Enable (True, the default) or disable (False) use of prototype for solution selection"""
         self.use_prototype = enabled
-        self.dr.set_prototype_selection(self.use_prototype)
         self.send_notify(("set_prototype_selection", self.use_prototype))
 
     def get_prototype_selection(self):
@@ -161,7 +179,7 @@ class GeometricProblem (Notifier, Listener):
         else:
             raise Exception("unsupported constraint type")
         # passed tests, add to poblem
-        if isinstance(self, ParametricConstraint):
+        if isinstance(con, ParametricConstraint):
             con.add_listener(self)
         self.cg.add_constraint(con)
 
@@ -252,10 +270,10 @@ class GeometricProblem (Notifier, Listener):
                         solved = False
                         break
                 if not solved:
-                    diag_print(str(con)+" not solved", "GeometricProblem.verify")
+                    diag_print("%s not solved", "GeometricProblem.verify", con)
                     sat = False
                 elif not con.satisfied(solution):
-                    diag_print(str(con)+" not satisfied", "GeometricProblem.verify")
+                    diag_print("%s not satisfied", "GeometricProblem.verify", con)
                     sat = False
         return sat
        
@@ -272,6 +290,8 @@ class GeometricProblem (Notifier, Listener):
         if con in self.cg.constraints():
             if isinstance(con, SelectionConstraint): 
                 self.send_notify(("rem_selection_constraint", con))
+            if isinstance(con, ParametricConstraint):
+                con.rem_listener(self)
             self.cg.rem_constraint(con)
         else:
             raise Exception("no constraint "+str(con)+" in problem.")
@@ -285,6 +305,57 @@ class GeometricProblem (Notifier, Listener):
         #elif object == self.cg:
         #    self.send_notify(notify)
 
+    # ----------- transactions --------
+
+    def begin_transaction(self):
+        """Start a transaction. Changes to the problem, its constraint graph and parameters 
+           are not passed on to listeners (e.g. a GeometricSolver) until commit is called. 
+           Transactions may be nested; changes are passed on when the outermost one is committed.
+        """
+        if self._transaction_depth == 0:
+            self._transaction = []
+            self.hold_notify(self._transaction)
+            self.cg.hold_notify(self._transaction)
+        self._transaction_depth += 1
+
+    def commit(self):
+        """End a transaction. All changes since begin_transaction are passed on to listeners, 
+           except redundant changes (see _coalesce_notifications). 
+           Listeners are notified of ("begin_commit", None) and ("end_commit", None) 
+           before and after the changes.
+        """
+        if self._transaction_depth == 0:
+            raise Exception("no transaction to commit")
+        self._transaction_depth -= 1
+        if self._transaction_depth > 0:
+            return
+        self.release_notify()
+        self.cg.release_notify()
+        queue = self._transaction
+        self._transaction = None
+        messages = _coalesce_notifications(queue, self)
+        diag_print("commit %d of %d notifications", "GeometricProblem", len(messages), len(queue))
+        self.send_notify(("begin_commit", None))
+        for (source, message) in messages:
+            source.send_notify(message)
+        self.send_notify(("end_commit", None))
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """Returns a context manager for a transaction, e.g. 
+        
+            with problem.transaction():
+                problem.set_prototype(p, vector([1.0, 0.0]))
+                distance.set_parameter(5.0)
+           
+           The transaction is committed when leaving the with-block, also if an exception is raised. 
+        """
+        self.begin_transaction()
+        try:
+            yield self
+        finally:
+            self.commit()
+
     def __str__(self):
         s = ""
         for v in self.prototype:
@@ -296,6 +367,68 @@ class GeometricProblem (Notifier, Listener):
  
 #class GeometricProblem
 
+def _coalesce_notifications(queue, problem):
+    """Returns the (notifier, message) tuples queued during a transaction on a problem, 
+       without redundant messages:
+        - a constraint removed and added again (or added and removed) in the transaction
+          is not removed and added; if parametric, only its parameter is updated,
+        - only the last change of the parameter of a constraint, and the last change of 
+          the prototype of a variable, is passed on,
+        - changes of constraints and variables no longer in the problem are not passed on. 
+    """
+    messages = list(queue)
+    # cancel pairs of rem_constraint and add_constraint (or vice versa)
+    added = {}
+    removed = {}
+    for i in range(len(messages)):
+        (source, (type, data)) = messages[i]
+        if source != problem.cg:
+            continue
+        if type == "rem_constraint":
+            if data in added:
+                messages[added.pop(data)] = None
+                messages[i] = None
+            else:
+                removed[data] = i
+        elif type == "add_constraint":
+            if data in removed:
+                messages[removed.pop(data)] = None
+                if isinstance(data, ParametricConstraint):
+                    messages[i] = (problem, ("set_parameter", (data, data.get_parameter())))
+                else:
+                    messages[i] = None
+            else:
+                added[data] = i
+        elif type == "add_variable" or type == "rem_variable":
+            # constraints on a removed or added variable cannot be cancelled 
+            for con in [c for c in added if data in c.variables()]:
+                del added[con]
+            for con in [c for c in removed if data in c.variables()]:
+                del removed[con]
+    # keep only the last parameter and prototype changes 
+    constraints = set(problem.cg.constraints())
+    updated = set()
+    for i in reversed(range(len(messages))):
+        if messages[i] == None:
+            continue
+        (source, (type, data)) = messages[i]
+        if source != problem:
+            continue
+        if type == "set_parameter":
+            (con, value) = data
+            if con in updated or con not in constraints:
+                messages[i] = None
+            else:
+                updated.add(con)
+        elif type == "set_prototype":
+            (var, prototype) = data
+            if var in updated or not problem.has_variable(var):
+                messages[i] = None
+            else:
+                updated.add(var)
+    return [m for m in messages if m != None]
+
+
 
 # ---------- GeometricSolver --------------
 
@@ -305,11 +438,16 @@ class GeometricSolver (Listener):
     """
 
     # public methods
-    def __init__(self, problem):
+    def __init__(self, problem, cache=None, solve=True):
         """Create a new GeometricSolver instance
         
            keyword args
             problem        - the GeometricProblem instance to be monitored for changes
+            cache          - a PlanCache, used to re-use the decompositions of 
+                             structurally identical problems (optional) 
+            solve          - if False, the problem is decomposed but not solved, as if 
+                             begin_bulk was called. Solutions can be sampled or enumerated 
+                             with get_solution_space, or computed by calling end_bulk.
         """
         # init superclasses
         Listener.__init__(self)
@@ -331,11 +469,15 @@ class GeometricSolver (Listener):
         
         # a map from problem variables and constraints to clusters, and vice versa
         self._map = {}
+
+        # a compiled plan of the decomposition, for batch evaluation (None if outdated)
+        self._plan = None
         
         # enable prototype based selection by default
         self._set_prototype_selection(problem.get_prototype_selection())
 
         # register 
+        self.problem.add_listener(self)
         self.cg.add_listener(self)
         self.dr.add_listener(self)
 
@@ -343,6 +485,16 @@ class GeometricSolver (Listener):
         self.fixvars = []
         self.fixcluster = None
 
+        # load problem in bulk: propagate once, after all constraints are added
+        self.begin_bulk()
+
+        # replay cached decomposition, if any
+        if cache != None:
+            signature = problem_signature(problem)
+            trace = cache.lookup(signature)
+            if trace != None:
+                self.dr.begin_replay(trace)
+
         # add variables
         for var in self.cg.variables():
             self._add_variable(var)
@@ -372,6 +524,44 @@ class GeometricSolver (Listener):
         for con in toadd:
             self._add_constraint(con)
 
+        # finish replay or store new decomposition in cache
+        if cache != None:
+            if trace != None:
+                self.dr.end_replay()
+            elif self.dr.get_trace() != None:
+                cache.store(signature, self.dr.get_trace())
+
+        # solve the decomposition
+        if solve:
+            self.end_bulk()
+
+    def __getstate__(self):
+        """when pickling... do not save notifiers and compiled plan.
+           See the snapshot module for saving and loading solvers."""
+        dict = Listener.__getstate__(self)
+        dict['_plan'] = None
+        return dict
+
+    def __setstate__(self, dict):
+        """when unpickling... register with problem, constraint graph and cluster solver again"""
+        Listener.__setstate__(self, dict)
+        self.problem.add_listener(self)
+        self.cg.add_listener(self)
+        self.dr.add_listener(self)
+
+    def begin_bulk(self):
+        """Start loading changes to the problem in bulk. 
+        
+           Variables and constraints added to the problem after begin_bulk are 
+           decomposed as usual, but solved only once, when end_bulk is called, 
+           instead of after each change. Results are outdated until then.
+        """
+        self.dr.begin_bulk()
+
+    def end_bulk(self):
+        """Decompose and solve all changes made to the problem since begin_bulk."""
+        self.dr.end_bulk()
+
     def get_constrainedness(self):
         """Depricated. Use get_status instead"""
         return self.get_status()
@@ -474,16 +664,74 @@ class GeometricSolver (Listener):
         # find top level rigid and all its configurations
         rigids = [c for c in self.dr.top_level() if isinstance(c, Rigid)]
         if len(rigids) != 0:   
-            solutions = self._map_cluster_solutions(drcluster)
+            solutions = self._map_cluster_solutions(rigids[0])
         else:
             solutions = []
         return solutions
 
+    def get_solution_space(self):
+        """Returns a SolutionSpace of the solutions of the problem, i.e. the solutions 
+           returned by get_solutions, in factored form, or None if there are no variables. 
+           Solutions are only computed when requested, e.g. for sampling the solutions
+           of problems with many solutions. (Counting them computes all solutions.) 
+           Note: closest expects a prototype map from point variables to vectors.
+        """
+        rigids = [c for c in self.dr.top_level() if isinstance(c, Rigid)]
+        if len(rigids) == 0:
+            return None
+        return self.dr.solution_space(rigids[0], lambda configuration: self._map_configurations([configuration])[0])
+
+    def evaluate_batch(self, constraints, values):
+        """Solve the problem for many sets of parameter values, re-using the current 
+           decomposition. The problem and the solver are not changed. 
+           
+           keyword args
+            constraints - a list of DistanceConstraints, AngleConstraints, 
+                          MateConstraints and/or RigidConstraints in the problem
+            values      - a list of parameter vectors. Each vector is a list of 
+                          parameter values, one for each constraint. 
+
+           Returns a list with, for each parameter vector, a list of solutions 
+           (see get_solutions). 
+        """
+        rigids = [c for c in self.dr.top_level() if isinstance(c, Rigid)]
+        if len(rigids) == 0:
+            return [[] for row in values]
+        drcluster = rigids[0]
+        plan = self._get_plan()
+        parameters = plan.parameters()
+        index = {}
+        for i in range(len(parameters)):
+            index[parameters[i]] = i
+        slots = [index[self._map[con]] for con in constraints]
+        base = [self.dr.get(var) for var in parameters]
+        results = []
+        for row in values:
+            assignment = list(base)
+            for (con, slot, parameter) in zip(constraints, slots, row):
+                assignment[slot] = self._parameter_configurations(con, parameter)
+            configurations = plan.evaluate(assignment)[drcluster]
+            if configurations == None:
+                results.append([])
+            else:
+                results.append(self._map_configurations(configurations))
+        return results
+
+    def _get_plan(self):
+        """returns a Plan of the current decomposition, compiled when needed"""
+        if self._plan == None:
+            self._plan = self.dr.compile()
+        return self._plan
+
     def _map_cluster_solutions(self, drcluster):
         # map dr-cluster configurations to solutions, i.e. a map from problem variables to values           
         configurations = self.dr.get(drcluster)
+        diag_print(lambda: "mapping cluster "+str(drcluster)+" #configurations="+str(len(configurations)), "GeometricSolver")
+        return self._map_configurations(configurations)
+
+    def _map_configurations(self, configurations):
+        # map configurations to solutions, i.e. a map from problem variables to values           
         solutions = []
-        diag_print("mapping cluster "+str(drcluster)+" #configurations="+str(len(configurations)),"GeometricSolver")
         for configuration in configurations:
             solution = {}
             for var in self.problem.cg.variables():
@@ -580,16 +828,26 @@ class GeometricSolver (Listener):
                 raise Exception("unknown message type"+str(type))
         elif object == self.problem:
             (type, data) = message
-            if type == "set_point":
+            if type == "set_point" or type == "set_prototype":
                 (variable, point) = data
                 self._update_variable(variable) 
             elif type == "set_parameter":
                 (constraint, value) = data
                 self._update_constraint(constraint)
+            elif type == "set_prototype_selection":
+                self._set_prototype_selection(data)
+            elif type == "rem_selection_constraint":
+                # removed by rem_constraint from constraint graph
+                pass
+            elif type == "begin_commit":
+                self.begin_bulk()
+            elif type == "end_commit":
+                self.end_bulk()
             else:
                 raise Exception("unknown message type"+str(type))
         elif object == self.dr:
-            pass
+            # decomposition changed
+            self._plan = None
         else:
             raise Exception("message from unknown source"+str((object, message)))
     
@@ -619,10 +877,10 @@ class GeometricSolver (Listener):
             self._update_variable(var)
     
     def _add_line(self, var):
-        diag_print("add line "+str(var),"GeometricSolver")
+        diag_print("add line %s", "GeometricSolver", var)
         # find coincident points
         points = list(self.problem.get_coincident_points(var))
-        diag_print("on "+str(points),"GeometricSolver")
+        diag_print("on %s", "GeometricSolver", points)
         if self.dimension == 2:
             if len(points) == 0:
                 self._map_line_distance(var)
@@ -655,7 +913,7 @@ class GeometricSolver (Listener):
         self._map[line] = dist
         self._map[dist] = line
         self.dr.add(dist)
-        diag_print("mapped "+str(line)+" to "+str(dist),"GeometricSolver")   
+        diag_print("mapped %s to %s", "GeometricSolver", line, dist)   
         # update configurations
         self._update_variable(line)
  
@@ -677,7 +935,7 @@ class GeometricSolver (Listener):
         self._map[line] = dist
         self._map[dist] = line
         self.dr.add(dist)
-        diag_print("mapped "+str(line)+" to "+str(dist),"GeometricSolver")   
+        diag_print("mapped %s to %s", "GeometricSolver", line, dist)   
         self._update_variable(line)
  
     def _map_line_3d_distance(self,line):
@@ -706,7 +964,7 @@ class GeometricSolver (Listener):
         self._map[line] = dist
         self._map[dist] = line
         self.dr.add(dist)
-        diag_print("mapped "+str(line)+" to "+str(dist),"GeometricSolver")   
+        diag_print("mapped %s to %s", "GeometricSolver", line, dist)   
         # update configurations
         self._update_variable(line)
 
@@ -733,7 +991,7 @@ class GeometricSolver (Listener):
         self._map[line] = dist
         self._map[dist] = line
         self.dr.add(dist)
-        diag_print("mapped "+str(line)+" to "+str(dist),"GeometricSolver")   
+        diag_print("mapped %s to %s", "GeometricSolver", line, dist)   
         self._update_variable(line)
 
     def _rem_variable(self, var):
@@ -815,7 +1073,7 @@ class GeometricSolver (Listener):
                         self._map[con] = angle_hog 
                         self._map[angle_hog] = con
                         self.dr.add(angle_hog)
-                        diag_print("mapped "+str(con)+" to "+str(angle_hog),"GeometricSolver")   
+                        diag_print("mapped %s to %s", "GeometricSolver", con, angle_hog)   
                         self._update_constraint(con)
                     elif self.dimension==3:
                         line_vertex = line_rigid.vertex
@@ -825,7 +1083,7 @@ class GeometricSolver (Listener):
                         self._map[con] = angle_hog 
                         self._map[angle_hog] = con
                         self.dr.add(angle_hog)
-                        diag_print("mapped "+str(con)+" to "+str(angle_hog),"GeometricSolver")   
+                        diag_print("mapped %s to %s", "GeometricSolver", con, angle_hog)   
                         self._update_constraint(con)
                     #endif dimension
                 #endif point_vertex
@@ -859,14 +1117,69 @@ class GeometricSolver (Listener):
     # update methods: set the value of the variables in the constraint graph
 
     def _update_constraint(self, con):
-        if isinstance(con, AngleConstraint):
+        if isinstance(con, AngleConstraint) or isinstance(con, DistanceConstraint) \
+           or isinstance(con, MateConstraint) or isinstance(con, RigidConstraint):
             # set configuration
-            hog = self._map[con]
+            cluster = self._map[con]
+            configurations = self._parameter_configurations(con, con.get_parameter())
+            self.dr.set(cluster, configurations)
+            for conf in configurations:
+                assert con.satisfied(conf.map)
+        elif isinstance(con, FixConstraint):
+            self._update_fix()
+        elif isinstance(con, CoincidenceConstraint):
+            lines = [var for var in con.variables() if isinstance(var,Line)]
+            points = [var for var in con.variables() if isinstance(var,Point)]
+            if len(lines)==1 and len(points)==1:
+                line = next(iter(lines))
+                point = next(iter(points))
+                if self.dimension == 2:
+                    line_rigid = self._map[line]
+                    point_rigid = self._map[point]
+                    point_vertex = next(iter(point_rigid.vars))
+                    print("point_vertex", point_vertex)
+                    line_vertex = line_rigid.vertex
+                    line_normal = line_rigid.normal
+                    angle_hog = self._map[con]
+                    pv = vector.vector([1.0,0.0])
+                    lv = vector.vector([0.0,0.0])
+                    ln = vector.vector([0.0,1.0])
+                    conf1 = Configuration({line_vertex:lv, line_normal:ln, point_vertex: 1.0*pv})
+                    conf2 = Configuration({line_vertex:lv, line_normal:ln, point_vertex:-1.0*pv})
+                    self.dr.set(angle_hog, [conf1,conf2])
+                    diag_print("set %s to %s", "GeometricSolver", angle_hog, conf1)
+                    diag_print("set %s to %s", "GeometricSolver", angle_hog, conf2)
+                elif self.dimension == 3:
+                    line_rigid = self._map[line]
+                    point_rigid = self._map[point]
+                    point_vertex = next(iter(point_rigid.vars))
+                    print("point_vertex", point_vertex)
+                    line_vertex = line_rigid.vertex
+                    line_normal1 = line_rigid.normal1
+                    line_normal2 = line_rigid.normal2
+                    angle_hog = self._map[con]
+                    lv = vector.vector([0.0,0.0,0.0])
+                    pv = vector.vector([1.0,0.0,0.0])
+                    ln1 = vector.vector([0.0,1.0,0.0])
+                    ln2 = vector.vector([0.0,0.0,1.0])
+                    conf1 = Configuration({line_vertex:lv, line_normal1:ln1, line_normal2:ln2, point_vertex: 1.0*pv})
+                    conf2 = Configuration({line_vertex:lv, line_normal1:ln1, line_normal2:ln2, point_vertex:-1.0*pv})
+                    self.dr.set(angle_hog, [conf1,conf2])
+                    diag_print("set %s to %s", "GeometricSolver", angle_hog, conf1)
+                    diag_print("set %s to %s", "GeometricSolver", angle_hog, conf2)
+               #endif dimension
+        else:
+            raise Exception("unknown constraint type")
+    
+    def _parameter_configurations(self, con, parameter):
+        """Returns the configurations for the cluster mapped to a constraint, 
+           for a given parameter value of that constraint"""
+        if isinstance(con, AngleConstraint):
             vars = list(con.variables())
             v0 = vars[0]
             v1 = vars[1]
             v2 = vars[2]
-            angle = con.get_parameter()
+            angle = parameter
             p0 = vector.vector([1.0,0.0])
             p1 = vector.vector([0.0,0.0])
             p2 = vector.vector([math.cos(angle), math.sin(angle)])
@@ -876,15 +1189,12 @@ class GeometricSolver (Listener):
                 p1.append(0.0)
                 p2.append(0.0)
             conf = Configuration({v0:p0,v1:p1,v2:p2})
-            self.dr.set(hog, [conf])
-            assert con.satisfied(conf.map)
+            return [conf]
         elif isinstance(con, DistanceConstraint):
-            # set configuration
-            rig = self._map[con]
             vars = list(con.variables())
             v0 = vars[0]
             v1 = vars[1]
-            dist = con.get_parameter()
+            dist = parameter
             #p0 = vector.vector([0.0,0.0])
             #p1 = vector.vector([dist,0.0])
             # use prototype to orient rigid - minimize difference solution and prototype
@@ -897,13 +1207,10 @@ class GeometricSolver (Listener):
                 v[0] = 1.0
             p1 = p0+v*dist
             conf = Configuration({v0:p0,v1:p1})
-            self.dr.set(rig, [conf])
-            assert con.satisfied(conf.map)
+            return [conf]
         elif isinstance(con, MateConstraint):
-            # set configuration
             if self.dimension != 3:
                 raise Exception("MateConstraint only supported in 3D")
-            glue = self._map[con]
             vars = list(con.variables())
             vo1 = vars[0]
             vx1 = vars[1]
@@ -914,7 +1221,7 @@ class GeometricSolver (Listener):
             po1 = vector.vector([0.0,0.0,0.0])
             px1 = vector.vector([1.0,0.0,0.0])
             py1 = vector.vector([0.0,1.0,0.0])
-            trans = con.get_parameter()
+            trans = parameter
             po2 = transform_point(po1, trans)
             px2 = transform_point(px1, trans)
             py2 = transform_point(py1, trans)
@@ -926,61 +1233,13 @@ class GeometricSolver (Listener):
                 vx2:px2,
                 vy2:py2,
             })
-            self.dr.set(glue, [conf])
-            assert con.satisfied(conf.map)
+            return [conf]
         elif isinstance(con, RigidConstraint):
-            # set configuration
-            rig = self._map[con]
-            vars = list(con.variables())
-            conf = con.get_parameter()
-            self.dr.set(rig, [conf])
-            assert con.satisfied(conf.map)
-        elif isinstance(con, FixConstraint):
-            self._update_fix()
-        elif isinstance(con, CoincidenceConstraint):
-            lines = [var for var in con.variables() if isinstance(var,Line)]
-            points = [var for var in con.variables() if isinstance(var,Point)]
-            if len(lines)==1 and len(points)==1:
-                line = next(iter(lines))
-                point = next(iter(points))
-                if self.dimension == 2:
-                    line_rigid = self._map[line]
-                    point_rigid = self._map[point]
-                    point_vertex = next(iter(point_rigid.vars))
-                    print("point_vertex", point_vertex)
-                    line_vertex = line_rigid.vertex
-                    line_normal = line_rigid.normal
-                    angle_hog = self._map[con]
-                    pv = vector.vector([1.0,0.0])
-                    lv = vector.vector([0.0,0.0])
-                    ln = vector.vector([0.0,1.0])
-                    conf1 = Configuration({line_vertex:lv, line_normal:ln, point_vertex: 1.0*pv})
-                    conf2 = Configuration({line_vertex:lv, line_normal:ln, point_vertex:-1.0*pv})
-                    self.dr.set(angle_hog, [conf1,conf2])
-                    diag_print("set "+str(angle_hog)+" to "+str(conf1),"GeometricSolver")
-                    diag_print("set "+str(angle_hog)+" to "+str(conf2),"GeometricSolver")
-                elif self.dimension == 3:
-                    line_rigid = self._map[line]
-                    point_rigid = self._map[point]
-                    point_vertex = next(iter(point_rigid.vars))
-                    print("point_vertex", point_vertex)
-                    line_vertex = line_rigid.vertex
-                    line_normal1 = line_rigid.normal1
-                    line_normal2 = line_rigid.normal2
-                    angle_hog = self._map[con]
-                    lv = vector.vector([0.0,0.0,0.0])
-                    pv = vector.vector([1.0,0.0,0.0])
-                    ln1 = vector.vector([0.0,1.0,0.0])
-                    ln2 = vector.vector([0.0,0.0,1.0])
-                    conf1 = Configuration({line_vertex:lv, line_normal1:ln1, line_normal2:ln2, point_vertex: 1.0*pv})
-                    conf2 = Configuration({line_vertex:lv, line_normal1:ln1, line_normal2:ln2, point_vertex:-1.0*pv})
-                    self.dr.set(angle_hog, [conf1,conf2])
-                    diag_print("set "+str(angle_hog)+" to "+str(conf1),"GeometricSolver")
-                    diag_print("set "+str(angle_hog)+" to "+str(conf2),"GeometricSolver")
-               #endif dimension
+            conf = parameter
+            return [conf]
         else:
-            raise Exception("unknown constraint type")
-    
+            raise Exception("no parameter configurations for constraint type")
+
     def _update_variable(self, var):
         if isinstance(var, Point):
             self._update_point(var)
@@ -1014,16 +1273,16 @@ class GeometricSolver (Listener):
                 vertex_rigid = self._map[line_vertex]
                 conf = Configuration({line_vertex: v})
                 self.dr.set(vertex_rigid, [conf])
-                diag_print("set "+str(vertex_rigid)+" to "+str(conf),"GeometricSolver")
+                diag_print("set %s to %s", "GeometricSolver", vertex_rigid, conf)
             if line_normal in self._map:
                 normal_rigid = self._map[line_normal]
                 conf = Configuration({line_normal: n})
                 self.dr.set(normal_rigid, [conf])
-                diag_print("set "+str(normal_rigid)+" to "+str(conf),"GeometricSolver")
+                diag_print("set %s to %s", "GeometricSolver", normal_rigid, conf)
             # update line configuration
             conf = Configuration({line_vertex:v, line_normal:n})
             self.dr.set(cluster, [conf])
-            diag_print("set "+str(cluster)+" to "+str(conf),"GeometricSolver")
+            diag_print("set %s to %s", "GeometricSolver", cluster, conf)
         elif self.dimension == 3:
             line_vertex = cluster.vertex
             line_normal1 = cluster.normal1
@@ -1041,21 +1300,21 @@ class GeometricSolver (Listener):
                 vertex_rigid = self._map[line_vertex]
                 conf = Configuration({line_vertex: v})
                 self.dr.set(vertex_rigid, [conf])
-                diag_print("set "+str(vertex_rigid)+" to "+str(conf),"GeometricSolver")
+                diag_print("set %s to %s", "GeometricSolver", vertex_rigid, conf)
             if line_normal1 in self._map:
                 normal1_rigid = self._map[line_normal1]
                 conf = Configuration({line_normal1: n1})
                 self.dr.set(normal1_rigid, [conf])
-                diag_print("set "+str(normal1_rigid)+" to "+str(conf),"GeometricSolver")
+                diag_print("set %s to %s", "GeometricSolver", normal1_rigid, conf)
             if line_normal2 in self._map:
                 normal2_rigid = self._map[line_normal2]
                 conf = Configuration({line_normal2: n2})
                 self.dr.set(normal2_rigid, [conf])
-                diag_print("set "+str(normal2_rigid)+" to "+str(conf),"GeometricSolver")
+                diag_print("set %s to %s", "GeometricSolver", normal2_rigid, conf)
             # update line configuration
             conf = Configuration({line_vertex:v, line_normal1:n1, line_normal2:n2})
             self.dr.set(cluster, [conf])
-            diag_print("set "+str(cluster)+" to "+str(conf),"GeometricSolver")
+            diag_print("set %s to %s", "GeometricSolver", cluster, conf)
         #endif dimension
     #fed _update_line
 
@@ -1309,7 +1568,7 @@ class AngleConstraint(ParametricConstraint):
                 cmp = self._value
             result = tol_eq(ang, cmp)
         if result == False:
-            diag_print("measured angle = "+str(ang)+", parameter value = "+str(cmp), "satisfied")
+            diag_print("measured angle = %s, parameter value = %s", "satisfied", ang, cmp)
         return result
 
     def __str__(self):
@@ -1458,7 +1717,7 @@ class CoincidenceConstraint(Constraint):
                 raise Exception("line has invalid number of values")
             d =  distance_point_line(p, p1, p2)
             if not tol_eq(d,0):
-                diag_print("not satisfied "+ str(self)+" distance="+str(d),"CoincidenceConstraint")
+                diag_print("not satisfied %s distance=%s", "CoincidenceConstraint", self, d)
                 print("distance="+str(d),"CoincidenceConstraint")
             return tol_eq(d,0)
 
@@ -2,6 +2,47 @@
 
 from .graph import *
 
+class MatchPlan:
+    """A pattern graph compiled for matching, so that matching the same pattern 
+       against many reference graphs does not repeat the analysis of the pattern.
+
+       instance attributes:
+        pattern     - the pattern (a FanGraph)
+        constants   - pattern vertices that are expected to be matched exactly 
+        fanin       - map from pattern vertices to their fan-in numbers
+        fanout      - map from pattern vertices to their fan-out numbers
+        order       - list of (patvar, anchor) pairs, see _match_order
+        checks      - map from pattern vertices to the pattern edges that must be 
+                      checked when that vertex is matched, i.e. the edges to itself 
+                      and to vertices earlier in the order. 
+    """
+
+    def __init__(self, pattern, constants=[]):
+        """Compile a pattern graph. Vertices in constants are matched first. 
+           (Any vertex that is in the reference graph is matched exactly,
+           whether it is in constants or not)
+        """
+        if not isinstance(pattern, FanGraph):
+            pattern = FanGraph(pattern)
+        self.pattern = pattern
+        self.constants = frozenset(v for v in constants if pattern.has_vertex(v))
+        self.fanin = {}
+        self.fanout = {}
+        for v in pattern.vertices():
+            self.fanin[v] = pattern.fanin(v)
+            self.fanout[v] = pattern.fanout(v)
+        self.order = _match_order(pattern, self.constants)
+        self.checks = {}
+        ordered = set()
+        for (patvar, anchor) in self.order:
+            ordered.add(patvar)
+            self.checks[patvar] = [(v1,v2) for (v1,v2) in pattern.adjacent_edges(patvar)
+                                   if v1 in ordered and v2 in ordered]
+
+    def __str__(self):
+        return "MatchPlan("+str([patvar for (patvar, anchor) in self.order])+")"
+# end class MatchPlan
+
 def gmatch(pattern, reference):
     """Match pattern graph to reference graph. 
 
@@ -9,77 +50,135 @@ def gmatch(pattern, reference):
        (a subgraph is a subset of variables and subset of edges)
        Any vertices in the pattern that are equal to some vertex in reference, they are matched exactly.
        Otherwise, vertices in pattern are considered variables.
-       Returns a list of solutions. 
+       The pattern may be a graph or a MatchPlan. When the same pattern is matched 
+       repeatedly, compile it once to a MatchPlan.
+       The reference may be a graph, a FanGraph or a FanGraphView (which is not copied).
+       Generates solutions (lazily, depth-first), so the first solution is found 
+       without enumerating all solutions. 
        Each solution is a Map from pattern vertices to reference vertices (and vice versa).
     """
 
-    if not isinstance(pattern, FanGraph):
-        pattern = FanGraph(pattern)
-    if not isinstance(reference, FanGraph):
+    if isinstance(pattern, MatchPlan):
+        plan = pattern
+    else:
+        plan = MatchPlan(pattern)
+    if not isinstance(reference, (FanGraph, FanGraphView)):
         reference = FanGraph(reference)
 
-
     # For each pattern vertex:
     #  match with all vertices in reference that have at least same fanin and fanout.
     #  also match if pattern vertex in reference (same object or equal)
-    #  Then combine matches (patvar, refvar) with existing partial solutions if:
+    # Candidate sets are only needed for vertices without anchor; other vertices 
+    # are matched with neighbours of earlier matches, checking their fanin and fanout.
+    candidates = {}
+    byfan = {}
+    for (patvar, anchor) in plan.order:
+        if reference.has_vertex(patvar):
+            candidates[patvar] = set([patvar])
+            continue
+        if anchor != None:
+            continue
+        fan = (plan.fanin[patvar], plan.fanout[patvar])
+        if fan not in byfan:
+            byfan[fan] = _candidates(reference, fan[0], fan[1])
+        if len(byfan[fan]) == 0:
+            return
+        candidates[patvar] = byfan[fan]
+    
+    # Then extend partial solutions depth-first, in the order of the plan,
+    # with matches (patvar, refvar) if:
     #    refvar still free in partial solution
     #    all edges adjacent to pattern vertex are also in reference graph
+    if len(plan.order) == 0:
+        return
+    for solution in _extend(plan, reference, candidates, 0, {}):
+        yield solution
+#gmatch
 
-    solutions = None
-    for patvar in pattern.vertices():
-        if reference.has_vertex(patvar):
-            matches = [patvar]
+def _candidates(reference, fanin, fanout):
+    """returns the set of reference vertices with at least given fanin and fanout"""
+    inumbers = [n for n in reference.fanin_numbers() if n>=fanin]
+    onumbers = [n for n in reference.fanout_numbers() if n>=fanout]
+    inmatches = []
+    for n in inumbers:
+        inmatches += reference.infan(n)
+    outmatches = []
+    for n in onumbers:
+        outmatches += reference.outfan(n)
+    return set(inmatches).intersection(outmatches)
+
+def _match_order(pattern, constants):
+    """returns a list of (patvar, anchor) pairs, where patvar are the pattern vertices, in the order 
+       in which they are matched, and anchor is (patvar2, direction), where patvar2 is an earlier
+       pattern vertex adjacent to patvar, and direction is "out" ("in") if the edge is from (to) 
+       patvar2, or anchor is None. Each next vertex is the one with most edges to earlier vertices, 
+       then constants before other vertices, then the one with most edges.
+    """
+    remaining = set(pattern.vertices())
+    ordered = set()
+    order = []
+    while len(remaining) > 0:
+        def tightness(v):
+            ingoing = pattern.ingoing_vertices(v)
+            outgoing = pattern.outgoing_vertices(v)
+            connections = len([x for x in ingoing if x in ordered]) + len([x for x in outgoing if x in ordered])
+            return (-connections, v not in constants, -len(ingoing)-len(outgoing))
+        patvar = min(remaining, key=tightness)
+        anchor = None
+        for v in pattern.ingoing_vertices(patvar):
+            if v in ordered:
+                anchor = (v, "out")
+                break
+        if anchor == None:
+            for v in pattern.outgoing_vertices(patvar):
+                if v in ordered:
+                    anchor = (v, "in")
+                    break
+        order.append((patvar, anchor))
+        ordered.add(patvar)
+        remaining.remove(patvar)
+    return order
+
+def _extend(plan, reference, candidates, i, olds):
+    """generate the solutions extending partial solution olds, for pattern vertices plan.order[i:]"""
+    if i == len(plan.order):
+        yield olds
+        return
+    (patvar, anchor) = plan.order[i]
+    if anchor == None:
+        matches = candidates[patvar]
+    else:
+        (v, direction) = anchor
+        if direction == "out":
+            matches = reference.outgoing_vertices(olds[v])
         else:
-            fanin = pattern.fanin(patvar)
-            fanout = pattern.fanout(patvar)
-            inumbers = [n for n in reference.fanin_numbers() if n>=fanin]
-            onumbers = [n for n in reference.fanout_numbers() if n>=fanout]
-            inmatches = []
-            for n in inumbers:
-                inmatches += reference.infan(n)
-            outmatches = []
-            for n in onumbers:
-                outmatches += reference.outfan(n)
-            matches = set(inmatches).intersection(outmatches)
-        newsolutions = []
-        if solutions == None:
-            for refvar in matches:
-                s = {patvar:refvar, refvar:patvar}
-                newsolutions.append(s)
+            matches = reference.ingoing_vertices(olds[v])
+        if patvar in candidates:
+            matches = [x for x in matches if x in candidates[patvar]]
         else:
-            for refvar in matches:
-                for olds in solutions:
-                    news = dict(olds)
-                    news[patvar] = refvar
-                    news[refvar] = patvar
-                    consistent = True
-                    # check for no double assignments
-                    if patvar in olds:
-                        if olds[patvar] != refvar:
-                            consistent = False
-                    if refvar in olds:
-                        if olds[refvar] != patvar:
-                            consistent = False
-                    # check edges
-                    for pe in pattern.adjacent_edges(patvar):
-                        (pv1,pv2) = pe
-                        if pv1 not in news or pv2 not in news:
-                            continue
-                        rv1 = news[pv1] 
-                        rv2 = news[pv2] 
-                        if not reference.has_edge(rv1,rv2):
-                            consistent = False
-                            break
-                    if consistent:
-                        newsolutions.append(news)
-                #for
-            #for
-        #if
-        solutions = newsolutions
-    #for
-    return solutions
-#gmatch
+            fanin = plan.fanin[patvar]
+            fanout = plan.fanout[patvar]
+            matches = [x for x in matches if reference.fanin(x) >= fanin and reference.fanout(x) >= fanout]
+    for refvar in matches:
+        # check for no double assignments
+        if patvar in olds:
+            if olds[patvar] != refvar:
+                continue
+        if refvar in olds:
+            if olds[refvar] != patvar:
+                continue
+        news = dict(olds)
+        news[patvar] = refvar
+        news[refvar] = patvar
+        # check edges
+        consistent = True
+        for (pv1,pv2) in plan.checks[patvar]:
+            if not reference.has_edge(news[pv1],news[pv2]):
+                consistent = False
+                break
+        if consistent:
+            for solution in _extend(plan, reference, candidates, i+1, news):
+                yield solution
 
 
 def test():
@@ -109,7 +208,7 @@ def test():
     reference.add_edge("rigid", 3)
     reference.add_edge("distance", 3)
 
-    s = gmatch(pattern, reference)
+    s = list(gmatch(pattern, reference))
     print(s)
     print(len(s),"solutions")
 
@@ -117,7 +216,7 @@ def test():
     print("mathing random pattern in random graph")
     pattern = random_graph(3,6,False,"v")
     reference = random_graph(100,200,False,"t")
-    s = gmatch(pattern, reference)
+    s = list(gmatch(pattern, reference))
     print(s)
     print(len(s),"solutions")
 
@@ -56,7 +56,8 @@ class Graph (Notifier):
         if v not in self._dict:
             self._dict[v] = {}
             self._reverse[v] = {}
-            self.send_notify(("add_vertex",v))
+            if not self.silent:
+                self.send_notify(("add_vertex",v))
                     
     def add_edge(self, v1, v2, value=1):
         "Add edge from v1 to v2 with optional value."
@@ -71,7 +72,8 @@ class Graph (Notifier):
         # and the reverse edge in the reverse
         if v1 not in self._reverse[v2]:
             self._reverse[v2][v1] = value
-            self.send_notify(("add_edge",(v1,v2,value)))
+            if not self.silent:
+                self.send_notify(("add_edge",(v1,v2,value)))
 
     def add_bi(self, v1, v2, value=1):
         "Add edges bi-directinally with optional value."
@@ -101,7 +103,8 @@ class Graph (Notifier):
             # and in the reverse 
             del self._reverse[v]
             # notify
-            self.send_notify(("rem_vertex",v))
+            if not self.silent:
+                self.send_notify(("rem_vertex",v))
         else:
             raise Exception("vertex not in graph")
             
@@ -112,7 +115,8 @@ class Graph (Notifier):
             # remove from reverse
             del self._reverse[v2][v1]
             # notify
-            self.send_notify(("rem_edge",(v1,v2)))
+            if not self.silent:
+                self.send_notify(("rem_edge",(v1,v2)))
         else:
             raise Exception("edge not in graph")
 
@@ -151,7 +155,8 @@ class Graph (Notifier):
         else:
             self._dict[v1][v2] = value
             self._reverse[v2][v1] = value
-            self.send_notify(("set",(v1,v2,value)))
+            if not self.silent:
+                self.send_notify(("set",(v1,v2,value)))
     
     def set_bi(self, v1, v2, value):
         "Set value of edges (v1,v2) and (v2,v1)."
@@ -196,6 +201,16 @@ class Graph (Notifier):
         """return list of vertices to which edge goes from given vertex"""
         return list(self._dict[vertex].keys())
 
+    def ingoing(self, vertex):
+        """returns vertices from which edge goes to given vertex, without copying.
+           Do not modify the graph while iterating."""
+        return self._reverse[vertex].keys()
+
+    def outgoing(self, vertex):
+        """returns vertices to which edge goes from given vertex, without copying.
+           Do not modify the graph while iterating."""
+        return self._dict[vertex].keys()
+
     def adjacent_vertices(self, v):
         """list of adjacent (ingoing or outgoing) vertices"""
         iset = set(self.ingoing_vertices(v))
@@ -306,7 +321,7 @@ class Graph (Notifier):
                 for x in s:
                     todo.remove(x)
                 s.add(v)
-                subsets.add(s)
+                subsets.add(frozenset(s))
             return subsets
 
     def mincut(self):
@@ -449,6 +464,202 @@ class Graph (Notifier):
 # end class Graph
 
 
+class IndexedGraph(Graph):
+    """A weighted directed graph, with the same interface as Graph. 
+    
+       Vertices are interned to integer ids when added. The edges are stored 
+       in lists indexed by id, of dictionaries from ids to edge values.
+       So each vertex object is hashed once per call, and neighbours are 
+       stored, compared and iterated as integers. Ids of removed vertices 
+       are re-used. 
+    """
+
+    def __init__(self, graph=None):
+        Notifier.__init__(self)
+        self._ids = {}
+        """map from vertices to ids"""
+        self._vertex = []
+        """map from ids to vertices (None if id not in use)"""
+        self._out = []
+        """map from ids to dictionaries from ids of outgoing vertices to edge values"""
+        self._in = []
+        """map from ids to dictionaries from ids of ingoing vertices to edge values"""
+        self._free = []
+        """ids not in use"""
+        # copy input graph
+        if graph:
+            for v in graph.vertices():
+                self.add_vertex(v)
+            for e in graph.edges():
+                (v,w) = e
+                self.set(v,w,graph.get(v,w))
+    #end __init__
+
+    def index(self, v):
+        """return the id of a vertex"""
+        return self._ids[v]
+
+    def vertex(self, i):
+        """return the vertex with given id"""
+        return self._vertex[i]
+
+    def ingoing_ids(self, i):
+        """returns ids of vertices from which edge goes to vertex with id i, without copying"""
+        return self._in[i].keys()
+
+    def outgoing_ids(self, i):
+        """returns ids of vertices to which edge goes from vertex with id i, without copying"""
+        return self._out[i].keys()
+
+    def add_vertex(self, v):
+        "Add vertex to graph if not already."
+        if v not in self._ids:
+            if len(self._free) > 0:
+                i = self._free.pop()
+                self._vertex[i] = v
+                self._out[i] = {}
+                self._in[i] = {}
+            else:
+                i = len(self._vertex)
+                self._vertex.append(v)
+                self._out.append({})
+                self._in.append({})
+            self._ids[v] = i
+            if not self.silent:
+                self.send_notify(("add_vertex",v))
+
+    def add_edge(self, v1, v2, value=1):
+        "Add edge from v1 to v2 with optional value."
+        # add vertices of not in graph
+        if v1 not in self._ids:
+            self.add_vertex(v1)
+        if v2 not in self._ids:
+            self.add_vertex(v2)
+        i1 = self._ids[v1]
+        i2 = self._ids[v2]
+        # add edge if not yet in graph
+        if i2 not in self._out[i1]:
+            self._out[i1][i2] = value
+            self._in[i2][i1] = value
+            if not self.silent:
+                self.send_notify(("add_edge",(v1,v2,value)))
+
+    def rem_vertex(self, v):
+        "Remove vertex and incident edges."
+        if v in self._ids:
+            i = self._ids[v]
+            # remove edges going to vertex
+            for u in self.ingoing_vertices(v):
+                self.rem_edge(u,v)
+            # remove edges going from vertex
+            for w in self.outgoing_vertices(v):
+                self.rem_edge(v,w)
+            # free id
+            del self._ids[v]
+            self._vertex[i] = None
+            self._out[i] = None
+            self._in[i] = None
+            self._free.append(i)
+            # notify
+            if not self.silent:
+                self.send_notify(("rem_vertex",v))
+        else:
+            raise Exception("vertex not in graph")
+
+    def rem_edge(self, v1, v2):
+        "Remove edge."
+        if self.has_edge(v1,v2):
+            i1 = self._ids[v1]
+            i2 = self._ids[v2]
+            del self._out[i1][i2]
+            del self._in[i2][i1]
+            # notify
+            if not self.silent:
+                self.send_notify(("rem_edge",(v1,v2)))
+        else:
+            raise Exception("edge not in graph")
+
+    def has_vertex(self, v):
+        "True if v a vertex of this graph."
+        return v in self._ids
+
+    def has_edge(self, v1, v2):
+        "True if there is a directed edge (v1,v2) in this graph."
+        i1 = self._ids.get(v1)
+        i2 = self._ids.get(v2)
+        if i1 == None or i2 == None:
+            return False
+        return i2 in self._out[i1]
+
+    def get(self, v1, v2):
+        "Get value of edge (v1,v2)."
+        return self._out[self._ids[v1]][self._ids[v2]]
+
+    def set(self, v1, v2, value):
+        "Set value of edge (v1,v2) and add edge if it doesn't exist"
+        if not self.has_edge(v1,v2):
+            self.add_edge(v1,v2,value)
+        else:
+            i1 = self._ids[v1]
+            i2 = self._ids[v2]
+            self._out[i1][i2] = value
+            self._in[i2][i1] = value
+            if not self.silent:
+                self.send_notify(("set",(v1,v2,value)))
+
+    def vertices(self):
+        "List vertices"
+        return list(self._ids.keys())
+
+    def edges(self):
+        "List edges"
+        l = []
+        for v in self._ids:
+            for j in self._out[self._ids[v]]:
+                l.append((v, self._vertex[j]))
+        return l
+
+    def subgraph(self, vertices):
+        "Derive subgraph containing specified vertices and enclosed edges."
+        g = IndexedGraph()
+        # copy vertices and edges for given vertices
+        for v in vertices:
+            if self.has_vertex(v):
+                g.add_vertex(v)
+                for w in self.outgoing(v):
+                    if w in vertices:
+                        g.set(v,w,self.get(v,w))
+        return g
+
+    def ingoing_vertices(self, vertex):
+        """return list of vertices from which edge goes to given vertex"""
+        return list(map(self._vertex.__getitem__, self._in[self._ids[vertex]]))
+
+    def outgoing_vertices(self, vertex):
+        """return list of vertices to which edge goes from given vertex"""
+        return list(map(self._vertex.__getitem__, self._out[self._ids[vertex]]))
+
+    def ingoing(self, vertex):
+        """returns an iterator over vertices from which edge goes to given vertex, without copying.
+           Do not modify the graph while iterating."""
+        return map(self._vertex.__getitem__, self._in[self._ids[vertex]])
+
+    def outgoing(self, vertex):
+        """returns an iterator over vertices to which edge goes from given vertex, without copying.
+           Do not modify the graph while iterating."""
+        return map(self._vertex.__getitem__, self._out[self._ids[vertex]])
+
+    def __str__(self):
+        """Create a string representation, using str() for each element"""
+        s = "{"
+        s += ",".join([str(v)+":{"+",".join([str(w)+":"+str(self.get(v,w)) for w in self.outgoing(v)])+"}" 
+                       for v in self._ids])
+        s += "}"
+        return s
+
+# end class IndexedGraph
+
+
 
     
 class FanGraph(Graph):
@@ -485,7 +696,8 @@ class FanGraph(Graph):
             self._reverse[v] = {}
             self._set_fanin(v, 0)
             self._set_fanout(v, 0)
-            self.send_notify(("add_vertex",v))
+            if not self.silent:
+                self.send_notify(("add_vertex",v))
             
     def add_edge(self, v1, v2, value=1):
         "Add edge from v1 to v2 with optional value."
@@ -505,7 +717,8 @@ class FanGraph(Graph):
             # increment fan-in for v2
             self._set_fanin(v2, self._fanin[v2]+1)
             # notify
-            self.send_notify(("add_edge",(v1,v2,value)))
+            if not self.silent:
+                self.send_notify(("add_edge",(v1,v2,value)))
 
     def rem_vertex(self, v):
         "Remove vertex and incident edges."
@@ -524,7 +737,8 @@ class FanGraph(Graph):
             # and in the reverse 
             del self._reverse[v]
             # notify
-            self.send_notify(("rem_vertex",v))
+            if not self.silent:
+                self.send_notify(("rem_vertex",v))
         else:
             raise Exception("vertex not in graph")
         
@@ -539,7 +753,8 @@ class FanGraph(Graph):
             # decrement fan-in for v2
             self._set_fanin(v2, self._fanin[v2]-1)
             # notify
-            self.send_notify(("rem_edge",(v1,v2)))
+            if not self.silent:
+                self.send_notify(("rem_edge",(v1,v2)))
         else:
             raise Exception("edge not in graph")
 
@@ -650,6 +865,205 @@ class FanGraph(Graph):
 # end class FanGraph
 
 
+class FanGraphView:
+    """A read-only view of a FanGraph, restricted to the vertices in a given 
+       container (anything that supports 'in') and the edges between them. 
+       Nothing is copied, so changes in the graph show in the view. 
+
+       The fan-in and fan-out numbers are those of the underlying graph, 
+       i.e. upper bounds of the numbers of edges in the view.
+    """
+
+    def __init__(self, graph, vertices):
+        self._graph = graph
+        self._vertices = vertices
+
+    def has_vertex(self, v):
+        "True if v a vertex of this view."
+        return v in self._vertices and self._graph.has_vertex(v)
+
+    def has_edge(self, v1, v2):
+        "True if there is a directed edge (v1,v2) in this view."
+        return self._graph.has_edge(v1,v2) and v1 in self._vertices and v2 in self._vertices
+
+    def get(self, v1, v2):
+        "Get value of edge (v1,v2)."
+        return self._graph.get(v1,v2)
+
+    def vertices(self):
+        "List vertices"
+        return [v for v in self._graph.vertices() if v in self._vertices]
+
+    def edges(self):
+        "List edges"
+        return [(v1,v2) for (v1,v2) in self._graph.edges() if v1 in self._vertices and v2 in self._vertices]
+
+    def ingoing_vertices(self, vertex):
+        """return list of vertices from which edge goes to given vertex"""
+        return [v for v in self._graph.ingoing_vertices(vertex) if v in self._vertices]
+
+    def outgoing_vertices(self, vertex):
+        """return list of vertices to which edge goes from given vertex"""
+        return [v for v in self._graph.outgoing_vertices(vertex) if v in self._vertices]
+
+    def fanin(self, v):
+        """return fan-in number in the underlying graph"""
+        return self._graph.fanin(v)
+
+    def fanout(self, v):
+        """return fan-out number in the underlying graph"""
+        return self._graph.fanout(v)
+
+    def infan(self, number):
+        """return a list of vertices with given fan-in number in the underlying graph"""
+        return [v for v in self._graph.infan(number) if v in self._vertices]
+
+    def outfan(self, number):
+        """return a list of vertices with given fan-out number in the underlying graph"""
+        return [v for v in self._graph.outfan(number) if v in self._vertices]
+
+    def fanin_numbers(self):
+        """the set of fan-in numbers in the underlying graph"""
+        return self._graph.fanin_numbers()
+
+    def fanout_numbers(self):
+        """the set of fan-out numbers in the underlying graph"""
+        return self._graph.fanout_numbers()
+
+    def __str__(self):
+        s = "FanGraphView(vertices="+str(self.vertices())+", edges="+str(self.edges())+")"
+        return s
+
+# end class FanGraphView
+
+
+class MultiGraph(Notifier):
+    """A directed graph with several relations, i.e. named sets of edges.
+
+       Each relation has its own adjacency dictionaries, so the vertices 
+       related to a vertex by a particular relation are found without 
+       filtering the edges of other relations. An edge (v1,v2) may be 
+       in more than one relation. 
+    """
+
+    def __init__(self):
+        Notifier.__init__(self)
+        self._vertices = {}
+        """the vertices, each mapped to the set of relations with edges on that vertex"""
+        self._dict = {}
+        """map from relation to outgoing edges (a dictionary of dictionaries)"""
+        self._reverse = {}
+        """map from relation to ingoing edges (a dictionary of dictionaries)"""
+
+    def add_vertex(self, v):
+        "Add vertex to graph if not already."
+        if v not in self._vertices:
+            self._vertices[v] = set()
+            if not self.silent:
+                self.send_notify(("add_vertex",v))
+
+    def add_edge(self, v1, v2, relation):
+        "Add edge from v1 to v2 in given relation"
+        self.add_vertex(v1)
+        self.add_vertex(v2)
+        if relation not in self._dict:
+            self._dict[relation] = {}
+            self._reverse[relation] = {}
+        out = self._dict[relation]
+        if v1 not in out:
+            out[v1] = {}
+            self._vertices[v1].add(relation)
+        if v2 not in out[v1]:
+            out[v1][v2] = True
+            rev = self._reverse[relation]
+            if v2 not in rev:
+                rev[v2] = {}
+                self._vertices[v2].add(relation)
+            rev[v2][v1] = True
+            if not self.silent:
+                self.send_notify(("add_edge",(v1,v2,relation)))
+
+    def rem_vertex(self, v):
+        "Remove vertex and incident edges, in all relations."
+        if v not in self._vertices:
+            raise Exception("vertex not in graph")
+        for relation in self._vertices[v]:
+            out = self._dict[relation]
+            rev = self._reverse[relation]
+            if v in out:
+                for w in out.pop(v):
+                    del rev[w][v]
+            if v in rev:
+                for u in rev.pop(v):
+                    del out[u][v]
+        del self._vertices[v]
+        if not self.silent:
+            self.send_notify(("rem_vertex",v))
+
+    def rem_edge(self, v1, v2, relation):
+        "Remove edge from v1 to v2 in given relation"
+        if self.has_edge(v1, v2, relation):
+            del self._dict[relation][v1][v2]
+            del self._reverse[relation][v2][v1]
+            if not self.silent:
+                self.send_notify(("rem_edge",(v1,v2,relation)))
+        else:
+            raise Exception("edge not in graph")
+
+    def has_vertex(self, v):
+        "True if v a vertex of this graph."
+        return v in self._vertices
+
+    def has_edge(self, v1, v2, relation):
+        "True if there is a directed edge (v1,v2) in given relation"
+        out = self._dict.get(relation)
+        return out != None and v1 in out and v2 in out[v1]
+
+    def vertices(self):
+        "List vertices"
+        return list(self._vertices.keys())
+
+    def outgoing(self, v, relation):
+        """returns vertices to which an edge of given relation goes from v. 
+           This is a view on the graph, i.e. do not modify the graph while iterating."""
+        out = self._dict.get(relation)
+        if out != None and v in out:
+            return out[v].keys()
+        else:
+            return _nokeys
+
+    def ingoing(self, v, relation):
+        """returns vertices from which an edge of given relation goes to v. 
+           This is a view on the graph, i.e. do not modify the graph while iterating."""
+        rev = self._reverse.get(relation)
+        if rev != None and v in rev:
+            return rev[v].keys()
+        else:
+            return _nokeys
+
+    def outgoing_vertices(self, v, relation):
+        """return list of vertices to which an edge of given relation goes from v"""
+        return list(self.outgoing(v, relation))
+
+    def ingoing_vertices(self, v, relation):
+        """return list of vertices from which an edge of given relation goes to v"""
+        return list(self.ingoing(v, relation))
+
+    def __str__(self):
+        s = "MultiGraph("
+        for relation in self._dict:
+            s += str(relation)+":"
+            s += str(dict([(v, list(self._dict[relation][v])) for v in self._dict[relation]]))
+            s += ","
+        s += ")"
+        return s
+
+# end class MultiGraph
+
+# empty view, returned by MultiGraph.outgoing and ingoing 
+_nokeys = {}.keys()
+
+
 def random_graph(vertices, edges, bidirectional = False, basename="v"):
     """generate a random graph with given number of
     vertices and edges"""
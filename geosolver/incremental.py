@@ -71,6 +71,20 @@ class IncrementalSet(notify.Notifier, notify.Listener):
         else:
             self.add_notifier(incset)
 
+    def add_listener(self, listener, events=None):
+        """Add a listener (to the original, if this is a reference to an equivalent incset)"""
+        if self._ref:
+            self._ref().add_listener(listener, events)
+        else:
+            notify.Notifier.add_listener(self, listener, events)
+
+    def rem_listener(self, listener):
+        """Remove a listener (from the original, if this is a reference to an equivalent incset)"""
+        if self._ref:
+            self._ref().rem_listener(listener)
+        else:
+            notify.Notifier.rem_listener(self, listener)
+
     def receive_notify(self, source, message):
         if source in self.notifiers:
             (action, object) = message
@@ -98,7 +112,8 @@ class IncrementalSet(notify.Notifier, notify.Listener):
             # else add object to self
             if object not in self._objects:
                 self._objects.add(object)
-                self.send_notify(("add", object))
+                if not self.silent:
+                    self.send_notify(("add", object))
 
     def _remove(self, object):
         """Remove an object and send notification to listeners"""
@@ -108,7 +123,8 @@ class IncrementalSet(notify.Notifier, notify.Listener):
         else:
             if object in self._objects:
                 self._objects.remove(object)
-                self.send_notify(("remove", object))
+                if not self.silent:
+                    self.send_notify(("remove", object))
 
     def __iter__(self):
         """Returns an iterator for the objects contained here. 
@@ -156,7 +156,7 @@ def ll_int(p1, v1, p2, v2):
     """Intersect line though p1 direction v1 with line through p2 direction v2.
        Returns a list of zero or one solutions
     """
-    diag_print("ll_int "+str(p1)+str(v1)+str(p2)+str(v2),"intersections")
+    diag_print("ll_int %s%s%s%s", "intersections", p1, v1, p2, v2)
     if tol_eq((v1[0]*v2[1])-(v1[1]*v2[0]),0):
         return []
     elif not tol_eq(v2[1],0.0):
@@ -173,7 +173,7 @@ def lr_int(p1, v1, p2, v2):
     """Intersect line though p1 direction v1 with ray through p2 direction v2.
        Returns a list of zero or one solutions
     """
-    diag_print("lr_int "+str(p1)+str(v1)+str(p2)+str(v2),"intersections")
+    diag_print("lr_int %s%s%s%s", "intersections", p1, v1, p2, v2)
     s = ll_int(p1,v1,p2,v2)
     if len(s) > 0 and tol_gte(vector.dot(s[0]-p2,v2), 0):
         return s
@@ -184,7 +184,7 @@ def rr_int(p1, v1, p2, v2):
     """Intersect ray though p1 direction v1 with ray through p2 direction v2.
        Returns a list of zero or one solutions
     """
-    diag_print("rr_int "+str(p1)+str(v1)+str(p2)+str(v2),"intersections")
+    diag_print("rr_int %s%s%s%s", "intersections", p1, v1, p2, v2)
     s = ll_int(p1,v1,p2,v2)
     if len(s) > 0 and tol_gte(vector.dot(s[0]-p2,v2), 0) and tol_gte(vector.dot(s[0]-p1,v1),0):
         return s
@@ -644,9 +644,9 @@ def test_cc_int():
     if random.random() < 0.33:
         r2 = abs(r1-vector.norm(p1-p2))
     # do interesection 
-    diag_print("problem:"+str(p1)+","+str(r1)+","+str(p2)+","+str(r2),"test_cc_int")
+    diag_print("problem:%s,%s,%s,%s", "test_cc_int", p1, r1, p2, r2)
     sols = cc_int(p1, r1, p2, r2)
-    diag_print("solutions:"+str(list(map(str, sols))),"test_cc_int")
+    diag_print(lambda: "solutions:"+str(list(map(str, sols))), "test_cc_int")
     # test number of intersections
     if len(sols) == 0:
         if not tol_gt(vector.norm(p2-p1),r1 + r2) and not tol_lt(vector.norm(p2-p1),abs(r1 - r2)) and not tol_eq(vector.norm(p1-p2),0):
@@ -703,14 +703,14 @@ def test_cl_int():
     elif case==3:
         r = r0 + random.random() * r0 # should have 2 ints (unless r0=0) 
     # do interesection 
-    diag_print("problem:"+str(c)+","+str(r)+","+str(o)+","+str(v),"test_cl_int")
+    diag_print("problem:%s,%s,%s,%s", "test_cl_int", c, r, o, v)
     sols = cl_int(c,r,o,v)
-    diag_print("solutions:"+str(list(map(str, sols))),"test_cl_int")
+    diag_print(lambda: "solutions:"+str(list(map(str, sols))), "test_cl_int")
     # distance from point on line closest to circle center
     l = vector.dot(c-o, v) / vector.norm(v)
     p = o + v * l / vector.norm(v)  
     d = vector.norm(p-c)
-    diag_print("distance center to line="+str(d),"test_cl_int")
+    diag_print("distance center to line=%s", "test_cl_int", d)
     # test number of intersections 
     if len(sols) == 0:
         if not tol_gt(d, r):
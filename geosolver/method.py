@@ -10,9 +10,13 @@ the value of 'upstream' variables.
 
 Changes:
 23 Nov 2004 - added Error classes, updated naming and doc conventions (PEP 8, 257)
+18 Oct 2026 - propagate executes affected methods once, in topological order
+18 Oct 2026 - cycles detected incrementally by maintaining the topological order
+18 Oct 2026 - added Plan, a compiled straight-line program of a method graph
 """
 
-from .graph import Graph
+import heapq
+from .graph import Graph, IndexedGraph
 
 # ----------- misc stuff -----------
 
@@ -93,6 +97,23 @@ class Method:
         """
         raise NotImplementedError
 
+    def kernel(self):
+        """return a function for use in a Plan.
+
+           The function maps a list of input values (in the order of inputs())
+           to a list of output values (in the order of outputs()), with None 
+           for outputs that could not be determined. This default kernel builds
+           an input map and calls execute. Subclasses may return a faster function
+           that uses the values directly (e.g. AddMethod).
+        """
+        inputs = self.inputs()
+        outputs = self.outputs()
+        def kernel(values):
+            outmap = self.execute(dict(zip(inputs, values)))
+            return [outmap.get(var) for var in outputs]
+        # end def
+        return kernel
+
 # ----------- class MethodGraph -------
 
 class MethodGraph:
@@ -119,10 +140,20 @@ class MethodGraph:
         """A map from variable names to values"""
         self._methods = {}
         """A set of methods"""
-        self._graph = Graph()
+        self._graph = IndexedGraph()
         """A graph for fast navigation"""
         self._changed = {}
         """Set of changed variables since last propagation"""
+        self._scheduled = {}
+        """Set of methods to be executed at the next propagation"""
+        self._order = {}
+        """A map from variables and methods to their rank in a topological order"""
+        self._rank = 0
+        """The rank assigned to the next vertex added to the graph"""
+        self._executions = 0
+        """Number of methods executed by propagate"""
+        self._saved = 0
+        """Number of method executions saved by scheduling each method once"""
 
     def variables(self):
         """return a list of variables"""
@@ -140,6 +171,7 @@ class MethodGraph:
         if not varname in self._map:
             self._map[varname] = value
             self._graph.add_vertex(varname)
+            self._add_rank(varname)
     
     def rem_variable(self, varname):
         """Remove a variable and all methods on that variable"""
@@ -154,6 +186,7 @@ class MethodGraph:
                 self.rem_method(met)
             # remove it from graph
             self._graph.rem_vertex(varname)
+            del self._order[varname]
         else:
             raise Exception("variable not in graph")
     # end rem variable
@@ -162,6 +195,14 @@ class MethodGraph:
         """get the value of a variable"""
         return self._map[varname]
 
+    def determining_method(self, varname):
+        """return the method that determines the value of a variable, or None"""
+        methods = self._graph.ingoing_vertices(varname)
+        if len(methods) == 0:
+            return None
+        else:
+            return methods[0]
+
     def set(self, varname, value, prop = True):
         """Set the value of a variable.
         
@@ -186,6 +227,9 @@ class MethodGraph:
         # update graph    
         for var in met.inputs():
             self.add_variable(var)
+        self._graph.add_vertex(met)
+        self._add_rank(met)
+        for var in met.inputs():
             self._graph.add_edge(var, met)
         for var in met.outputs():
             self.add_variable(var)
@@ -196,7 +240,7 @@ class MethodGraph:
             if len(self._graph.ingoing_vertices(var)) > 1: 
                 self.rem_method(met)
                 raise ValidityError("variable "+str(var)+" determined by multiple methods")
-            elif len(self._graph.path(var, var)) != 0:
+            elif not self._reorder(met, var):
                 self.rem_method(met)
                 raise ValidityError("cylce in graph not allowed (variable "+str(var)+")")
         # end for    
@@ -204,15 +248,67 @@ class MethodGraph:
         if prop:
             self._execute(met)
             self.propagate()
+        else:
+            self.schedule(met)
         
     def rem_method(self, met):
         """Remove a method"""
         if met in self._methods:
             del self._methods[met]
+            if met in self._scheduled:
+                del self._scheduled[met]
             self._graph.rem_vertex(met)
+            del self._order[met]
         else:
             raise Exception("method not in graph")
 
+    def _add_rank(self, vertex):
+        """Place a new vertex at the end of the topological order"""
+        self._order[vertex] = self._rank
+        self._rank += 1
+
+    def _reorder(self, source, target):
+        """Update the topological order after adding an edge from source to target.
+           
+           Only the vertices ranked between target and source are visited 
+           (Pearce-Kelly). Returns False iff the edge closes a cycle.
+        """
+        lower = self._order[target]
+        upper = self._order[source]
+        if lower > upper:
+            return True
+        # vertices reachable from target, ranked before source
+        forward = []
+        visited = set([target])
+        stack = [target]
+        while len(stack) > 0:
+            vertex = stack.pop()
+            forward.append(vertex)
+            for next in self._graph.outgoing(vertex):
+                if next == source:
+                    return False
+                if next not in visited and self._order[next] < upper:
+                    visited.add(next)
+                    stack.append(next)
+        # vertices reaching source, ranked after target
+        backward = []
+        visited = set([source])
+        stack = [source]
+        while len(stack) > 0:
+            vertex = stack.pop()
+            backward.append(vertex)
+            for prev in self._graph.ingoing(vertex):
+                if prev not in visited and self._order[prev] > lower:
+                    visited.add(prev)
+                    stack.append(prev)
+        # re-use the ranks of the visited vertices, placing backward before forward
+        backward.sort(key=lambda v: self._order[v])
+        forward.sort(key=lambda v: self._order[v])
+        ranks = sorted([self._order[v] for v in backward + forward])
+        for (vertex, rank) in zip(backward + forward, ranks):
+            self._order[vertex] = rank
+        return True
+
     def propagate(self):
         """Propagate any pending changes.
         
@@ -221,18 +317,64 @@ class MethodGraph:
         from set() and add_method() by default. However, if the
         user so chooses, the methods will not call propagate, and
         the user should call this fucntion at a convenient time. 
+
+        Methods affected by the changes are executed in topological
+        order, so each method is executed at most once, after all its
+        input variables have been updated.
         """
-        while len(self._changed) != 0:
-            pick = list(self._changed.keys())[0]
-            methods = self._graph.outgoing_vertices(pick)
-            for met in methods:
-                self._execute(met)
+        if len(self._changed) == 0 and len(self._scheduled) == 0:
+            return
+        order = self._order
+        queue = []
+        scheduled = set(self._scheduled)
+        for met in self._scheduled:
+            heapq.heappush(queue, (order[met], met))
+        self._scheduled = {}
+        changed = list(self._changed.keys())
+        self._changed = {}
+        for var in changed:
+            self._schedule(var, order, queue, scheduled)
+        while len(queue) > 0:
+            (rank, met) = heapq.heappop(queue)
+            self._execute(met)
+            self._executions += 1
+            for var in met.outputs():
+                if var in self._changed:
+                    del self._changed[var]
+                    self._schedule(var, order, queue, scheduled)
             #end for
-            if pick in self._changed:
-                del self._changed[pick]
         #end while
+        self._changed = {}
     #end def propagate
+
+    def _schedule(self, var, order, queue, scheduled):
+        """Schedule the methods depending on a changed variable"""
+        for met in self._graph.outgoing(var):
+            if met in scheduled:
+                self._saved += 1
+            else:
+                scheduled.add(met)
+                heapq.heappush(queue, (order[met], met))
+
+    def schedule(self, met):
+        """Schedule a method for execution at the next propagation, 
+           even if none of its input variables have changed."""
+        if met in self._methods:
+            self._scheduled[met] = 1
+        else:
+            raise Exception("method not in graph")
+
+    def statistics(self):
+        """Returns a dictionary with the number of method executions by
+           propagate and the number of executions saved by scheduling
+           each affected method only once per propagation.
+        """
+        return {"executions":self._executions, "saved":self._saved}
     
+    def compile(self):
+        """Returns a Plan for re-evaluating the methods in this graph. See Plan."""
+        return Plan(self)
+
     def clear(self):
         """clear methodgraph by removing all variables"""
         while (len(self._map) > 0):    
@@ -299,6 +441,81 @@ class MethodGraph:
 
 # end class MethodGraph
 
+# ----------- class Plan -------
+
+class Plan:
+    """A straight-line program, compiled from a MethodGraph.
+
+       The plan lists the methods of the graph in topological order, 
+       with the input and output variables of each method resolved in
+       advance to positions in a flat list of values. 
+       
+       The parameters of the plan are the variables that are not 
+       determined by any method. Evaluating the plan for new parameter 
+       values executes each method exactly once, in order, without any 
+       graph traversal or change propagation. The method graph itself is 
+       not changed. 
+       
+       A plan must be compiled again when methods are added to or 
+       removed from the method graph. 
+    """
+
+    def __init__(self, methodgraph):
+        """Compile a plan for the current methods and values of a MethodGraph"""
+        order = methodgraph._order
+        self._variables = list(methodgraph._map.keys())
+        self._variables.sort(key=lambda var: order[var])
+        slot = {}
+        for var in self._variables:
+            slot[var] = len(slot)
+        self._values = [methodgraph._map[var] for var in self._variables]
+        """The values of all variables when the plan was compiled"""
+        graph = methodgraph._graph
+        self._parameters = [var for var in self._variables if len(graph.ingoing_vertices(var)) == 0]
+        self._parameter_slots = [slot[var] for var in self._parameters]
+        methods = list(methodgraph._methods.keys())
+        methods.sort(key=lambda met: order[met])
+        self._program = []
+        """A list of (kernel, input slots, output slots), in topological order"""
+        for met in methods:
+            inslots = [slot[var] for var in met.inputs()]
+            outslots = [slot[var] for var in met.outputs()]
+            self._program.append((met.kernel(), inslots, outslots))
+
+    def parameters(self):
+        """return the list of parameter variables, in the order expected by evaluate"""
+        return list(self._parameters)
+    
+    def variables(self):
+        """return the list of all variables in the plan"""
+        return list(self._variables)
+
+    def evaluate(self, values):
+        """Evaluate the plan for a list of parameter values, given in the 
+           order of parameters(). Returns a map from variables to values.
+           A method is not executed if any of its inputs is None; its outputs 
+           will be None.
+        """
+        if len(values) != len(self._parameters):
+            raise Exception("expected "+str(len(self._parameters))+" parameter values")
+        slots = list(self._values)
+        for (i, value) in zip(self._parameter_slots, values):
+            slots[i] = value
+        for (kernel, inslots, outslots) in self._program:
+            invalues = [slots[i] for i in inslots]
+            if None in invalues:
+                outvalues = [None] * len(outslots)
+            else:
+                outvalues = kernel(invalues)
+            for (i, value) in zip(outslots, outvalues):
+                slots[i] = value
+        return dict(zip(self._variables, slots))
+
+    def __str__(self):
+        return "Plan(parameters="+str(len(self._parameters))+", methods="+str(len(self._program))+")"
+
+# end class Plan
+
 # ----------- various Methods ---------
 
 class OrMethod(Method):
@@ -315,6 +532,15 @@ class OrMethod(Method):
         outmap[self._outputs[0]] = result
         return outmap
 
+    def kernel(self):
+        def kernel(values):
+            result = False
+            for value in values:
+                result = result | value
+            return [result]
+        # end def
+        return kernel
+
     def __str__(self):
         s = "OrMethod("
         s += str(self._inputs[0])
@@ -342,6 +568,12 @@ class AddMethod(Method):
         #fi
         return outmap
 
+    def kernel(self):
+        def kernel(values):
+            return [values[0] + values[1]]
+        # end def
+        return kernel
+
     def __str__(self):
         s = "AddMethod("
         s += str(self._inputs[0])
@@ -368,6 +600,12 @@ class SubMethod(Method):
             outmap[c] = inmap[a] - inmap[b]
         #fi
         return outmap
+
+    def kernel(self):
+        def kernel(values):
+            return [values[0] - values[1]]
+        # end def
+        return kernel
  
     def __str__(self):
         s = "SubMethod("
@@ -394,6 +632,13 @@ class SetMethod(Method):
  
     def execute(self, inmap):
         return {self._outputs[0]:self._value}
+
+    def kernel(self):
+        outvalues = [self._value]
+        def kernel(values):
+            return outvalues
+        # end def
+        return kernel
  
     def __str__(self):
         s = "SetMethod("
@@ -1,5 +1,6 @@
 """Base classes for multi-valued assignments in methodgraphs"""
 
+import itertools
 from .method import Method, MethodGraph
 
 class MultiVariable:
@@ -34,7 +35,8 @@ class MultiMethod(Method):
        The output values returned by subsequent calls multi-execute are collected and stored in the 
        output MultiVariable.
 
-       Note that a set of values for the outputvariable is stored, so that equivalent values are only stored once.
+       Note that only distinct values for the outputvariable are stored (see distinct), so that
+       equivalent values are only stored once.
     """
     
     def __init__(self):
@@ -66,14 +68,59 @@ class MultiMethod(Method):
         if len(multi_inputs) > 0:
             mvar = multi_inputs[0]
             values = inmap[mvar]
-            output = set()
+            output = []
             for value in values:
                 base_inmap[mvar] = value
-                output.update(self._recurse_execute(inmap, base_inmap, multi_inputs[1:]))
-            return output
+                output.extend(self._recurse_execute(inmap, base_inmap, multi_inputs[1:]))
+            return distinct(output)
         else:
             return self.multi_execute(base_inmap)
 
+    def kernel(self):
+        """returns a function for use in a Plan, that calls multi_execute for each 
+           combination of values of the multi-valued input variables, without recursion.
+           The output value is the same as for execute. multi_execute is still 
+           given an input map, so one map is built per call of the kernel."""
+        inputs = list(self._inputs)
+        multi = [i for i in range(len(inputs)) if inputs[i] in self._multi_inputs]
+        base = [i for i in range(len(inputs)) if inputs[i] not in self._multi_inputs]
+        def kernel(values):
+            inmap = {}
+            for i in base:
+                inmap[inputs[i]] = values[i]
+            if len(multi) == 0:
+                return [self.multi_execute(inmap)]
+            output = []
+            for combination in itertools.product(*[values[i] for i in multi]):
+                for (i, value) in zip(multi, combination):
+                    inmap[inputs[i]] = value
+                output.extend(self.multi_execute(inmap))
+            return [distinct(output)]
+        # end def
+        return kernel
+
+
+def distinct(values):
+    """Returns a list of the distinct values in a list, in order of first occurrence. 
+       Values with a bucket method (see Configuration.bucket) are only compared 
+       with values in the same or a neighbouring bucket. Other values are compared 
+       by hash, as in a set.
+    """
+    result = []
+    seen = set()
+    buckets = {}
+    for value in values:
+        if hasattr(value, "bucket"):
+            bucket = value.bucket()
+            if any([value in buckets.get(b, ()) for b in (bucket-1, bucket, bucket+1)]):
+                continue
+            buckets.setdefault(bucket, []).append(value)
+        else:
+            if value in seen:
+                continue
+            seen.add(value)
+        result.append(value)
+    return result
 
 #####
 
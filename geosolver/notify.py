@@ -8,6 +8,8 @@
 # - member variables "listeners" and "notifiers" are not hidden, but should never be modified directly, so be careful! 
 # - subclasses of Listener will want to override the receive_notify class.
 # - Notifier/Listener subclasses __init__ method  must call Notifier/Listener.__init__(self) 
+# - messages are typically tuples (type, data). Listeners may subscribe to some message types only.
+# - notifiers that send many messages should test self.silent before creating a message.
 
 import weakref
 
@@ -15,27 +17,70 @@ class Notifier:
     """A notifier keeps a list of Listener instances that are to be informed of certain events.
     
        instance attributes:
-        listeners       - a list of Listener instances
+        listeners       - a list of Listener instances (mapped to True, or to 
+                          the set of message types the listener subscribed to)
+        silent          - True if messages would not be sent to anyone, so need not be created. 
+                          (may be False when there are no listeners, e.g. after a listener was deleted)
     """
 
+    # while holding notifications, a list of queued (notifier, message) tuples
+    _held = None
+
+    # no listeners and not holding notifications 
+    silent = True
+
     def __init__(self):
         self.listeners = weakref.WeakKeyDictionary()
-
-    def add_listener(self, listener):
-        """add a listener to the list (and self to listers' list)"""
-        self.listeners[listener] = True
+        self.silent = True
+
+    def add_listener(self, listener, events=None):
+        """add a listener to the list (and self to listers' list).
+           If events is given, a list of message types, then only messages 
+           of those types (see message_type) are sent to the listener.
+        """
+        if events == None:
+            self.listeners[listener] = True
+        else:
+            self.listeners[listener] = frozenset(events)
         listener.notifiers[self] = True
+        self.silent = False
 
     def rem_listener(self, listener):
         """remove a listener from the list (and self from listers' list)"""
         del self.listeners[listener] 
         del listener.notifiers[self] 
+        self._update_silent()
 
     def send_notify(self, message):
-        """send a message to all listeners"""
-        for dest in self.listeners:
+        """send a message to all listeners (or queue it, see hold_notify)"""
+        if self.silent:
+            return
+        if self._held != None:
+            self._held.append((self, message))
+            return
+        type = None
+        for (dest, events) in self.listeners.items():
+            if events is not True:
+                if type == None:
+                    type = message_type(message)
+                if type not in events:
+                    continue
             dest.receive_notify(self, message)
 
+    def hold_notify(self, queue):
+        """do not send messages, but append (self, message) tuples to the given queue (a list),
+           until release_notify is called. Several notifiers may share a queue."""
+        self._held = queue
+        self.silent = False
+
+    def release_notify(self):
+        """send messages again. Queued messages are not sent."""
+        self._held = None
+        self._update_silent()
+
+    def _update_silent(self):
+        self.silent = self._held == None and len(self.listeners) == 0
+
     def __getstate__(self):
         """when pickling... do not save self.listeners"""
         dict = self.__dict__.copy()
@@ -46,6 +91,7 @@ class Notifier:
         """when unpickling... create new self.listeners"""
         self.__dict__ = dict
         self.listeners = weakref.WeakKeyDictionary()
+        self._update_silent()
 
 class Listener:
     """A listener is notified by one or more Notifiers.
@@ -57,15 +103,13 @@ class Listener:
     def __init__(self):
         self.notifiers = weakref.WeakKeyDictionary();
 
-    def add_notifier(self, notifier):
-        """add a notifier to the list (and self to notifiers' list)"""
-        self.notifiers[notifier] = True
-        notifier.listeners[self] = True
+    def add_notifier(self, notifier, events=None):
+        """add a notifier to the list (and self to notifiers' list), see Notifier.add_listener"""
+        notifier.add_listener(self, events)
 
     def rem_notifier(self, notifier):
         """remove a notifier from the list (and self from notifiers' list)"""
-        del self.notifiers[notifier]
-        del notifier.listeners[self]
+        notifier.rem_listener(self)
 
     def receive_notify(self, source, message):
         """receive a message from a notifier. Implementing classes should override this."""
@@ -83,3 +127,10 @@ class Listener:
         self.notifiers = weakref.WeakKeyDictionary()
 
 
+def message_type(message):
+    """the type of a message, i.e. the first element of a tuple, or the message itself"""
+    if isinstance(message, tuple):
+        return message[0]
+    else:
+        return message
+
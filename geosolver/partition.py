@@ -0,0 +1,99 @@
+"""Solving problems that consist of several independent parts.
+
+The constraint graph of a GeometricProblem may consist of several connected
+components, e.g. when a problem describes several disconnected assemblies.
+Such components can be solved independently. split_problem returns a problem
+for each component and solve_components solves these problems in a pool of
+worker processes, and merges the results into a single GeometricDecomposition.
+"""
+
+import multiprocessing
+import pickle
+from .geometric import GeometricProblem, GeometricSolver, GeometricDecomposition, ParametricConstraint
+from .diagnostic import diag_print
+
+def split_problem(problem):
+    """Returns a list of GeometricProblems, one for each connected component of the 
+       constraint graph of the given problem. Fixed points (see FixConstraint) are in the 
+       same component, because a GeometricSolver fixes them all in one cluster. 
+       Returns [problem] if the problem has only one component. 
+       Note: the constraints are shared with the given problem, not copied, 
+       and the returned problems listen to them (see _detach).
+    """
+    subsets = problem.cg.connected_subsets()
+    fixed = [s for s in subsets if any(problem.get_fix(var) for var in s)]
+    if len(fixed) > 1:
+        subsets = [s for s in subsets if s not in fixed]
+        subsets.append(frozenset().union(*fixed))
+    if len(subsets) <= 1:
+        return [problem]
+    problems = []
+    for subset in subsets:
+        subproblem = GeometricProblem(problem.dimension, problem.get_prototype_selection())
+        constraints = set()
+        for var in subset:
+            subproblem.add_variable(var, problem.get_prototype(var))
+            constraints.update(problem.cg.get_constraints_on(var))
+        for con in constraints:
+            subproblem.add_constraint(con)
+        problems.append(subproblem)
+    return problems
+
+def merge_decompositions(problem, decompositions):
+    """Returns a GeometricDecomposition of a problem, given the decompositions of 
+       its components (see split_problem). As for a problem solved by a single 
+       GeometricSolver, a problem with several components is structurally 
+       under-constrained, and the top-level rigids of the components are its subs.
+    """
+    if len(decompositions) == 1:
+        return decompositions[0]
+    result = GeometricDecomposition(problem.cg.variables())
+    result.flag = GeometricDecomposition.UNDERCONSTRAINED
+    for decomposition in decompositions:
+        if decomposition.flag == GeometricDecomposition.UNDERCONSTRAINED:
+            result.subs.extend(decomposition.subs)
+        else:
+            result.subs.append(decomposition)
+    return result
+
+def solve_components(problem, processes=None):
+    """Solve the connected components of a problem independently, and returns 
+       a GeometricDecomposition of the whole problem.
+    
+       keyword args
+        problem     - a GeometricProblem
+        processes   - the number of worker processes (default: the number of CPUs). 
+                      If 1, or if there is only one component, or if no worker processes
+                      can be created, the components are solved in this process. 
+    """
+    problems = split_problem(problem)
+    diag_print("%d components", "partition", len(problems))
+    decompositions = None
+    if processes != 1 and len(problems) > 1:
+        # largest components first, for better load balancing
+        order = sorted(range(len(problems)), key=lambda i: -len(problems[i].cg.constraints()))
+        try:
+            with multiprocessing.Pool(processes) as pool:
+                results = pool.map(_solve, [problems[i] for i in order], 1)
+            decompositions = [None] * len(problems)
+            for (i, result) in zip(order, results):
+                decompositions[i] = result
+        except (OSError, pickle.PicklingError) as e:
+            diag_print("could not solve components in worker processes: %s", "partition", e)
+            decompositions = None
+    if decompositions == None:
+        decompositions = [_solve(subproblem) for subproblem in problems]
+    if len(problems) > 1:
+        for subproblem in problems:
+            _detach(subproblem)
+    return merge_decompositions(problem, decompositions)
+
+def _detach(problem):
+    """stop a problem returned by split_problem from listening to its constraints"""
+    for con in problem.cg.constraints():
+        if isinstance(con, ParametricConstraint) and problem in con.listeners:
+            con.rem_listener(problem)
+
+def _solve(problem):
+    """solve a problem (in a worker process) and returns its decomposition"""
+    return GeometricSolver(problem).get_decomposition()
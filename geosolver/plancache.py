@@ -0,0 +1,101 @@
+"""A cache for decompositions (traces of a ClusterSolver), keyed by the
+structure of geometric constraint problems.
+
+Structurally identical problems, i.e. problems with the same variables and
+the same types of constraints on the same variables, have the same
+decomposition, regardless of the values of the constraints and prototypes.
+A GeometricSolver with a PlanCache replays the cached decomposition of
+such a problem, instead of searching for it again.
+"""
+
+import collections
+import pickle
+import shelve
+from .diagnostic import diag_print
+
+def problem_signature(problem):
+    """Returns a structural signature of a GeometricProblem, i.e. a hashable
+       object that depends on the variables and the types of the constraints
+       of the problem, but not on their values or the prototype."""
+    variables = sorted([str(var) for var in problem.cg.variables()])
+    constraints = []
+    for con in problem.cg.constraints():
+        convars = tuple([str(var) for var in con.variables()])
+        constraints.append((con.__class__.__name__, convars))
+    constraints.sort()
+    return (problem.dimension, bool(problem.get_prototype_selection()), tuple(variables), tuple(constraints))
+
+class PlanCache:
+    """A least-recently-used cache of decompositions, keyed by problem signature.
+
+       If a filename is given, decompositions are also stored in a shelve database
+       with that name, so they can be re-used by other processes.
+    """
+
+    def __init__(self, capacity=100, filename=None):
+        """Create a new PlanCache
+
+           keyword args
+            capacity    - maximum number of decompositions kept in memory
+            filename    - name of the on-disk store (None for in-memory only)
+        """
+        self._capacity = capacity
+        self._entries = collections.OrderedDict()
+        self._filename = filename
+        self._hits = 0
+        self._misses = 0
+
+    def lookup(self, signature):
+        """Returns the decomposition stored for the given signature, or None"""
+        key = repr(signature)
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return self._entries[key]
+        if self._filename != None:
+            with shelve.open(self._filename) as db:
+                if key in db:
+                    self._hits += 1
+                    trace = db[key]
+                    self._store(key, trace)
+                    return trace
+        self._misses += 1
+        return None
+
+    def store(self, signature, trace):
+        """Store a decomposition for the given signature"""
+        key = repr(signature)
+        self._store(key, trace)
+        if self._filename != None:
+            try:
+                with shelve.open(self._filename) as db:
+                    db[key] = trace
+            except (pickle.PicklingError, TypeError, AttributeError) as e:
+                diag_print("could not store decomposition on disk: %s", "PlanCache", e)
+
+    def _store(self, key, trace):
+        self._entries[key] = trace
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._capacity:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Remove all decompositions from memory (not from the on-disk store)"""
+        self._entries.clear()
+
+    def statistics(self):
+        """Returns a dictionary with the number of hits and misses, the hit rate
+           and the number of decompositions in memory."""
+        total = self._hits + self._misses
+        if total > 0:
+            rate = float(self._hits) / total
+        else:
+            rate = 0.0
+        return {"hits":self._hits, "misses":self._misses, "hitrate":rate, "size":len(self._entries)}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __str__(self):
+        return "PlanCache(hits=%d, misses=%d, size=%d)"%(self._hits, self._misses, len(self._entries))
+
@@ -21,10 +21,17 @@ class SelectionConstraint(Constraint):
     def __str__(self):
          return "SelectionConstraint("+self._function.__name__+","+str(list(map(str, self._variables)))+")"
 
+class _Not:
+    """negation of a function (unlike a lambda, it can be pickled)"""
+    def __init__(self, function):
+        self._function = function
+        self.__name__ = "fnot("+function.__name__+")"
+
+    def __call__(self, *args):
+        return not self._function(*args)
+
 def fnot(function):
-    notf = lambda *args: not function(*args)
-    notf.__name__ = "fnot("+function.__name__+")"
-    return notf
+    return _Not(function)
 
 def test():
     print(SelectionConstraint(is_right_handed, ['a','b','c','d']))
@@ -0,0 +1,55 @@
+"""Saving and loading the state of solvers, so a decomposition does not have
+to be solved again every time a program is started.
+
+A GeometricSolver (including its GeometricProblem) or a ClusterSolver can be
+saved with save(solver, filename) and restored with load(filename).
+
+The names of the root variables of clusters (see clsolver.rootname) depend on
+the identity of the clusters. These names are not saved as strings, but as a
+reference to their cluster, so they are renamed when the clusters are restored.
+"""
+
+import pickle
+from .clsolver import ClusterSolver, rootname
+
+class _SnapshotPickler(pickle.Pickler):
+    """Pickler that saves root variable names as references to their clusters"""
+
+    def __init__(self, file, roots):
+        pickle.Pickler.__init__(self, file, pickle.HIGHEST_PROTOCOL)
+        self._roots = roots
+
+    def persistent_id(self, obj):
+        if type(obj) == str and obj in self._roots:
+            return ("root", self._roots[obj])
+        return None
+
+class _SnapshotUnpickler(pickle.Unpickler):
+    """Unpickler that restores root variable names of the restored clusters"""
+
+    def persistent_load(self, pid):
+        (type, cluster) = pid
+        if type == "root":
+            return rootname(cluster)
+        raise pickle.UnpicklingError("unknown persistent id "+str(pid))
+
+def _cluster_solver(solver):
+    if isinstance(solver, ClusterSolver):
+        return solver
+    else:
+        return solver.dr
+
+def save(solver, filename):
+    """Save a GeometricSolver or ClusterSolver to a file"""
+    clsolver = _cluster_solver(solver)
+    roots = {}
+    for cluster in clsolver.clusters():
+        roots[rootname(cluster)] = cluster
+    with open(filename, "wb") as file:
+        _SnapshotPickler(file, roots).dump(solver)
+
+def load(filename):
+    """Returns a GeometricSolver or ClusterSolver, loaded from a file"""
+    with open(filename, "rb") as file:
+        return _SnapshotUnpickler(file).load()
+
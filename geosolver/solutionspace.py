@@ -0,0 +1,242 @@
+"""Factored representation of the values of multi-valued variables. 
+
+The value of a MultiVariable in a MethodGraph is the set of all values 
+determined by its MultiMethod, for all combinations of values of the input 
+MultiVariables. These sets are materialised by propagation, so the number 
+of values (e.g. configurations of a cluster) grows with the product of the 
+numbers of values of the inputs at every level. 
+
+A SolutionSpace represents the values of a variable by the methods that 
+determine it, i.e. as a DAG of choices: a value is determined by a choice 
+of a value for each input, and a choice of one of the values returned 
+by multi_execute for these inputs. The values are only computed when 
+requested: the space can be enumerated lazily, sampled randomly, searched 
+for the values closest to a prototype, and counted. 
+
+Note that the number of values returned by multi_execute depends on the 
+input values (e.g. two, one or no intersections of circles), so the number 
+of values cannot be derived from the structure of the DAG alone. Counting 
+is as expensive as enumerating; only sampling avoids enumeration.
+"""
+
+import heapq
+import random
+from .multimethod import MultiVariable, MultiMethod
+
+class SolutionSpace:
+    """The values of a MultiVariable in a MethodGraph, in factored form.
+
+       Values are derived from the values of the variables that are not determined 
+       by a MultiMethod (e.g. the configurations of primitive clusters and root flags), 
+       as currently set in the method graph. Values of determined variables in the 
+       method graph are not used, so the method graph need not be propagated.
+
+       The values of inputs that must be iterated more than once (inputs of methods
+       with several multi-valued inputs) are materialised, as sets, when first needed. 
+       Other values are generated one at a time. Note: equivalent values reached by 
+       different choices are generated once for each choice. 
+    """
+
+    def __init__(self, methodgraph, variable, map=None):
+        """Create a new SolutionSpace
+        
+           keyword args
+            methodgraph     - a MethodGraph
+            variable        - a MultiVariable in the method graph
+            map             - a function applied to each value returned (optional)
+        """
+        self._mg = methodgraph
+        self._variable = variable
+        self._map = map
+        self._materialised = {}
+
+    def __iter__(self):
+        """generate all values, one at a time"""
+        for value in self._generate(self._variable):
+            yield self._mapped(value)
+
+    def count(self):
+        """returns the number of values (i.e. of choices resulting in a value).
+           Note: this executes the methods for all combinations of input values, 
+           like enumerating all values (but values are not kept), so the cost 
+           grows with the number of values. See module documentation.
+        """
+        n = 0
+        for value in self._generate(self._variable):
+            n += 1
+        return n
+
+    def sample(self, n=1, rng=random, tries=100):
+        """returns a list of (at most) n randomly chosen values. 
+           Each value is determined by random choices, without enumerating the space. 
+           Choices that result in no value are tried again, at most tries times in total.
+        """
+        samples = []
+        while len(samples) < n and tries > 0:
+            value = self._sample(self._variable, rng, {})
+            if value != None:
+                samples.append(self._mapped(value))
+            else:
+                tries -= 1
+        return samples
+
+    def closest(self, k, prototype):
+        """returns the k values closest to a prototype, nearest first. Values must be 
+           Configurations; the prototype is a map from variables to points, and the distance 
+           of a configuration is the sum of squared distances of its points to the prototype.
+        """
+        def distance(configuration):
+            d = 0.0
+            for var in prototype:
+                if var in configuration.map:
+                    d += sum([(a-b)**2 for (a,b) in zip(configuration.map[var], prototype[var])])
+            return d
+        nearest = heapq.nsmallest(k, self._generate(self._variable), key=distance)
+        return [self._mapped(value) for value in nearest]
+
+    def _mapped(self, value):
+        if self._map == None:
+            return value
+        else:
+            return self._map(value)
+
+    def _method(self, variable):
+        """returns the MultiMethod determining a variable, or None"""
+        method = self._mg.determining_method(variable)
+        if isinstance(method, MultiMethod):
+            return method
+        else:
+            return None
+
+    def _values(self, variable):
+        """returns the values of a variable in the method graph, as a list (or None)"""
+        values = self._mg.get(variable)
+        if values == None or not isinstance(variable, MultiVariable):
+            return values
+        else:
+            return list(values)
+
+    def _generate(self, variable):
+        """generate the values of a variable"""
+        if variable in self._materialised:
+            return iter(self._materialised[variable])
+        else:
+            return self._derive(variable)
+
+    def _derive(self, variable):
+        """generate the values of a variable, by executing the method that determines it"""
+        method = self._method(variable)
+        if method == None:
+            values = self._values(variable)
+            if values != None:
+                for value in values:
+                    yield value
+            return
+        inmap = {}
+        multi = []
+        for var in method.inputs():
+            if isinstance(var, MultiVariable):
+                multi.append(var)
+            else:
+                inmap[var] = self._mg.get(var)
+                if inmap[var] == None:
+                    return
+        if len(multi) == 1:
+            combinations = ((value,) for value in self._generate(multi[0]))
+        else:
+            combinations = _product([self._materialise(var) for var in multi])
+        for combination in combinations:
+            for (var, value) in zip(multi, combination):
+                inmap[var] = value
+            for value in method.multi_execute(inmap):
+                yield value
+
+    def _materialise(self, variable):
+        """returns the (distinct) values of a variable, as a sequence that can be 
+           iterated more than once, and is computed as far as it is iterated"""
+        if variable not in self._materialised:
+            if self._method(variable) == None:
+                values = self._values(variable)
+                if values == None:
+                    values = []
+            else:
+                values = _Values(self._derive(variable))
+            self._materialised[variable] = values
+        return self._materialised[variable]
+
+    def _sample(self, variable, rng, chosen):
+        """returns a randomly chosen value of a variable, or None if the choices made result in no value.
+           Chosen maps variables to the values already chosen for this sample."""
+        if variable not in chosen:
+            chosen[variable] = self._choose(variable, rng, chosen)
+        return chosen[variable]
+
+    def _choose(self, variable, rng, chosen):
+        values = self._materialised.get(variable)
+        if isinstance(values, _Values):
+            values = values.computed()
+        if values == None:
+            method = self._method(variable)
+            if method == None:
+                values = self._values(variable)
+            else:
+                inmap = {}
+                for var in method.inputs():
+                    if isinstance(var, MultiVariable):
+                        inmap[var] = self._sample(var, rng, chosen)
+                    else:
+                        inmap[var] = self._mg.get(var)
+                    if inmap[var] == None:
+                        return None
+                values = method.multi_execute(inmap)
+        if values == None or len(values) == 0:
+            return None
+        return rng.choice(list(values))
+
+    def __str__(self):
+        return "SolutionSpace("+str(self._variable)+")"
+
+class _Values:
+    """The distinct values generated by a generator, computed as far as iterated. 
+       Can be iterated more than once, also by nested loops."""
+
+    def __init__(self, generator):
+        self._generator = generator
+        self._values = []
+        self._distinct = set()
+
+    def computed(self):
+        """returns the list of all values, if all have been computed, or None"""
+        if self._generator == None:
+            return self._values
+        else:
+            return None
+
+    def __iter__(self):
+        i = 0
+        while True:
+            if i < len(self._values):
+                yield self._values[i]
+                i += 1
+            elif self._generator == None:
+                return
+            else:
+                try:
+                    value = next(self._generator)
+                except StopIteration:
+                    self._generator = None
+                    self._distinct = None
+                    return
+                if value not in self._distinct:
+                    self._distinct.add(value)
+                    self._values.append(value)
+
+def _product(sequences):
+    """generate all combinations of values of the sequences (like itertools.product, 
+       but without iterating the sequences before the first combination is generated)"""
+    if len(sequences) == 0:
+        yield ()
+        return
+    for value in sequences[0]:
+        for rest in _product(sequences[1:]):
+            yield (value,) + rest
@@ -0,0 +1,270 @@
+#!/usr/bin/env python
+"""This module provides some tests for the ClusterSolver,
+i.e. the internals of the GeoSolver: provenance of constraints,
+bitmasks of clusters, counting over-constraints, incremental matching, 
+the worklist of methods and diagnostic messages."""
+
+import io
+import sys
+import math
+import random
+import itertools
+from geosolver.geometric import GeometricProblem, GeometricSolver, DistanceConstraint, AngleConstraint
+from geosolver.vector import vector
+from geosolver import diagnostic
+from geosolver.diagnostic import diag_print, diag_select, diag_direct, diag_level
+from geosolver.cluster import Angle, Distance, Rigid, Hedgehog, Balloon, Glueable, popcount
+from geosolver.cluster import over_constraints, over_distances, iter_over_constraints, \
+     num_over_constraints, num_over_distances, num_over_angles
+from geosolver import clsolver
+from geosolver.clsolver import ClusterSolver, ClusterMethod, MethodWorklist, pattern2graph, _constraint_key
+from geosolver.clsolver3D import ClusterSolver3D, MergeGlueable, CheckAR, MergePR, MergeDR, MergeRR, MergeSR, \
+     DeriveTTD, DeriveDDD, DeriveADD, DeriveDAD, DeriveAA
+
+# ---------- problems -----
+
+def dad_tetrahedron_problem():
+    """The double tetrahedron problem with an angle (as in test_3d)"""
+    problem = GeometricProblem(dimension=3)
+    problem.add_point('v1', vector([0.0, 0.0, 0.0]))
+    problem.add_point('v2', vector([1.0, 0.0, 0.0]))
+    problem.add_point('v3', vector([0.0, 1.0, 0.0]))
+    problem.add_point('v4', vector([0.5, 0.5, 1.0]))
+    problem.add_point('v5', vector([0.5, 0.5,-1.0]))
+    problem.add_constraint(DistanceConstraint('v1', 'v2', 10.0))
+    problem.add_constraint(AngleConstraint('v2', 'v1','v3', 60.0*math.pi/180.0))
+    problem.add_constraint(DistanceConstraint('v1', 'v3', 10.0))
+    problem.add_constraint(DistanceConstraint('v1', 'v4', 10.0))
+    problem.add_constraint(DistanceConstraint('v2', 'v4', 10.0))
+    problem.add_constraint(DistanceConstraint('v3', 'v4', 10.0))
+    problem.add_constraint(DistanceConstraint('v1', 'v5', 10.0))
+    problem.add_constraint(DistanceConstraint('v2', 'v5', 10.0))
+    problem.add_constraint(DistanceConstraint('v3', 'v5', 10.0))
+    return problem
+
+def cluster_problem(seed, n):
+    """n points with distances and angles on random points, as clusters"""
+    rng = random.Random(seed)
+    points = ['p%d'%i for i in range(n)]
+    clusters = [Rigid([p]) for p in points]
+    for (a, b) in rng.sample(list(itertools.combinations(points, 2)), 2*n):
+        clusters.append(Rigid([a, b]))
+    for i in range(n//2):
+        (a, b, c) = rng.sample(points, 3)
+        clusters.append(Hedgehog(b, [a, c]))
+    return clusters
+
+def angles_problem():
+    """two triangles determined by two angles and a distance each, as clusters"""
+    clusters = [Rigid([p]) for p in ['a', 'b', 'c', 'd']]
+    clusters += [Hedgehog('a', ['b', 'c']), Hedgehog('b', ['a', 'c']), Rigid(['a', 'b'])]
+    clusters += [Hedgehog('c', ['a', 'd']), Hedgehog('a', ['c', 'd']), Rigid(['b', 'd'])]
+    return clusters
+
+class Counted:
+    """an object that counts how often it is converted to a string"""
+    def __init__(self):
+        self.count = 0
+
+    def __str__(self):
+        self.count += 1
+        return "counted"
+
+class CheckedWorklist(MethodWorklist):
+    """a MethodWorklist that checks each method it returns by brute force"""
+    checked = 0
+
+    def next(self):
+        method = MethodWorklist.next(self)
+        # the candidates are the applicable methods, in the order they became applicable
+        assert set(self._candidates) == set(self._methods)
+        candidates = sorted(self._candidates, key=self._candidates.get)
+        nonredundant = [m for m in candidates if not self._solver._is_redundant_method(m)]
+        if len(nonredundant) == 0:
+            assert method == None
+        else:
+            assert method is nonredundant[0]
+        CheckedWorklist.checked += 1
+        return method
+
+def random_cluster(rng, points):
+    """a Rigid, Hedgehog, Balloon or Glueable on some of the given points"""
+    kind = rng.choice([Rigid, Rigid, Hedgehog, Hedgehog, Balloon, Glueable])
+    if kind == Rigid:
+        return Rigid(rng.sample(points, rng.randint(1, len(points))))
+    vars = rng.sample(points, rng.randint(3, len(points)))
+    if kind == Hedgehog:
+        return Hedgehog(vars[0], vars[1:])
+    return kind(vars)
+
+# ---------- pattern matching -----
+
+# the patterns that were matched for the 3D methods before they had incremental matchers
+OLD_PATTERNS = [
+    (MergeRR, [["rigid","$r1",["$a","$b","$c"]], ["rigid", "$r2", ["$a", "$b", "$c"]]]),
+    (DeriveDDD, [["rigid","$d_ab",["$a", "$b"]], ["rigid", "$d_ac",["$a", "$c"]], ["rigid", "$d_bc",["$b","$c"]]]),
+    (DeriveTTD, [["rigid","$t_abc",["$a", "$b", "$c"]], ["rigid","$t_abd",["$a", "$b", "$d"]],
+                 ["rigid","$d_cd",["$c", "$d"]]]),
+    (DeriveDAD, [["rigid","$d_ab",["$a", "$b"]], ["hedgehog", "$a_abc",["$b", "$a", "$c"]],
+                 ["rigid", "$d_bc",["$b","$c"]]]),
+    (DeriveADD, [["hedgehog","$a_cab",["$a", "$c", "$b"]], ["rigid", "$d_ab",["$a", "$b"]],
+                 ["rigid", "$d_bc",["$b","$c"]]]),
+    (DeriveAA, [["hedgehog","$a_cab",["$a", "$c", "$b"]], ["hedgehog", "$a_abc",["$b", "$a","$c"]]]),
+    (MergeSR, [["rigid","$r",["$a","$b"]], ["balloon", "$s", ["$a", "$b"]]]),
+]
+
+class PatternSolver3D(ClusterSolver):
+    """A ClusterSolver3D that finds MergeRR, MergeSR and the Derive methods 
+       by matching their old patterns, instead of with incremental matchers"""
+    def __init__(self):
+        patterned = [type(methodclass.__name__, (methodclass,), {"patterngraph": pattern2graph(pattern)}) 
+                     for (methodclass, pattern) in OLD_PATTERNS]
+        ClusterSolver.__init__(self, [MergeGlueable, CheckAR, MergePR, MergeDR] + patterned)
+        self._incremental_methods = [MergePR, MergeDR]
+
+def decomposition(solver):
+    """the types and variables of the top-level clusters of a solver"""
+    return sorted([(type(c).__name__, sorted(c.vars)) for c in solver.top_level()])
+
+# ---------- tests -----
+
+def test_angle_apex():
+    """angles on the same points, with different apexes, are remembered separately"""
+    assert _constraint_key(Angle('v3','v1','v2')) != _constraint_key(Angle('v1','v3','v2'))
+    assert _constraint_key(Angle('v3','v1','v2')) == _constraint_key(Angle('v2','v1','v3'))
+    assert _constraint_key(Distance('v1','v2')) == _constraint_key(Distance('v2','v1'))
+    assert _constraint_key(Distance('v1','v2')) != _constraint_key(Angle('v1','v2','v2'))
+
+def test_provenance():
+    """the remembered source of each constraint in each cluster is the source
+       that is found when nothing is remembered"""
+    solver = GeometricSolver(dad_tetrahedron_problem())
+    dr = solver.dr
+    assert solver.get_result().flag == "well-constrained"
+    for cluster in dr.clusters():
+        vars = sorted(cluster.vars)
+        angles = []
+        for a in vars:
+            for b in vars:
+                for c in vars:
+                    if a < c and b != a and b != c:
+                        angles.append(Angle(a,b,c))
+        angles = [x for x in angles if dr._contains_constraint(cluster, x)]
+        remembered = [dr._source_constraint_in_cluster(x, cluster) for x in angles]
+        for (angle, source) in zip(angles, remembered):
+            dr._provenance = {}
+            assert dr._source_constraint_in_cluster(angle, cluster) == source, (cluster, angle)
+
+def test_masks():
+    """bitmasks agree with variable sets, and each solver numbers its own variables"""
+    solver = GeometricSolver(dad_tetrahedron_problem())
+    dr = solver.dr
+    clusters = dr.clusters()
+    for c1 in clusters:
+        for c2 in clusters:
+            assert popcount(dr.mask(c1) & dr.mask(c2)) == len(c1.vars.intersection(c2.vars))
+    assert len(dr._varbits) == len(set().union(*[c.vars for c in clusters]))
+    other = GeometricProblem(dimension=3)
+    for (i, name) in enumerate(['x', 'y', 'z']):
+        other.add_point(name, vector([float(i), float(i*i), 0.0]))
+    other.add_constraint(DistanceConstraint('x', 'y', 1.0))
+    other.add_constraint(DistanceConstraint('y', 'z', 1.0))
+    other.add_constraint(DistanceConstraint('x', 'z', 1.0))
+    otherdr = GeometricSolver(other).dr
+    assert max([otherdr.mask(c).bit_length() for c in otherdr.clusters()]) == 3
+    # removed clusters are forgotten
+    rigid = Rigid(['p', 'q'])
+    dr.add(rigid)
+    dr.mask(rigid)
+    dr.remove(rigid)
+    assert rigid not in dr._masks
+
+def test_num_over_constraints():
+    """the over-constraints are counted and generated as they are enumerated"""
+    rng = random.Random(6)
+    points = ['p%d'%i for i in range(7)]
+    total = 0
+    for i in range(300):
+        c1 = random_cluster(rng, points)
+        c2 = random_cluster(rng, points)
+        over = over_constraints(c1, c2)
+        assert num_over_constraints(c1, c2) == len(over), (c1, c2)
+        assert num_over_distances(c1, c2) == len(over_distances(c1, c2))
+        assert num_over_angles(c1, c2) == len([x for x in over if isinstance(x, Angle)])
+        generated = list(iter_over_constraints(c1, c2))
+        assert len(generated) == len(over) and set(generated) == over
+        total += len(over)
+    assert total > 0
+
+def test_incremental_matchers():
+    """the incremental matchers merge the same clusters as the old patterns"""
+    problems = [angles_problem(), cluster_problem(0, 6), cluster_problem(7, 6)]
+    problems += [cluster_problem(seed, 9) for seed in [1, 2, 4]]
+    used = set()
+    for clusters in problems:
+        incremental = ClusterSolver3D()
+        patterned = PatternSolver3D()
+        for cluster in clusters:
+            incremental.add(cluster)
+            patterned.add(cluster)
+        assert decomposition(incremental) == decomposition(patterned)
+        used.update([type(m) for m in incremental.methods() if isinstance(m, ClusterMethod)])
+    assert used.issuperset([methodclass for (methodclass, pattern) in OLD_PATTERNS])
+
+def test_worklist():
+    """the worklist returns the first non-redundant applicable method"""
+    original = clsolver.MethodWorklist
+    clsolver.MethodWorklist = CheckedWorklist
+    CheckedWorklist.checked = 0
+    try:
+        GeometricSolver(dad_tetrahedron_problem())
+        for clusters in [angles_problem(), cluster_problem(3, 7), cluster_problem(5, 9)]:
+            solver = ClusterSolver3D()
+            for cluster in clusters:
+                solver.add(cluster)
+            # removing clusters changes the top-level clusters
+            for cluster in clusters[-3:]:
+                solver.remove(cluster)
+    finally:
+        clsolver.MethodWorklist = original
+    assert CheckedWorklist.checked > 100
+
+def test_diag_print():
+    """messages are only formatted when they are printed"""
+    stream = io.StringIO()
+    diag_direct(stream)
+    try:
+        counted = Counted()
+        diag_select("clsolver")
+        diag_print("%s", "other", counted)
+        diag_print(lambda: str(counted), "other")
+        diag_print("%s", "clsolver", counted, level=2)
+        assert counted.count == 0 and stream.getvalue() == ""
+        diag_print("%s and %d", "clsolver", counted, 3)
+        diag_print(lambda: str(counted), "clsolver")
+        assert counted.count == 2 and stream.getvalue() == "counted and 3\ncounted\n"
+        # the cache of enabled codes is cleared when the selection or levels change
+        diag_level(2, "clsolver")
+        diag_print("%s", "clsolver", counted, level=2)
+        diag_select("other")
+        diag_print("%s", "clsolver", counted)
+        assert counted.count == 3
+        # the solver formats its messages when enabled
+        diag_select("clsolver")
+        GeometricSolver(dad_tetrahedron_problem())
+        assert "add_cluster" in stream.getvalue()
+    finally:
+        diag_select("nothing")
+        diagnostic.diag_levels.clear()
+        diag_level(1)
+        diag_direct(sys.stdout)
+
+if __name__ == "__main__":
+    test_angle_apex()
+    test_provenance()
+    test_masks()
+    test_num_over_constraints()
+    test_incremental_matchers()
+    test_worklist()
+    test_diag_print()
+    print("ok")
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+"""This module provides some tests for Configurations:
+transforming, adding and selecting points, and equality."""
+
+import random
+from geosolver.configuration import Configuration
+from geosolver.multimethod import distinct
+from geosolver.matfunc import Vec, Mat
+from geosolver.vector import vector, dot
+from geosolver.intersections import make_hcs_2d, make_hcs_3d, cs_transform_matrix, distance_2p
+
+# ---------- configurations -----
+
+def random_configuration(rng, n, dimension):
+    """n points with random coordinates"""
+    return Configuration(dict([('p%d'%i, vector([rng.uniform(-10.0, 10.0) for j in range(dimension)]))
+                               for i in range(n)]))
+
+def random_points(rng, k, dimension):
+    """k random vectors"""
+    return [vector([rng.uniform(-10.0, 10.0) for j in range(dimension)]) for i in range(k)]
+
+def random_matrices(rng, dimension):
+    """a rigid transformation, a scaling and a projective transformation"""
+    if dimension == 2:
+        (a, b, c, d) = random_points(rng, 4, 2)
+        rigid = cs_transform_matrix(make_hcs_2d(a, b), make_hcs_2d(c, d))
+    else:
+        # make_hcs_3d is only orthonormal if b-a and c-a are perpendicular
+        systems = []
+        for i in range(2):
+            (a, b, c) = random_points(rng, 3, 3)
+            c = c - b * (dot(b, c) / dot(b, b))
+            systems.append(make_hcs_3d(a, a+b, a+c))
+        rigid = cs_transform_matrix(systems[0], systems[1])
+    n = dimension + 1
+    scale = Mat([[float(i == j) for j in range(n)] for i in range(n)])
+    for i in range(dimension):
+        scale[i][i] = 2.5
+    projective = Mat([[rng.uniform(-1.0, 1.0) + 4.0*(i == j) for j in range(n)] for i in range(n)])
+    return [rigid, scale, projective]
+
+# ---------- reference implementations -----
+
+def reference_transform(configuration, t):
+    """transform each point with a product of t and its homogeneous coordinates"""
+    newmap = {}
+    for v in configuration.map:
+        ph = Vec(configuration.map[v])
+        ph.append(1.0)
+        ph = t.mmul(ph)
+        newmap[v] = vector(ph[0:-1]) / ph[-1]
+    return Configuration(newmap)
+
+def reference_add(configuration, other):
+    newmap = {}
+    for v in configuration.map:
+        newmap[v] = configuration.map[v]
+    for v in other.map:
+        if v not in newmap:
+            newmap[v] = other.map[v]
+    return Configuration(newmap)
+
+def reference_select(configuration, vars):
+    newmap = {}
+    for v in vars:
+        newmap[v] = configuration.map[v]
+    return Configuration(newmap)
+
+def same_points(first, second, tolerance=1e-9):
+    """True iff two configurations have the same variables and coordinates (not modulo rotation)"""
+    if sorted(first.vars()) != sorted(second.vars()):
+        return False
+    return all([distance_2p(first.get(v), second.get(v)) <= tolerance for v in first.vars()])
+
+# ---------- tests -----
+
+def test_transform():
+    """transform gives the points of a product of the matrix and homogeneous coordinates"""
+    rng = random.Random(3)
+    for dimension in [2, 3]:
+        for i in range(5):
+            configuration = random_configuration(rng, 7, dimension)
+            for t in random_matrices(rng, dimension):
+                transformed = configuration.transform(t)
+                assert transformed.dimension == dimension
+                assert same_points(transformed, reference_transform(configuration, t))
+
+def test_add_select():
+    """add keeps the points of the configuration itself, select takes the given points"""
+    rng = random.Random(4)
+    for dimension in [2, 3]:
+        first = random_configuration(rng, 6, dimension)
+        # p3 .. p5 are in both configurations, with different coordinates
+        second = Configuration(dict([('p%d'%i, p) for (i, p) in zip(range(3, 9), random_points(rng, 6, dimension))]))
+        added = first.add(second)
+        assert same_points(added, reference_add(first, second), 0.0)
+        assert same_points(second.add(first), reference_add(second, first), 0.0)
+        for vars in [['p0'], ['p5', 'p1', 'p3'], first.vars()]:
+            assert same_points(added.select(vars), reference_select(added, vars), 0.0)
+
+def test_distinct():
+    """rotated and translated copies of a configuration are removed, distinct configurations are kept"""
+    rng = random.Random(5)
+    for dimension in [2, 3]:
+        originals = [random_configuration(rng, 8, dimension) for i in range(20)]
+        # a mirror image is not equal
+        mirror = Mat([[float(i == j) for j in range(dimension+1)] for i in range(dimension+1)])
+        mirror[0][0] = -1.0
+        originals.append(originals[0].transform(mirror))
+        copies = []
+        for original in originals:
+            t = random_matrices(rng, dimension)[0]
+            copy = original.transform(t)
+            # move points a little, within the tolerance
+            copy = Configuration(dict([(v, copy.get(v) + vector([1e-8]*dimension)) for v in copy.vars()]))
+            assert copy == original and original == copy
+            assert abs(copy.bucket() - original.bucket()) <= 1
+            copies.append(copy)
+        values = originals + copies
+        rng.shuffle(values)
+        result = distinct(values)
+        assert len(result) == len(originals)
+        for original in originals:
+            assert len([x for x in result if x == original]) == 1
+        assert distinct(values + ['a', 'b', 'a']) == result + ['a', 'b']
+
+if __name__ == "__main__":
+    test_transform()
+    test_add_select()
+    test_distinct()
+    print("ok")
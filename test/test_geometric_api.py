@@ -0,0 +1,317 @@
+#!/usr/bin/env python
+"""This module provides some tests for the GeometricSolver API:
+batch evaluation, plan caching, snapshots, bulk loading,
+notifications, transactions, solving components and solution spaces."""
+
+import os
+import random
+import itertools
+import tempfile
+from geosolver.geometric import GeometricProblem, GeometricSolver, DistanceConstraint
+from geosolver.randomproblem import random_triangular_problem_3D
+from geosolver.vector import vector
+from geosolver.intersections import distance_2p
+from geosolver.plancache import PlanCache, problem_signature
+from geosolver import snapshot
+from geosolver.notify import Notifier, Listener
+from geosolver.incremental import MutableSet, Filter, Map
+from geosolver.partition import split_problem, solve_components, _detach
+
+# ---------- problems -----
+
+def double_tetrahedron_problem(seed=1, d=5.0, use_prototype=True):
+    """six points with twelve random distances (a well-constrained problem)"""
+    rng = random.Random(seed)
+    problem = GeometricProblem(3, use_prototype)
+    points = ['p%d'%i for i in range(6)]
+    for p in points:
+        problem.add_point(p, vector([rng.random() for i in range(3)]))
+    for (a,b) in list(itertools.combinations(points,2))[:12]:
+        problem.add_constraint(DistanceConstraint(a,b,d+rng.random()))
+    return problem
+
+def two_part_problem():
+    """two unconnected random problems"""
+    problem = GeometricProblem(dimension=3)
+    random.seed(2)
+    for part in ["a", "b"]:
+        source = random_triangular_problem_3D(6, 10.0, 0.0, 0.0)
+        for var in source.cg.variables():
+            problem.add_point(part+var, source.get_point(var))
+        for con in distances(source):
+            (a,b) = con.variables()
+            problem.add_constraint(DistanceConstraint(part+a, part+b, con.get_parameter()))
+    return problem
+
+def distances(problem):
+    """the distance constraints of a problem, in a fixed order"""
+    cons = [c for c in problem.cg.constraints() if isinstance(c, DistanceConstraint)]
+    return sorted(cons, key=lambda c: tuple(c.variables()))
+
+def _coordinates(solution):
+    return [x for var in sorted(solution) for x in solution[var]]
+
+def _distances(solution):
+    pairs = itertools.combinations(sorted(solution), 2)
+    return [distance_2p(solution[a], solution[b]) for (a,b) in pairs]
+
+def same_solutions(first, second, represent=_coordinates, tolerance=1e-6):
+    """True iff two lists of solutions contain the same solutions, in any order"""
+    first = [represent(sol) for sol in first]
+    second = [represent(sol) for sol in second]
+    if len(first) != len(second):
+        return False
+    for x in first:
+        matches = [y for y in second if max([abs(a-b) for (a,b) in zip(x,y)]) < tolerance]
+        if len(matches) == 0:
+            return False
+        second.remove(matches[0])
+    return True
+
+def same_shapes(first, second):
+    """like same_solutions, but for solutions up to rotation and translation, 
+       i.e. solutions are compared by the distances between their points"""
+    return same_solutions(first, second, _distances)
+
+class Recorder(Listener):
+    """a listener that remembers the messages it receives"""
+    def __init__(self):
+        Listener.__init__(self)
+        self.messages = []
+
+    def receive_notify(self, source, message):
+        self.messages.append(message)
+
+# ---------- tests -----
+
+def test_evaluate_batch():
+    """evaluate_batch returns the solutions of the problem solved with each set of parameters"""
+    random.seed(2)
+    problem = random_triangular_problem_3D(8, 10.0, 0.0, 0.0)
+    solver = GeometricSolver(problem)
+    assert solver.get_result().flag == "well-constrained"
+    cons = distances(problem)[:3]
+    base = [c.get_parameter() for c in cons]
+    rows = [[b*(1+0.01*k) for b in base] for k in range(5)]
+    batch = solver.evaluate_batch(cons, rows)
+    # the problem is not changed
+    assert [c.get_parameter() for c in cons] == base
+    assert same_solutions(solver.evaluate_batch(cons, [base])[0], solver.get_solutions())
+    for (row, solutions) in zip(rows, batch):
+        for (con, value) in zip(cons, row):
+            con.set_parameter(value)
+        assert all(problem.verify(sol) for sol in solutions)
+        # a new solver may find another decomposition, and place the solutions differently
+        assert same_shapes(solutions, GeometricSolver(problem).get_solutions())
+    assert sum([len(solutions) for solutions in batch]) > 0
+
+def test_plan_cache():
+    """a solver that replays a cached decomposition finds the same solutions as a plain solver"""
+    cache = PlanCache()
+    first = double_tetrahedron_problem(seed=1)
+    second = double_tetrahedron_problem(seed=2, d=6.0)
+    other = double_tetrahedron_problem(seed=1)
+    other.add_point('p6', vector([0.0, 0.0, 0.0]))
+    assert problem_signature(first) == problem_signature(second)
+    assert problem_signature(first) != problem_signature(other)
+    GeometricSolver(first, cache)
+    assert cache.statistics()["misses"] == 1 and len(cache) == 1
+    cached = GeometricSolver(second, cache)
+    assert cache.statistics()["hits"] == 1
+    # a complete replay needs no search
+    assert cached.dr._incremental_matchers is None
+    plain = GeometricSolver(second)
+    assert cached.get_result().flag == plain.get_result().flag
+    assert len(plain.get_solutions()) > 0
+    # the decomposition may differ from the one found by the plain solver, 
+    # so the solutions may be placed differently 
+    assert same_shapes(cached.get_solutions(), plain.get_solutions())
+    assert all(second.verify(sol) for sol in cached.get_solutions())
+
+def test_snapshot():
+    """a restored solver has the solutions of the saved solver, also after changes"""
+    problem = double_tetrahedron_problem()
+    solver = GeometricSolver(problem)
+    (handle, filename) = tempfile.mkstemp(suffix=".pkl")
+    os.close(handle)
+    try:
+        snapshot.save(solver, filename)
+        restored = snapshot.load(filename)
+    finally:
+        os.remove(filename)
+    assert restored.get_result().flag == solver.get_result().flag
+    assert len(solver.get_solutions()) > 0
+    assert same_solutions(restored.get_solutions(), solver.get_solutions())
+    # change a parameter in both problems
+    for (con, copy) in zip(distances(problem), distances(restored.problem)):
+        assert con.variables() == copy.variables()
+    con = distances(problem)[0]
+    copy = distances(restored.problem)[0]
+    con.set_parameter(con.get_parameter()*1.01)
+    copy.set_parameter(copy.get_parameter()*1.01)
+    assert same_solutions(restored.get_solutions(), solver.get_solutions())
+    # add a point to both problems
+    for p in [problem, restored.problem]:
+        p.add_point('new', vector([1.0, 2.0, 3.0]))
+        for var in ['p0', 'p1', 'p2']:
+            p.add_constraint(DistanceConstraint('new', var, 4.0))
+    assert restored.get_result().flag == solver.get_result().flag
+    assert len(solver.get_solutions()) > 0
+    assert same_solutions(restored.get_solutions(), solver.get_solutions())
+
+def test_bulk():
+    """a problem loaded in bulk has the solutions of a problem built one change at a time"""
+    plain = GeometricProblem(dimension=3)
+    plainsolver = GeometricSolver(plain)
+    bulk = GeometricProblem(dimension=3)
+    bulksolver = GeometricSolver(bulk)
+    bulksolver.begin_bulk()
+    source = double_tetrahedron_problem()
+    for problem in [plain, bulk]:
+        for var in source.cg.variables():
+            problem.add_point(var, source.get_point(var))
+        for con in distances(source):
+            (a,b) = con.variables()
+            problem.add_constraint(DistanceConstraint(a, b, con.get_parameter()))
+    bulksolver.end_bulk()
+    assert bulksolver.get_result().flag == plainsolver.get_result().flag == "well-constrained"
+    assert len(plainsolver.get_solutions()) > 0
+    assert same_shapes(bulksolver.get_solutions(), plainsolver.get_solutions())
+    assert all(bulk.verify(sol) for sol in bulksolver.get_solutions())
+
+def test_hold_notify():
+    """held messages are queued instead of sent"""
+    notifier = Notifier()
+    recorder = Recorder()
+    notifier.add_listener(recorder)
+    queue = []
+    notifier.hold_notify(queue)
+    notifier.send_notify(("a", 1))
+    assert recorder.messages == [] and queue == [(notifier, ("a", 1))]
+    notifier.release_notify()
+    notifier.send_notify(("b", 2))
+    assert recorder.messages == [("b", 2)] and len(queue) == 1
+
+def test_subscribe():
+    """a listener that subscribes to some message types receives only those messages"""
+    notifier = Notifier()
+    assert notifier.silent
+    everything = Recorder()
+    some = Recorder()
+    notifier.add_listener(everything)
+    notifier.add_listener(some, ["a", "c"])
+    assert not notifier.silent
+    for message in [("a", 1), ("b", 2), "c", ("c", 3), "d"]:
+        notifier.send_notify(message)
+    assert everything.messages == [("a", 1), ("b", 2), "c", ("c", 3), "d"]
+    assert some.messages == [("a", 1), "c", ("c", 3)]
+    notifier.rem_listener(everything)
+    notifier.rem_listener(some)
+    assert notifier.silent
+    notifier.send_notify(("a", 4))
+    assert len(some.messages) == 3
+    # listeners of an equivalent incremental set listen to the original
+    positive = lambda x: x > 0
+    base = MutableSet()
+    original = Filter(positive, base)
+    alias = Filter(positive, base)
+    down = Map(lambda x: x*10, alias)
+    base.add(1)
+    assert list(down) == [10]
+    base.remove(1)
+    assert list(down) == []
+
+def edit(problem, con, other):
+    """some changes to a double tetrahedron problem"""
+    for k in range(10):
+        con.set_parameter(5.0+0.05*k)
+    problem.rem_constraint(other)
+    other.set_parameter(6.1)
+    problem.add_constraint(other)
+    for k in range(5):
+        problem.set_point('p3', vector([0.1*k, 0.2, 0.3]))
+    extra = DistanceConstraint('p4', 'p5', 3.0)
+    problem.add_constraint(extra)
+    problem.rem_constraint(extra)
+
+def test_transaction():
+    """changes in a transaction have the effect of the same changes made outside a transaction"""
+    plain = double_tetrahedron_problem()
+    plainsolver = GeometricSolver(plain)
+    problem = double_tetrahedron_problem()
+    solver = GeometricSolver(problem)
+    recorder = Recorder()
+    problem.add_listener(recorder)
+    edit(plain, distances(plain)[0], distances(plain)[1])
+    (con, other) = distances(problem)[:2]
+    with problem.transaction():
+        edit(problem, con, other)
+        # nested transactions are committed with the outermost one
+        with problem.transaction():
+            problem.set_point('p3', vector([0.5, 0.2, 0.3]))
+        assert recorder.messages == []
+    plain.set_point('p3', vector([0.5, 0.2, 0.3]))
+    assert recorder.messages[0] == ("begin_commit", None)
+    assert recorder.messages[-1] == ("end_commit", None)
+    assert solver.get_result().flag == plainsolver.get_result().flag
+    assert len(plainsolver.get_solutions()) > 0
+    assert same_shapes(solver.get_solutions(), plainsolver.get_solutions())
+    assert all(problem.verify(sol) for sol in solver.get_solutions())
+
+def summary(decomposition):
+    return (decomposition.flag, sorted([(sub.flag, len(sub.solutions), sorted(sub.variables)) 
+                                        for sub in decomposition.subs]))
+
+def test_components():
+    """solving components separately gives the decomposition of the whole problem"""
+    problem = two_part_problem()
+    parts = split_problem(problem)
+    assert len(parts) == 2
+    assert sorted([len(part.cg.variables()) for part in parts]) == [6, 6]
+    assert sorted(parts[0].cg.variables() + parts[1].cg.variables()) == sorted(problem.cg.variables())
+    plain = GeometricSolver(problem).get_decomposition()
+    for processes in [1, None]:
+        decomposition = solve_components(problem, processes)
+        assert summary(decomposition) == summary(plain)
+        for sub in decomposition.subs:
+            assert len(sub.solutions) > 0
+            for sol in sub.solutions:
+                for con in problem.cg.constraints():
+                    if all(var in sol for var in con.variables()):
+                        assert con.satisfied(sol)
+    # components stop listening to the constraints of the problem when detached
+    for con in distances(problem):
+        assert len(con.listeners) == 2
+    for part in parts:
+        _detach(part)
+    for con in distances(problem):
+        assert list(con.listeners.keys()) == [problem]
+
+def test_solution_space():
+    """a solution space has the solutions returned by get_solutions"""
+    problem = double_tetrahedron_problem(use_prototype=False)
+    solver = GeometricSolver(problem)
+    solutions = solver.get_solutions()
+    assert len(solutions) > 1
+    space = solver.get_solution_space()
+    assert space.count() == len(solutions)
+    assert same_solutions(list(space), solutions)
+    samples = space.sample(3, random.Random(1))
+    assert len(samples) == 3
+    for sol in samples:
+        assert any([same_solutions([sol], [x]) for x in solutions])
+    nearest = space.closest(2, dict([(var, problem.get_point(var)) for var in problem.cg.variables()]))
+    assert len(nearest) == 2
+    assert all(problem.verify(sol) for sol in nearest)
+
+if __name__ == "__main__":
+    test_evaluate_batch()
+    test_plan_cache()
+    test_snapshot()
+    test_bulk()
+    test_hold_notify()
+    test_subscribe()
+    test_transaction()
+    test_components()
+    test_solution_space()
+    print("ok")
@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+"""This module provides some tests for the graphs used by the GeoSolver:
+graph matching, graph views and indexed graphs."""
+
+import random
+import itertools
+from geosolver.graph import Graph, FanGraph, FanGraphView, IndexedGraph
+from geosolver.gmatch import gmatch, MatchPlan
+
+# ---------- graphs -----
+
+def triangle_pattern():
+    """three points, pairwise connected by distances (as in gmatch.test)"""
+    pattern = Graph()
+    for (d, p, q) in [('x','a','b'), ('y','a','c'), ('z','b','c')]:
+        pattern.add_edge(d, p)
+        pattern.add_edge(d, q)
+        pattern.add_edge("distance", d)
+    return pattern
+
+def random_reference(seed, n=5):
+    """n points with distances between random pairs, and some random edges"""
+    rng = random.Random(seed)
+    reference = Graph()
+    points = ['p%d'%i for i in range(n)]
+    for (p, q) in rng.sample(list(itertools.combinations(points, 2)), n+2):
+        d = 'd'+p+q
+        reference.add_edge(d, p)
+        reference.add_edge(d, q)
+        if rng.random() < 0.8:
+            reference.add_edge("distance", d)
+    vertices = reference.vertices()
+    for i in range(4):
+        (v, w) = rng.sample(vertices, 2)
+        reference.add_edge(v, w)
+    return reference
+
+# ---------- matching -----
+
+def brute_match(pattern, reference):
+    """all matches of pattern in reference, by trying all assignments"""
+    fixed = [v for v in pattern.vertices() if reference.has_vertex(v)]
+    free = [v for v in pattern.vertices() if not reference.has_vertex(v)]
+    available = [v for v in reference.vertices() if v not in fixed]
+    matches = []
+    def extend(match, i):
+        if i == len(free):
+            matches.append(dict(match))
+            return
+        for w in available:
+            if w in match.values():
+                continue
+            match[free[i]] = w
+            if all([reference.has_edge(match[v1], match[v2]) for (v1,v2) in pattern.edges()
+                    if v1 in match and v2 in match]):
+                extend(match, i+1)
+            del match[free[i]]
+    extend(dict([(v,v) for v in fixed]), 0)
+    return matches
+
+def match_set(pattern, matches):
+    """a comparable representation of a list of matches"""
+    return sorted([tuple([(v, match[v]) for v in sorted(pattern.vertices())]) for match in matches])
+
+# ---------- tests -----
+
+def test_match_plan():
+    """matching with a plan finds all and only the matches"""
+    pattern = triangle_pattern()
+    plan = MatchPlan(pattern, ["distance"])
+    assert plan.order[0][0] == "distance"
+    total = 0
+    for seed in range(10):
+        reference = random_reference(seed)
+        expected = match_set(pattern, brute_match(pattern, reference))
+        assert match_set(pattern, gmatch(plan, reference)) == expected
+        assert match_set(pattern, gmatch(pattern, reference)) == expected
+        total += len(expected)
+    assert total > 0
+
+def test_fan_graph_view():
+    """matching in a view finds the matches in the subgraph of the view"""
+    pattern = triangle_pattern()
+    plan = MatchPlan(pattern, ["distance"])
+    total = 0
+    for seed in range(10):
+        reference = random_reference(seed)
+        vertices = set(random.Random(seed).sample(reference.vertices(), 10))
+        vertices.add("distance")
+        view = FanGraphView(FanGraph(reference), vertices)
+        subgraph = reference.subgraph(list(vertices))
+        assert sorted(view.edges(), key=str) == sorted(subgraph.edges(), key=str)
+        expected = match_set(pattern, brute_match(pattern, subgraph))
+        assert match_set(pattern, gmatch(plan, view)) == expected
+        total += len(expected)
+    assert total > 0
+
+def same_graphs(first, second):
+    """True iff two graphs have the same vertices, edges, values and neighbours"""
+    if sorted(first.vertices(), key=str) != sorted(second.vertices(), key=str):
+        return False
+    if sorted(first.edges(), key=str) != sorted(second.edges(), key=str):
+        return False
+    for (v,w) in first.edges():
+        if first.get(v,w) != second.get(v,w):
+            return False
+    for v in first.vertices():
+        for (a, b) in [(first.ingoing_vertices(v), second.ingoing_vertices(v)),
+                       (first.outgoing_vertices(v), second.outgoing_vertices(v)),
+                       (list(first.ingoing(v)), list(second.ingoing(v))),
+                       (list(first.outgoing(v)), list(second.outgoing(v))),
+                       (first.adjacent_vertices(v), second.adjacent_vertices(v))]:
+            if sorted(a, key=str) != sorted(b, key=str):
+                return False
+    return True
+
+def test_indexed_graph():
+    """an IndexedGraph changes like a Graph"""
+    rng = random.Random(1)
+    plain = Graph()
+    indexed = IndexedGraph()
+    vertices = ['v%d'%i for i in range(10)] + [(1,2), 3]
+    for step in range(500):
+        choice = rng.random()
+        (v, w) = rng.sample(vertices, 2)
+        for graph in [plain, indexed]:
+            if choice < 0.5:
+                graph.add_edge(v, w, step)
+            elif choice < 0.6:
+                graph.set(v, w, -step)
+            elif choice < 0.8 and graph.has_edge(v, w):
+                graph.rem_edge(v, w)
+            elif choice < 0.9 and graph.has_vertex(v):
+                graph.rem_vertex(v)
+            else:
+                graph.add_vertex(v)
+        assert indexed.has_edge(v, w) == plain.has_edge(v, w)
+        assert indexed.has_vertex(v) == plain.has_vertex(v)
+        if step % 50 == 0:
+            assert same_graphs(indexed, plain)
+    assert same_graphs(indexed, plain)
+    # ids of removed vertices are re-used
+    assert len(indexed._vertex) <= len(vertices)
+    for v in indexed.vertices():
+        assert indexed.vertex(indexed.index(v)) == v
+    assert same_graphs(IndexedGraph(plain), plain)
+    part = vertices[:6]
+    assert same_graphs(indexed.subgraph(part), plain.subgraph(part))
+
+if __name__ == "__main__":
+    test_match_plan()
+    test_fan_graph_view()
+    test_indexed_graph()
+    print("ok")
@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+"""This module provides some tests for method graphs:
+propagation, cycle detection and compiled plans."""
+
+import random
+from geosolver.method import MethodGraph, ValidityError, AddMethod, SubMethod, OrMethod, SetMethod
+from geosolver.multimethod import MultiVariable, SumProdMethod
+
+# ---------- method graphs -----
+
+class LoggedAdd(AddMethod):
+    """an AddMethod that appends itself to a log when executed"""
+    def __init__(self, a, b, c, log):
+        AddMethod.__init__(self, a, b, c)
+        self._log = log
+
+    def execute(self, inmap):
+        self._log.append(self)
+        return AddMethod.execute(self, inmap)
+
+def lattice_graph(log):
+    """a method graph in which most variables are reached from a and b along several paths"""
+    graph = MethodGraph()
+    graph.add_variable('a', 1)
+    graph.add_variable('b', 2)
+    for (x, y, z) in [('a', 'b', 'c'), ('a', 'c', 'd'), ('c', 'd', 'e'), ('b', 'e', 'f'),
+                      ('d', 'f', 'g'), ('c', 'g', 'h')]:
+        graph.add_method(LoggedAdd(x, y, z, log))
+    return graph
+
+def random_method_graph(seed, n=12):
+    """a method graph with n parameters and random methods on earlier variables"""
+    rng = random.Random(seed)
+    graph = MethodGraph()
+    numbers = []
+    for i in range(n):
+        var = 'x%d'%i
+        graph.add_variable(var, rng.randint(-5, 5))
+        numbers.append(var)
+    flags = ['f0', 'f1', 'f2']
+    for var in flags:
+        graph.add_variable(var, rng.random() < 0.5)
+    graph.add_variable('s0')
+    graph.add_method(SetMethod('s0', 7))
+    numbers.append('s0')
+    multis = []
+    for i in range(n):
+        var = 'y%d'%i
+        graph.add_variable(var)
+        (a, b) = rng.sample(numbers, 2)
+        if rng.random() < 0.5:
+            graph.add_method(AddMethod(a, b, var))
+        else:
+            graph.add_method(SubMethod(a, b, var))
+        numbers.append(var)
+    for i in range(4):
+        var = MultiVariable('m%d'%i)
+        graph.add_variable(var)
+        if len(multis) > 0 and rng.random() < 0.7:
+            graph.add_method(SumProdMethod(rng.choice(multis), rng.choice(numbers), var))
+        else:
+            (a, b) = rng.sample(numbers, 2)
+            graph.add_method(SumProdMethod(a, b, var))
+        multis.append(var)
+    graph.add_variable('or')
+    graph.add_method(OrMethod(flags, 'or'))
+    return graph
+
+def reaches(methods, source, target):
+    """True iff there is a path from variable source to variable target, by brute force"""
+    reached = set([source])
+    while True:
+        new = set()
+        for method in methods:
+            if reached.intersection(method.inputs()):
+                new.update(method.outputs())
+        if new.issubset(reached):
+            return target in reached
+        reached.update(new)
+
+def comparable(value):
+    """values of multi-variables are lists, in no particular order"""
+    if isinstance(value, list):
+        return sorted(value)
+    return value
+
+# ---------- tests -----
+
+def test_propagate():
+    """each affected method is executed once, after the methods that determine its inputs"""
+    log = []
+    graph = lattice_graph(log)
+    assert graph.get('h') == 16
+    before = graph.statistics()
+    del log[:]
+    graph.set('a', 10, False)
+    graph.set('b', 20, False)
+    graph.propagate()
+    assert len(log) == 6 and len(set(log)) == 6
+    for (i, method) in enumerate(log):
+        for earlier in log[i+1:]:
+            assert len(set(method.inputs()).intersection(earlier.outputs())) == 0
+    assert (graph.get('c'), graph.get('h')) == (30, 160)
+    after = graph.statistics()
+    assert after["executions"] - before["executions"] == 6
+    # the methods on c, d, e, f, g and h are reached from two changed inputs each
+    assert after["saved"] - before["saved"] == 6
+    # a method that is not affected is not executed
+    del log[:]
+    graph.set('g', 0)
+    assert [method.outputs() for method in log] == [['h']]
+    assert graph.get('h') == 30
+
+def test_cycles():
+    """methods that would close a cycle are rejected, and the order stays topological"""
+    for seed in range(10):
+        rng = random.Random(seed)
+        graph = MethodGraph()
+        variables = ['v%d'%i for i in range(12)]
+        methods = []
+        rejected = 0
+        for step in range(40):
+            determined = set([var for method in methods for var in method.outputs()])
+            free = [var for var in variables if var not in determined]
+            if len(free) == 0:
+                break
+            # variables are added in a random order, so many edges go against it
+            output = rng.choice(free)
+            (a, b) = rng.sample([var for var in variables if var != output], 2)
+            method = AddMethod(a, b, output)
+            cycle = reaches(methods, output, a) or reaches(methods, output, b)
+            try:
+                graph.add_method(method, False)
+                methods.append(method)
+                assert not cycle
+            except ValidityError:
+                rejected += 1
+                assert cycle
+                assert not graph.contains(method)
+            assert sorted(graph.methods(), key=str) == sorted(methods, key=str)
+            for method in methods:
+                for var in method.inputs():
+                    assert graph._order[var] < graph._order[method]
+                for var in method.outputs():
+                    assert graph._order[method] < graph._order[var]
+        assert rejected > 0
+
+def test_plan():
+    """evaluating a plan gives the values found by propagation in the method graph"""
+    for seed in range(5):
+        graph = random_method_graph(seed)
+        plan = graph.compile()
+        rng = random.Random(seed)
+        assert len(plan.variables()) == len(graph.variables())
+        for step in range(3):
+            values = []
+            for var in plan.parameters():
+                if var in ['f0', 'f1', 'f2']:
+                    values.append(rng.random() < 0.5)
+                else:
+                    values.append(rng.randint(-5, 5))
+            result = plan.evaluate(values)
+            for (var, value) in zip(plan.parameters(), values):
+                graph.set(var, value)
+            for var in graph.variables():
+                assert comparable(result[var]) == comparable(graph.get(var)), var
+
+if __name__ == "__main__":
+    test_propagate()
+    test_cycles()
+    test_plan()
+    print("ok")